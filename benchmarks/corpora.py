@@ -0,0 +1,156 @@
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from fixtures import FIXTURES
+from upstream import Upstream
+
+from lhotse_dataset.base import BaseCorpus
+from lhotse_dataset.instrumentation import InstrumentationConfig
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+# metrics where a larger value is better; the others are better when smaller
+THROUGHPUT_METRICS = [
+    "get_cuts_cuts_per_second",
+    "get_cuts_audio_seconds_per_second",
+    "write_shar_cuts_per_second",
+    "write_shar_audio_seconds_per_second",
+]
+
+
+def measure(
+    corpus: BaseCorpus, upstream: Upstream, work_dir: Path, repeat: int
+) -> dict:
+    """Run in a fresh process, so the peak memory belongs to this corpus alone
+
+    Throughputs are the best of `repeat` runs, after a first pass of `get_cuts`
+    that downloads into the empty cache.
+    """
+    os.environ["LHOTSE_DATASET_CACHE_DIR"] = str(work_dir / "cache")
+    with upstream.serve():
+        get_cuts_seconds = []
+        for _ in range(repeat + 1):
+            start = time.perf_counter()
+            num_cuts, audio_seconds = 0, 0.0
+            for cut in corpus.get_cuts():
+                num_cuts += 1
+                audio_seconds += cut.duration
+            get_cuts_seconds.append(time.perf_counter() - start)
+
+        write_shar_seconds = []
+        for i in range(repeat):
+            shar_dir = work_dir / f"shar_{i}"
+            shar_dir.mkdir()
+            report = corpus.write_shar(
+                shar_dir, instrumentation=InstrumentationConfig(summary_interval=None)
+            )
+            write_shar_seconds.append(report.wall_seconds)
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "num_cuts": num_cuts,
+        "download_seconds": get_cuts_seconds[0] - min(get_cuts_seconds[1:]),
+        "get_cuts_cuts_per_second": num_cuts / min(get_cuts_seconds[1:]),
+        "get_cuts_audio_seconds_per_second": audio_seconds / min(get_cuts_seconds[1:]),
+        "write_shar_cuts_per_second": num_cuts / min(write_shar_seconds),
+        "write_shar_audio_seconds_per_second": audio_seconds / min(write_shar_seconds),
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def compare(name: str, result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe every metric of `result` that regressed from `baseline`"""
+    regressions = []
+    if result["num_cuts"] != baseline["num_cuts"]:
+        regressions.append(
+            f"{name}: num_cuts {result['num_cuts']} != {baseline['num_cuts']}"
+        )
+    for metric in THROUGHPUT_METRICS:
+        if result[metric] < baseline[metric] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {metric} {result[metric]:.1f} < {baseline[metric]:.1f}"
+            )
+    if result["peak_rss_mb"] > baseline["peak_rss_mb"] * (1 + tolerance):
+        regressions.append(
+            f"{name}: peak_rss_mb {result['peak_rss_mb']:.1f} > "
+            f"{baseline['peak_rss_mb']:.1f}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark get_cuts and write_shar of every corpus offline, on "
+        "synthetic archives served from a local stand-in of the upstream hosts"
+    )
+    parser.add_argument("--corpora", nargs="+", default=sorted(FIXTURES))
+    parser.add_argument("--num_cuts", type=int, default=48)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=str, default=str(BASELINE_PATH))
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    baseline_path = Path(args.baseline)
+    baseline = {"num_cuts": args.num_cuts, "results": {}}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())
+    if baseline["num_cuts"] != args.num_cuts and not args.update_baseline:
+        print(
+            f"Warning: baseline was measured with --num_cuts {baseline['num_cuts']}, "
+            "not comparing"
+        )
+        baseline["results"] = {}
+
+    results = {}
+    regressions = []
+    print(
+        f"{'corpus':<36} {'cuts':>5} {'get_cuts':>14} {'write_shar':>14} "
+        f"{'peak RSS':>10}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in args.corpora:
+            fixture_dir = Path(tmp_dir) / name / "fixture"
+            work_dir = Path(tmp_dir) / name / "work"
+            work_dir.mkdir(parents=True)
+
+            upstream = Upstream()
+            corpus = FIXTURES[name](fixture_dir, upstream, args.num_cuts)
+            with ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=1,
+            ) as executor:
+                result = executor.submit(
+                    measure, corpus, upstream, work_dir, args.repeat
+                ).result()
+            results[name] = result
+
+            print(
+                f"{name:<36} {result['num_cuts']:>5} "
+                f"{result['get_cuts_audio_seconds_per_second']:>8.1f} aud/s "
+                f"{result['write_shar_audio_seconds_per_second']:>8.1f} aud/s "
+                f"{result['peak_rss_mb']:>7.1f} MB"
+            )
+            if name in baseline["results"] and not args.update_baseline:
+                regressions += compare(
+                    name, result, baseline["results"][name], args.tolerance
+                )
+
+    if args.update_baseline:
+        baseline["num_cuts"] = args.num_cuts
+        baseline["results"].update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Updated {baseline_path}")
+
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    sys.exit(1 if regressions else 0)
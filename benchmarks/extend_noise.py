@@ -0,0 +1,64 @@
+import argparse
+import time
+
+import numpy as np
+
+from lhotse_dataset.mixing import extend_noise
+
+
+def concatenating_extend_noise(noise: np.ndarray, max_length: int) -> np.ndarray:
+    """The algorithm replaced by `extend_noise`, for comparison"""
+    window = np.hanning(16000 + 1)
+    i_w = window[: len(window) // 2 + 1]
+    d_w = window[len(window) // 2 :: -1]
+    noise_ex = noise
+    while len(noise_ex) < max_length:
+        noise_ex = np.concatenate(
+            (
+                noise_ex[: len(noise_ex) - len(d_w)],
+                np.multiply(noise_ex[len(noise_ex) - len(d_w) :], d_w)
+                + np.multiply(noise[: len(i_w)], i_w),
+                noise[len(i_w) :],
+            )
+        )
+    return noise_ex[:max_length]
+
+
+def measure(name: str, fn, repeat: int) -> float:
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed.append(time.perf_counter() - start)
+    print(f"{name:<40} {min(elapsed) * 1e3:10.2f} ms")
+    return min(elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--noise_seconds", type=float, default=2.0)
+    parser.add_argument(
+        "--target_seconds", type=float, nargs="+", default=[10, 60, 600, 1800]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sampling_rate = 16000
+    rng = np.random.default_rng(0)
+    noise = rng.uniform(-0.1, 0.1, int(args.noise_seconds * sampling_rate))
+    noise = noise.astype(np.float32)
+    print(f"{args.noise_seconds}s of noise at {sampling_rate} Hz")
+
+    for seconds in args.target_seconds:
+        max_length = int(seconds * sampling_rate)
+        old = measure(
+            f"concatenating, {seconds:g}s",
+            lambda: concatenating_extend_noise(noise, max_length),
+            args.repeat,
+        )
+        new = measure(
+            f"extend_noise, {seconds:g}s",
+            lambda: extend_noise(noise, max_length),
+            args.repeat,
+        )
+        print(f"{'':<40} {old / new:10.1f}x")
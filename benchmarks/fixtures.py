@@ -0,0 +1,635 @@
+import io
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Callable
+
+import git
+import lhotse
+import numpy as np
+import pandas as pd
+import soundfile as sf
+from datasets import Dataset, DatasetDict
+from lhotse.shar import SharWriter
+from upstream import Upstream
+
+from lhotse_dataset import (
+    DEMAND,
+    JIS,
+    JSUT,
+    JVNV,
+    JVS,
+    CallFriendJP,
+    CallHomeEn,
+    CallHomeJP,
+    DailyTalk,
+    HiFiCAPTAIN,
+    HQYouTube,
+    Libri2MixClean,
+    Libri2MixWithNoise,
+    LibriSpeech,
+    LibriTTSR,
+    LibriTTSRMixClean,
+    LibriTTSRMixLarge,
+    MITEnvironmentalImpulseResponses,
+    ReazonSpeech,
+    WhamNoise,
+)
+from lhotse_dataset.base import BaseCorpus
+from lhotse_dataset.probe import recording_from_bytes
+
+Fixture = Callable[[Path, Upstream, int], BaseCorpus]
+
+
+def audio(
+    rng: np.random.Generator,
+    sampling_rate: int,
+    num_channels: int = 1,
+    format: str = "WAV",
+    min_seconds: float = 2.0,
+    max_seconds: float = 8.0,
+) -> bytes:
+    num_samples = int(rng.uniform(min_seconds, max_seconds) * sampling_rate)
+    samples = rng.uniform(-0.1, 0.1, (num_samples, num_channels)).astype(np.float32)
+    buf = io.BytesIO()
+    sf.write(buf, samples, sampling_rate, format=format, subtype="PCM_16")
+    return buf.getvalue()
+
+
+def write_tar(path: Path, members: dict[str, bytes], mode: str = "w:gz") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(path, mode) as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def write_zip(path: Path, members: dict[str, bytes]) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+        for name, data in members.items():
+            zip_file.writestr(name, data)
+    return path
+
+
+def split(num_items: int, num_groups: int) -> list[int]:
+    """Split `num_items` into `num_groups` sizes, rounding empty groups up to one"""
+    return [max(1, (num_items + i) // num_groups) for i in range(num_groups)]
+
+
+def bare_repository(work_dir: Path, dir: Path) -> Path:
+    """Commit `work_dir` and copy it to a bare repository clonable over dumb HTTP"""
+    repo = git.Repo.init(work_dir)
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "fixture")
+        config.set_value("user", "email", "fixture@example.com")
+    repo.git.add(A=True)
+    repo.git.commit(m="fixture")
+    git.Repo.clone_from(str(work_dir), dir, bare=True)
+    git.Repo(dir).git.update_server_info()
+    return dir
+
+
+def librispeech_archives(
+    dir: Path,
+    upstream: Upstream,
+    download_url: dict[str, str],
+    num_cuts: int,
+    rng: np.random.Generator,
+) -> dict[str, list[str]]:
+    """LibriSpeech tarballs, returning the flac paths below LibriSpeech/ per subset"""
+    flac_paths: dict[str, list[str]] = {}
+    speaker_lines = ["; ID  |SEX| SUBSET           |MINUTES| NAME"]
+    archives: dict[str, dict[str, bytes]] = {}
+    for i, (subset, num_subset_cuts) in enumerate(
+        zip(download_url, split(num_cuts, len(download_url)))
+    ):
+        members: dict[str, bytes] = {}
+        flac_paths[subset] = []
+        for j, num_speaker_cuts in enumerate(split(num_subset_cuts, 3)):
+            speaker_id, chapter_id = 100 + 10 * i + j, 1000 + 10 * i + j
+            gender = "M" if j % 2 == 0 else "F"
+            speaker_lines.append(
+                f"{speaker_id:<5}| {gender} | {subset:<16} | 25.00 | Reader {j}"
+            )
+            chapter_dir = f"{subset}/{speaker_id}/{chapter_id}"
+            transcripts = []
+            for k in range(num_speaker_cuts):
+                stem = f"{speaker_id}-{chapter_id}-{k:04d}"
+                path = f"{chapter_dir}/{stem}.flac"
+                members[f"LibriSpeech/{path}"] = audio(rng, 16000, format="FLAC")
+                flac_paths[subset].append(path)
+                transcripts.append(f"{stem} SOME WORDS OF UTTERANCE {k}")
+            trans_path = (
+                f"LibriSpeech/{chapter_dir}/{speaker_id}-{chapter_id}.trans.txt"
+            )
+            members[trans_path] = "\n".join(transcripts).encode() + b"\n"
+        archives[subset] = members
+
+    speakers = "\n".join(speaker_lines).encode() + b"\n"
+    for subset, members in archives.items():
+        members["LibriSpeech/SPEAKERS.TXT"] = speakers
+        path = write_tar(dir / "openslr12" / f"{subset}.tar.gz", members)
+        upstream.add_file(download_url[subset], path)
+    return flac_paths
+
+
+def libritts_r_archives(
+    dir: Path,
+    upstream: Upstream,
+    download_url: dict[str, str],
+    num_cuts: int,
+    rng: np.random.Generator,
+    min_seconds: float = 2.0,
+    max_seconds: float = 8.0,
+) -> dict[str, list[str]]:
+    """LibriTTS-R tarballs, returning the wav paths below LibriTTS_R/ per subset
+
+    `download_url` is keyed by the subset directory names inside the archives.
+    """
+    wav_paths: dict[str, list[str]] = {}
+    speaker_lines = ["READER\tGENDER\tSUBSET\tNAME"]
+    for i, (subset, num_subset_cuts) in enumerate(
+        zip(download_url, split(num_cuts, len(download_url)))
+    ):
+        members: dict[str, bytes] = {}
+        wav_paths[subset] = []
+        for j, num_speaker_cuts in enumerate(split(num_subset_cuts, 3)):
+            speaker_id, chapter_id = 100 + 10 * i + j, 1000 + 10 * i + j
+            gender = "M" if j % 2 == 0 else "F"
+            speaker_lines.append(f"{speaker_id}\t{gender}\t{subset}\tReader {j}")
+            for k in range(num_speaker_cuts):
+                stem = f"{speaker_id}_{chapter_id}_{k:06d}_000000"
+                path = f"{subset}/{speaker_id}/{chapter_id}/{stem}.wav"
+                members[f"LibriTTS_R/{path}"] = audio(
+                    rng, 24000, min_seconds=min_seconds, max_seconds=max_seconds
+                )
+                text = f"Some words of utterance {k}."
+                prefix = f"LibriTTS_R/{subset}/{speaker_id}/{chapter_id}/{stem}"
+                members[f"{prefix}.normalized.txt"] = text.encode()
+                members[f"{prefix}.original.txt"] = text.encode()
+                wav_paths[subset].append(path)
+        path = write_tar(dir / "openslr141" / f"{subset}.tar.gz", members)
+        upstream.add_file(download_url[subset], path)
+
+    speakers = "\n".join(speaker_lines).encode() + b"\n"
+    path = write_tar(
+        dir / "openslr141" / "doc.tar.gz", {"LibriTTS_R/speakers.tsv": speakers}
+    )
+    upstream.add_file(LibriTTSR().doc_url, path)
+    return wav_paths
+
+
+def wham_archive(
+    dir: Path, upstream: Upstream, num_cuts: int, rng: np.random.Generator
+) -> list[str]:
+    """WHAM! noise zip, returning the wav paths below wham_noise/"""
+    members = {}
+    for subset, num_subset_cuts in zip(["tr", "cv", "tt"], split(num_cuts, 3)):
+        for i in range(num_subset_cuts):
+            name = f"{subset}/{i:03d}c0201_1.{i:04d}_{i:03d}o030x_-1.{i:04d}.wav"
+            members[f"wham_noise/{name}"] = audio(rng, 16000, num_channels=2)
+    path = write_zip(dir / "wham_noise.zip", members)
+    upstream.add_file(WhamNoise().download_url, path)
+    return [name.removeprefix("wham_noise/") for name in members]
+
+
+def mixture_rows(
+    source_paths: list[str],
+    noise_paths: list[str],
+    num_rows: int,
+    rng: np.random.Generator,
+    speaker: Callable[[str], str],
+    mixture_id: Callable[[str, str], str],
+) -> pd.DataFrame:
+    """LibriMix-style metadata mixing pairs of different speakers"""
+    rows = []
+    while len(rows) < num_rows:
+        source_1, source_2 = rng.choice(source_paths, 2, replace=False)
+        if speaker(source_1) == speaker(source_2):
+            continue
+        rows.append(
+            {
+                "mixture_ID": mixture_id(source_1, source_2),
+                "source_1_path": source_1,
+                "source_1_gain": rng.uniform(0.1, 0.5),
+                "source_2_path": source_2,
+                "source_2_gain": rng.uniform(0.1, 0.5),
+                "noise_path": rng.choice(noise_paths),
+                "noise_gain": rng.uniform(0.3, 2.5),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def librimix_repository(
+    dir: Path, upstream: Upstream, num_cuts: int, rng: np.random.Generator
+) -> None:
+    """LibriMix repository with Libri2Mix metadata, plus its LibriSpeech and WHAM!"""
+    flac_paths = librispeech_archives(
+        dir, upstream, Libri2MixClean().download_url, num_cuts, rng
+    )
+    noise_paths = wham_archive(dir, upstream, max(3, num_cuts // 4), rng)
+
+    metadata_dir = dir / "LibriMix" / "metadata" / "Libri2Mix"
+    metadata_dir.mkdir(parents=True)
+    for subset, paths in flac_paths.items():
+        wham_subset = {"train": "tr", "dev": "cv", "test": "tt"}[subset.split("-")[0]]
+        subset_noise_paths = [
+            path for path in noise_paths if path.startswith(f"{wham_subset}/")
+        ]
+        df = mixture_rows(
+            paths,
+            subset_noise_paths,
+            len(paths),
+            rng,
+            speaker=lambda path: path.split("/")[1],
+            mixture_id=lambda p1, p2: f"{Path(p1).stem}_{Path(p2).stem}",
+        )
+        df.to_csv(metadata_dir / f"libri2mix_{subset}.csv", index=False)
+        df[["mixture_ID"]].to_csv(
+            metadata_dir / f"libri2mix_{subset}_info.csv", index=False
+        )
+
+    repo_dir = bare_repository(dir / "LibriMix", dir / "LibriMix.git")
+    upstream.add_dir(Libri2MixClean().url, repo_dir)
+
+
+def librispeech(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    librispeech_archives(dir, upstream, LibriSpeech().download_url, num_cuts, rng)
+    return LibriSpeech()
+
+
+def libritts_r(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    download_url = {
+        subset.replace("_", "-"): url
+        for subset, url in LibriTTSR().download_url.items()
+    }
+    libritts_r_archives(dir, upstream, download_url, num_cuts, rng)
+    return LibriTTSR()
+
+
+def libri2mix_clean(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    librimix_repository(dir, upstream, num_cuts, np.random.default_rng(0))
+    return Libri2MixClean()
+
+
+def libri2mix_with_noise(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    librimix_repository(dir, upstream, num_cuts, np.random.default_rng(0))
+    return Libri2MixWithNoise()
+
+
+def libritts_r_mix_clean(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    corpus = LibriTTSRMixClean(metadata_dir=dir / "libritts_r_mix")
+    # the packaged metadata covers every subset but train-clean-360
+    download_url = {
+        subset: url
+        for subset, url in corpus.download_url.items()
+        if subset != "train-clean-360"
+    }
+    wav_paths = libritts_r_archives(dir, upstream, download_url, num_cuts, rng)
+
+    corpus.metadata_dir.mkdir(parents=True)
+    for subset, paths in wav_paths.items():
+        df = mixture_rows(
+            paths,
+            ["cv/404c020j_1.6643_40fa0105_-1.6643.wav"],
+            len(paths),
+            rng,
+            speaker=lambda path: path.split("/")[1],
+            mixture_id=lambda p1, p2: f"{Path(p1).name}_{Path(p2).name}",
+        )
+        df.to_csv(corpus.metadata_dir / f"librittsr2mix_{subset}.csv", index=False)
+    return corpus
+
+
+def libritts_r_mix_large(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    shar_dir = dir / "libritts_r_shar"
+    shar_dir.mkdir(parents=True)
+    subsets = ["test_clean", "dev_clean", "train_clean_100", "train_clean_360"]
+    with SharWriter(str(shar_dir), fields={"recording": "flac"}) as writer:
+        for subset in subsets:
+            # pairs are drawn with probability 0.01, so every subset needs many cuts
+            for i in range(num_cuts):
+                speaker = str(100 + i % 5)
+                stem = f"{speaker}_1000_{i:06d}_000000"
+                recording = recording_from_bytes(
+                    audio(rng, 24000, min_seconds=3.5, max_seconds=8.0), stem
+                )
+                supervision = lhotse.SupervisionSegment(
+                    id=f"segment_libritts_r_{subset}_{stem}",
+                    recording_id=recording.id,
+                    start=0,
+                    duration=recording.duration,
+                    channel=0,
+                    text=f"Some words of utterance {i}.",
+                    speaker=speaker,
+                    custom={"subset": subset, "original_text": "Some words."},
+                )
+                cut = lhotse.MonoCut(
+                    id=f"libritts_r_{subset}_{stem}",
+                    start=0,
+                    duration=recording.duration,
+                    channel=0,
+                    supervisions=[supervision],
+                    recording=recording,
+                )
+                writer.write(cut)
+
+    num_mixtures = max(1, num_cuts // 8)
+    return LibriTTSRMixLarge(
+        shar_dir,
+        num_test_clean=num_mixtures,
+        num_dev_clean=num_mixtures,
+        num_train_clean_100=num_mixtures,
+        num_train_clean_360=num_mixtures,
+    )
+
+
+def jvs(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    members = {
+        "jvs_ver1/gender_f0range.txt": b"speaker Male_or_Female minf0[Hz] maxf0[Hz]\n"
+    }
+    counts = split(num_cuts, 6)
+    for i in range(3):
+        speaker_id = f"jvs{i + 1:03d}"
+        gender = "M" if i % 2 == 0 else "F"
+        members["jvs_ver1/gender_f0range.txt"] += (
+            f"{speaker_id} {gender} 70 250\n".encode()
+        )
+        for j, utter_type in enumerate(["parallel100", "nonpara30"]):
+            utter_dir = f"jvs_ver1/{speaker_id}/{utter_type}"
+            lines = []
+            for k in range(counts[2 * i + j]):
+                name = f"VOICEACTRESS100_{k + 1:03d}"
+                lines.append(f"{name}:テキスト{k}")
+                members[f"{utter_dir}/wav24kHz16bit/{name}.wav"] = audio(rng, 24000)
+            # one transcript line has no audio, as in the real corpus
+            lines.append("VOICEACTRESS100_999:音声なし")
+            members[f"{utter_dir}/transcripts_utf8.txt"] = "\n".join(lines).encode()
+    path = write_zip(dir / "jvs.zip", members)
+    upstream.add_file(JVS().download_url, path)
+    return JVS()
+
+
+def jvnv(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    members = {}
+    emotions = ["anger", "happy", "sad"]
+    num_utterances = -(-num_cuts // (4 * len(emotions)))
+    lines = []
+    for emotion in emotions:
+        for k in range(num_utterances):
+            lines.append(f"{emotion}_free_{k + 1:02d}|ふふっ|ふふっ、テキスト{k}")
+    members["jvnv_v1/transcription.csv"] = "\n".join(lines).encode()
+    for speaker in ["F1", "F2", "M1", "M2"]:
+        for line in lines:
+            utterance = line.split("|")[0]
+            audio_id = f"{speaker}_{utterance}"
+            emotion = utterance.split("_")[0]
+            members[f"jvnv_v1/{speaker}/{emotion}/free/{audio_id}.wav"] = audio(
+                rng, 48000
+            )
+            members[f"jvnv_v1/nv_label/{speaker}/{audio_id}.txt"] = (
+                "0.500 0.900 ふふっ\n".encode()
+            )
+    path = write_zip(dir / "jvnv.zip", members)
+    upstream.add_file(JVNV().download_url, path)
+    return JVNV()
+
+
+def daily_talk(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    members = {}
+    for dialogue, num_turns in enumerate(split(num_cuts, max(1, num_cuts // 8))):
+        for turn in range(num_turns):
+            stem = f"dailytalk/data/{dialogue}/{turn}_{turn % 2}_d{dialogue}"
+            members[f"{stem}.wav"] = audio(rng, 22050)
+            members[f"{stem}.txt"] = f"some words of turn {turn}".encode()
+    path = write_zip(dir / "dailytalk.zip", members)
+    upstream.add_file(DailyTalk().download_url, path)
+    return DailyTalk()
+
+
+def hi_fi_captain(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    corpus = HiFiCAPTAIN()
+    counts = split(num_cuts, 2 * len(corpus.download_url))
+    for i, (lang_gender, download_url) in enumerate(corpus.download_url.items()):
+        members = {}
+        for j, dataset_type in enumerate(["train_parallel", "dev"]):
+            lines = []
+            for k in range(counts[2 * i + j]):
+                name = f"{dataset_type}_{k:05d}"
+                lines.append(f"{name} some words of utterance {k}")
+                wav_path = f"hfc_{lang_gender}/wav/{dataset_type}/{name}.wav"
+                members[wav_path] = audio(rng, 48000)
+            text_path = f"hfc_{lang_gender}/text/{dataset_type}.txt"
+            members[text_path] = "\n".join(lines).encode()
+        path = write_zip(dir / f"hfc_{lang_gender}.zip", members)
+        upstream.add_file(download_url, path)
+    return corpus
+
+
+def demand(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    corpus = DEMAND()
+    counts = split(num_cuts, len(corpus.download_urls))
+    for download_url, num_channels in zip(corpus.download_urls, counts):
+        filename = download_url.split("/")[-1].split("?")[0]
+        environment = filename.split("_")[0]
+        members = {
+            f"{environment}/ch{i + 1:02d}.wav": audio(rng, 48000)
+            for i in range(num_channels)
+        }
+        path = write_zip(dir / filename, members)
+        upstream.add_file(download_url, path)
+    return corpus
+
+
+def jsut(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    members = {}
+    for subset, num_subset_cuts in zip(
+        ["basic5000", "onomatopee300"], split(num_cuts, 2)
+    ):
+        lines = []
+        for k in range(num_subset_cuts):
+            name = f"{subset.upper()}_{k + 1:04d}"
+            lines.append(f"{name}:テキスト{k}")
+            members[f"jsut_ver1.1/{subset}/wav/{name}.wav"] = audio(rng, 48000)
+        members[f"jsut_ver1.1/{subset}/transcript_utf8.txt"] = "\n".join(lines).encode()
+    path = write_zip(dir / "jsut_ver1.1.zip", members)
+    upstream.add_file(JSUT().download_url, path)
+    return JSUT()
+
+
+def wham_noise(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    wham_archive(dir, upstream, num_cuts, np.random.default_rng(0))
+    return WhamNoise()
+
+
+def talkbank_pages(
+    dir: Path,
+    upstream: Upstream,
+    login_url: str,
+    page_urls: list[str],
+    num_cuts: int,
+    rng: np.random.Generator,
+) -> None:
+    """Talkbank media listings linking to stereo 8 kHz telephone calls"""
+    login_path = dir / "login"
+    login_path.parent.mkdir(parents=True, exist_ok=True)
+    login_path.touch()
+    upstream.add_file(login_url, login_path)
+    for i, (page_url, num_page_cuts) in enumerate(
+        zip(page_urls, split(num_cuts, len(page_urls)))
+    ):
+        links = []
+        for k in range(num_page_cuts):
+            path = dir / f"{i}" / f"{4000 + k}.wav"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(
+                audio(rng, 8000, num_channels=2, min_seconds=10.0, max_seconds=30.0)
+            )
+            link = f"{page_url}/{path.name}?f=save"
+            upstream.add_file(link, path)
+            links.append(f'<a href="{link}">{path.name}</a>')
+        page_path = dir / f"{i}" / "index.html"
+        page_path.write_text(f"<html><body>{''.join(links)}</body></html>")
+        upstream.add_file(page_url, page_path)
+
+
+def callhome_en(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    corpus = CallHomeEn("user@example.com", "password")
+    talkbank_pages(
+        dir,
+        upstream,
+        corpus.login_url,
+        [corpus.download_page_url],
+        num_cuts,
+        np.random.default_rng(0),
+    )
+    return corpus
+
+
+def callhome_jp(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    corpus = CallHomeJP("user@example.com", "password")
+    talkbank_pages(
+        dir,
+        upstream,
+        corpus.login_url,
+        [corpus.download_page_url],
+        num_cuts,
+        np.random.default_rng(0),
+    )
+    return corpus
+
+
+def callfriend_jp(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    corpus = CallFriendJP("user@example.com", "password")
+    talkbank_pages(
+        dir,
+        upstream,
+        corpus.login_url,
+        list(corpus.download_page_url.values()),
+        num_cuts,
+        np.random.default_rng(0),
+    )
+    return corpus
+
+
+def hq_youtube(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    members = {
+        f"hq_youtube/{i // 10:03d}/{i:08d}.flac": audio(rng, 16000, format="FLAC")
+        for i in range(num_cuts)
+    }
+    path = write_tar(dir / "hq_youtube.tar", members, mode="w")
+    return HQYouTube(str(path))
+
+
+def jis(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    for i, num_speaker_cuts in enumerate(split(num_cuts, 4)):
+        speaker_dir = dir / "jis" / f"group{i // 2}" / f"speaker{i}_read"
+        speaker_dir.mkdir(parents=True)
+        for k in range(num_speaker_cuts):
+            (speaker_dir / f"speaker{i}_{k:04d}.wav").write_bytes(audio(rng, 48000))
+    return JIS(dir / "jis")
+
+
+def reazon_speech(dir: Path, upstream: Upstream, num_cuts: int) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    audio_dir = dir / "reazonspeech" / "audio"
+    audio_dir.mkdir(parents=True)
+    names, paths, transcriptions = [], [], []
+    for i in range(num_cuts):
+        name = f"{i // 10:03d}/{i:012x}.flac"
+        path = audio_dir / name.replace("/", "_")
+        path.write_bytes(audio(rng, 16000, format="FLAC"))
+        names.append(name)
+        paths.append({"path": str(path)})
+        transcriptions.append(f"テキスト{i}")
+    ds = DatasetDict(
+        {
+            "train": Dataset.from_dict(
+                {"name": names, "audio": paths, "transcription": transcriptions}
+            )
+        }
+    )
+    ds.save_to_disk(str(dir / "reazonspeech" / "dataset"))
+    upstream.add_dataset(
+        "reazon-research/reazonspeech", dir / "reazonspeech" / "dataset"
+    )
+    return ReazonSpeech("tiny")
+
+
+def mit_environmental_impulse_responses(
+    dir: Path, upstream: Upstream, num_cuts: int
+) -> BaseCorpus:
+    rng = np.random.default_rng(0)
+    audio_dir = dir / "mit_ir" / "audio"
+    audio_dir.mkdir(parents=True)
+    paths = []
+    for i in range(num_cuts):
+        path = audio_dir / f"h{i:03d}_Room_{i}txts.wav"
+        path.write_bytes(audio(rng, 32000, min_seconds=0.5, max_seconds=2.0))
+        paths.append({"path": str(path)})
+    ds = DatasetDict({"train": Dataset.from_dict({"audio": paths})})
+    ds.save_to_disk(str(dir / "mit_ir" / "dataset"))
+    upstream.add_dataset(
+        "davidscripka/MIT_environmental_impulse_responses", dir / "mit_ir" / "dataset"
+    )
+    return MITEnvironmentalImpulseResponses()
+
+
+FIXTURES: dict[str, Fixture] = {
+    "callfriend_jp": callfriend_jp,
+    "callhome_en": callhome_en,
+    "callhome_jp": callhome_jp,
+    "daily_talk": daily_talk,
+    "demand": demand,
+    "hi_fi_captain": hi_fi_captain,
+    "hq_youtube": hq_youtube,
+    "jis": jis,
+    "jsut": jsut,
+    "jvnv": jvnv,
+    "jvs": jvs,
+    "libri2mix_clean": libri2mix_clean,
+    "libri2mix_with_noise": libri2mix_with_noise,
+    "librispeech": librispeech,
+    "libritts_r": libritts_r,
+    "libritts_r_mix_clean": libritts_r_mix_clean,
+    "libritts_r_mix_large": libritts_r_mix_large,
+    "mit_environmental_impulse_responses": mit_environmental_impulse_responses,
+    "reazon_speech": reazon_speech,
+    "wham_noise": wham_noise,
+}
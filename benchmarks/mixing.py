@@ -0,0 +1,77 @@
+import argparse
+import io
+import time
+
+import numpy as np
+import soundfile as sf
+
+from lhotse_dataset.mixing import Mixer, wav_bytes
+
+
+def make_mixtures(
+    num_mixtures: int, num_channels: int, sampling_rate: int
+) -> list[tuple[list[np.ndarray], list[float]]]:
+    """Sources of 3 to 15 seconds as decoded by `sf.read`, with LibriMix-like gains"""
+    rng = np.random.default_rng(0)
+    return [
+        (
+            [
+                rng.uniform(-0.1, 0.1, int(rng.uniform(3, 15) * sampling_rate))
+                for _ in range(num_channels)
+            ],
+            list(rng.uniform(0.2, 2.0, num_channels)),
+        )
+        for _ in range(num_mixtures)
+    ]
+
+
+def mix_per_mixture(sources: list[np.ndarray], gains: list[float]) -> np.ndarray:
+    """What the corpora did before the shared mixer"""
+    wav_len = max(source.shape[0] for source in sources)
+    wav = np.zeros((len(sources), wav_len), dtype=sources[0].dtype)
+    for channel, (source, gain) in enumerate(zip(sources, gains)):
+        wav[channel, : source.shape[0]] = source * gain
+    return wav
+
+
+def measure(name: str, fn, num_mixtures: int) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<40} {elapsed / num_mixtures * 1e6:10.1f} us/mixture")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_mixtures", type=int, default=256)
+    parser.add_argument("--num_channels", type=int, default=3)
+    parser.add_argument("--sampling_rate", type=int, default=16000)
+    args = parser.parse_args()
+
+    mixtures = make_mixtures(args.num_mixtures, args.num_channels, args.sampling_rate)
+    mixtures_f32 = [
+        ([source.astype(np.float32) for source in sources], gains)
+        for sources, gains in mixtures
+    ]
+    print(f"{args.num_mixtures} mixtures of {args.num_channels} channels")
+
+    def baseline(encode: bool) -> None:
+        for sources, gains in mixtures:
+            wav = mix_per_mixture(sources, gains)
+            if encode:
+                buf = io.BytesIO()
+                sf.write(buf, wav.T, args.sampling_rate, format="WAV")
+
+    def mixer(encode: bool) -> None:
+        mixer = Mixer(args.num_channels)
+        for sources, gains in mixtures_f32:
+            wav = mixer.mix(sources, gains)
+            if encode:
+                wav_bytes(wav, args.sampling_rate)
+
+    for encode in [False, True]:
+        suffix = " + WAV" if encode else ""
+        measure(
+            f"np.zeros float64{suffix}", lambda: baseline(encode), args.num_mixtures
+        )
+        measure(f"Mixer float32{suffix}", lambda: mixer(encode), args.num_mixtures)
@@ -0,0 +1,63 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import lhotse
+import numpy as np
+import soundfile as sf
+from tqdm import tqdm
+
+from lhotse_dataset.probe import recording_from_bytes, recording_from_file
+
+
+def make_files(dir: Path, num_files: int, format: str) -> list[Path]:
+    """Write LibriSpeech-like utterances: 16 kHz mono, 2 to 35 seconds"""
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in tqdm(range(num_files), desc="writing"):
+        num_samples = int(rng.uniform(2, 35) * 16000)
+        samples = rng.uniform(-0.1, 0.1, num_samples)
+        path = dir / f"{i:06d}.{format}"
+        sf.write(path, samples, 16000, format=format.upper())
+        paths.append(path)
+    return paths
+
+
+def measure(name: str, fn, items: list) -> None:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<40} {elapsed / len(items) * 1e6:10.1f} us/file")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_files", type=int, default=1000)
+    parser.add_argument("--dir", type=str, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for format in ["flac", "wav"]:
+            if args.dir is not None:
+                paths = sorted(Path(args.dir).glob(f"**/*.{format}"))
+            else:
+                paths = make_files(Path(tmp_dir), args.num_files, format)
+            if not paths:
+                continue
+            data = [path.read_bytes() for path in paths]
+            print(f"{len(paths)} {format} files")
+
+            measure("Recording.from_file", lhotse.Recording.from_file, paths)
+            measure("recording_from_file", recording_from_file, paths)
+            measure(
+                "Recording.from_bytes",
+                lambda d: lhotse.Recording.from_bytes(d, "recording"),
+                data,
+            )
+            measure(
+                "recording_from_bytes",
+                lambda d: recording_from_bytes(d, "recording"),
+                data,
+            )
@@ -0,0 +1,64 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from lhotse_dataset.recipes import RecipeTable
+
+
+def write_csv(path: Path, num_rows: int, num_sources: int) -> None:
+    """LibriMix-like recipes drawing from `num_sources` utterances"""
+    rng = np.random.default_rng(0)
+    paths = np.array(
+        [
+            f"train-clean-360/{i}/{i * 7}/{i}_{i * 7}_{i:06d}_000000.wav"
+            for i in range(num_sources)
+        ]
+    )
+    source_1, source_2 = rng.integers(0, num_sources, (2, num_rows))
+    pd.DataFrame(
+        {
+            "mixture_ID": [f"{a}_{b}" for a, b in zip(source_1, source_2)],
+            "source_1_path": paths[source_1],
+            "source_1_gain": rng.uniform(0.1, 1.0, num_rows),
+            "source_2_path": paths[source_2],
+            "source_2_gain": rng.uniform(0.1, 1.0, num_rows),
+        }
+    ).to_csv(path, index=False)
+
+
+def measure(name: str, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    print(f"{name:<40} {time.perf_counter() - start:10.3f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_rows", type=int, default=1_000_000)
+    parser.add_argument("--num_sources", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["LHOTSE_DATASET_CACHE_DIR"] = str(Path(tmp_dir) / "cache")
+        csv_path = Path(tmp_dir) / "recipes.csv"
+        write_csv(csv_path, args.num_rows, args.num_sources)
+        print(f"{args.num_rows} recipes, {csv_path.stat().st_size / 1e6:.1f} MB of CSV")
+
+        measure("pd.read_csv", lambda: pd.read_csv(csv_path))
+        df = pd.read_csv(csv_path)
+        measure("itertuples", lambda: sum(1 for _ in df.itertuples()))
+        measure(
+            "RecipeTable.from_csv, converting", lambda: RecipeTable.from_csv(csv_path)
+        )
+        measure(
+            "RecipeTable.from_csv, converted", lambda: RecipeTable.from_csv(csv_path)
+        )
+        table = RecipeTable.from_csv(csv_path)
+        measure("RecipeTable.rows", lambda: sum(1 for _ in table.rows()))
+        size = sum(p.stat().st_size for p in table.path.iterdir())
+        print(f"{size / 1e6:.1f} MB of recipe table")
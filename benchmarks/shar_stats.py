@@ -0,0 +1,72 @@
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from lhotse import CutSet
+
+from lhotse_dataset.shar_stats import cut_paths, shar_stats
+
+
+def write_manifests(shar_dir: Path, num_shards: int, shard_size: int) -> None:
+    """Cut manifests of shar shards, without audio or sidecars"""
+    rng = np.random.default_rng(0)
+    for shard in range(num_shards):
+        with gzip.open(shar_dir / f"cuts.{shard:06d}.jsonl.gz", "wt") as f:
+            for i, duration in enumerate(rng.uniform(1.0, 20.0, shard_size)):
+                cut_id = f"cut_{shard}_{i}"
+                cut = {
+                    "id": cut_id,
+                    "start": 0,
+                    "duration": round(float(duration), 3),
+                    "channel": 0,
+                    "supervisions": [
+                        {
+                            "id": cut_id,
+                            "recording_id": cut_id,
+                            "start": 0,
+                            "duration": round(float(duration), 3),
+                            "speaker": f"spk_{rng.integers(1000)}",
+                            "gender": "F" if i % 2 else "M",
+                            "language": "ja",
+                        }
+                    ],
+                    "custom": {"subset": "train" if shard % 10 else "dev"},
+                    "type": "MonoCut",
+                }
+                print(json.dumps(cut), file=f)
+
+
+def measure(name: str, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    print(f"{name:<40} {time.perf_counter() - start:10.3f} s")
+
+
+def load_shar_hours(shar_dir: Path) -> float:
+    """What scripts/load_shar.py does, without the recording field"""
+    cuts = CutSet.from_shar({"cuts": list(map(str, cut_paths(shar_dir)))})
+    return sum(cut.duration for cut in cuts.data) / 3600
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_shards", type=int, default=1000)
+    parser.add_argument("--shard_size", type=int, default=200)
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        shar_dir = Path(tmp_dir)
+        write_manifests(shar_dir, args.num_shards, args.shard_size)
+        print(f"{args.num_shards} shards of {args.shard_size} cuts")
+        measure("CutSet.from_shar", lambda: load_shar_hours(shar_dir))
+        measure("shar_stats, 1 worker", lambda: shar_stats(shar_dir))
+        measure(
+            f"shar_stats, {args.num_workers} workers",
+            lambda: shar_stats(shar_dir, num_workers=args.num_workers),
+        )
@@ -0,0 +1,179 @@
+import contextlib
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Generator
+from urllib.parse import urlsplit
+
+import datasets
+import requests
+
+
+class Upstream:
+    """Local stand-in for the hosts corpora download from
+
+    While serving, every request sent through `requests` (download_file, gdown and
+    the talkbank sessions) and every git clone from GitHub is answered from the
+    files added here, and `load_dataset` loads the datasets added here from disk.
+    Anything that was not added answers 404, so nothing reaches the network.
+    """
+
+    def __init__(self) -> None:
+        self.files: dict[str, Path] = {}
+        self.dirs: dict[str, Path] = {}
+        self.datasets: dict[str, Path] = {}
+
+    def add_file(self, url: str, path: Path) -> None:
+        self.files[url] = path
+
+    def add_dir(self, url: str, dir: Path) -> None:
+        """Serve the files under `dir` below `url`, e.g. a bare git repository"""
+        self.dirs[url.rstrip("/")] = dir
+
+    def add_dataset(self, name: str, dir: Path) -> None:
+        """Load `dir`, saved by `DatasetDict.save_to_disk`, for `load_dataset(name)`"""
+        self.datasets[name] = dir
+
+    def resolve(self, url: str) -> Path | None:
+        for key in (url, url.split("?")[0]):
+            if key in self.files:
+                return self.files[key]
+        path = url.split("?")[0]
+        for prefix, dir in self.dirs.items():
+            if path.startswith(prefix + "/"):
+                local_path = dir / path.removeprefix(prefix + "/")
+                if local_path.is_file():
+                    return local_path
+        return None
+
+    @contextlib.contextmanager
+    def serve(self) -> Generator[None, None, None]:
+        httpd = _Server(("127.0.0.1", 0), _Handler)
+        httpd.upstream = self  # type: ignore
+        base_url = f"http://127.0.0.1:{httpd.server_port}"
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+
+        send = requests.Session.send
+
+        def local_send(session, request, **kwargs):
+            if not request.url.startswith(base_url):
+                parts = urlsplit(request.url)
+                request.url = f"{base_url}/{parts.scheme}/{parts.netloc}{parts.path}"
+                if parts.query:
+                    request.url += f"?{parts.query}"
+            return send(session, request, **kwargs)
+
+        def load_dataset(name, *args, **kwargs):
+            if name not in self.datasets:
+                raise FileNotFoundError(f"Dataset {name} was not added to upstream")
+            return datasets.load_from_disk(str(self.datasets[name]))
+
+        env = {
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": f"url.{base_url}/https/github.com/.insteadOf",
+            "GIT_CONFIG_VALUE_0": "https://github.com/",
+            "GIT_TERMINAL_PROMPT": "0",
+        }
+        previous_env = {key: os.environ.get(key) for key in env}
+        os.environ.update(env)
+        requests.Session.send = local_send
+        # corpora import load_dataset by name, so patch it where it was imported
+        modules = [
+            module
+            for name, module in list(sys.modules.items())
+            if name.startswith("lhotse_dataset.") and hasattr(module, "load_dataset")
+        ]
+        previous_load_dataset = [module.load_dataset for module in modules]
+        for module in modules:
+            module.load_dataset = load_dataset
+        try:
+            yield
+        finally:
+            for module, fn in zip(modules, previous_load_dataset):
+                module.load_dataset = fn
+            requests.Session.send = send
+            for key, value in previous_env.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            httpd.shutdown()
+            httpd.server_close()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # clients probing the size hang up without reading the body
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self._respond(body=True)
+
+    def do_HEAD(self) -> None:
+        self._respond(body=False)
+
+    def do_POST(self) -> None:
+        # logins succeed for any URL that was added
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = self._resolve()
+        self.send_response(200 if path is not None else 404)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _resolve(self) -> Path | None:
+        scheme, _, rest = self.path.lstrip("/").partition("/")
+        upstream: Upstream = self.server.upstream  # type: ignore
+        return upstream.resolve(f"{scheme}://{rest}")
+
+    def _respond(self, body: bool) -> None:
+        path = self._resolve()
+        if path is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        range_header = self.headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start = int(first) if first else max(size - int(last), 0)
+            end = min(int(last), size - 1) if first and last else size - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Disposition", f'attachment; filename="{path.name}"')
+        if path.suffix in (".html", ".htm"):
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+        else:
+            self.send_header("Content-Type", "application/octet-stream")
+        self.end_headers()
+        if not body:
+            return
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(remaining, 1024**2))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
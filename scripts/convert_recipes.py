@@ -0,0 +1,14 @@
+import argparse
+from pathlib import Path
+
+from lhotse_dataset.recipes import RecipeTable
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv_paths", type=str, nargs="+", required=True)
+    parser.add_argument("--output_dir", type=str, required=True)
+    args = parser.parse_args()
+
+    for csv_path in map(Path, args.csv_paths):
+        table = RecipeTable.convert(csv_path, Path(args.output_dir) / csv_path.stem)
+        print(f"{csv_path}: {len(table)} recipes -> {table.path}")
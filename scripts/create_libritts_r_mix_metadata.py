@@ -6,52 +6,155 @@ import pandas as pd
 from lhotse import CutSet
 from tqdm import tqdm
 
+from lhotse_dataset.pairs import PairSampler
 
-def main(shar_dir: Path) -> None:
+# LibriTTS-R subsets as named in the shar and in the metadata files
+SUBSETS = {
+    "dev_clean": "dev-clean",
+    "test_clean": "test-clean",
+    "train_clean_100": "train-clean-100",
+    "train_clean_360": "train-clean-360",
+}
+# WHAM! noise directories by the WhamNoise subset and the LibriTTS-R subset prefix
+WHAM_DIRS = {"train": "tr", "validation": "cv", "test": "tt", "dev": "cv"}
+# the sizes of the packaged data/libritts_r_mix metadata
+NUM_MIXTURES = {"dev_clean": 3000, "test_clean": 3000, "train_clean_100": 11000}
+
+# LibriMix draws target loudnesses in these ranges (LUFS) and measures the sources
+# to get gains. Measuring would need every source decoded, so the sources are
+# assumed to have the mean loudness implied by the packaged metadata instead.
+SPEECH_TARGET_LUFS = (-33.0, -25.0)
+NOISE_TARGET_LUFS = (-38.0, -30.0)
+SPEECH_LUFS = -19.0
+NOISE_LUFS = -38.0
+
+
+def load_cuts(shar_dir: Path) -> dict[str, list]:
+    """Cuts of each subset, longest first, reading only the cut manifests"""
     cut_paths = sorted(list(map(str, shar_dir.glob("cuts.*.jsonl.gz"))))
-    recording_paths = sorted(list(map(str, shar_dir.glob("recording.*.tar"))))
-
-    cuts = CutSet.from_shar({"cuts": cut_paths, "recording": recording_paths})
-    cuts = cuts.filter(lambda c: c.duration >= 3.0)  # type: ignore
-    cuts = cuts.filter(lambda c: c.duration < 20.0)  # type: ignore
-    cuts = cuts.filter(lambda c: len(c.supervisions) > 0)  # type: ignore
-
-    subsets_samples = {
-        "test_clean": 5000,
-        "dev_clean": 5000,
-        "train_clean_100": 100000,
-        "train_clean_360": 300000,
-    }
-
-    metadata_path = Path("src/lhotse_dataset/data/libritts_r_mix_large")
-    metadata_path.mkdir(parents=True, exist_ok=True)
-
-    for subset, samples in subsets_samples.items():
-        cuts_subset = cuts.filter(
-            lambda s: s.supervisions[0].custom["subset"] == subset  # type: ignore
-        )
-        cuts_subset = cuts_subset.sort_by_duration()
+    cuts: dict[str, list] = {}
+    for cut in tqdm(CutSet.from_shar({"cuts": cut_paths}), desc=str(shar_dir)):
+        if len(cut.supervisions) == 0:
+            continue
+        subset = cut.supervisions[0].custom["subset"]
+        cuts.setdefault(subset, []).append(cut)
+    for subset_cuts in cuts.values():
+        subset_cuts.sort(key=lambda cut: cut.duration, reverse=True)
+    return cuts
+
+
+def source_path(cut, subset: str) -> str:
+    stem = cut.recording.id
+    speaker_id, chapter_id = stem.split("_")[:2]
+    return f"{SUBSETS[subset]}/{speaker_id}/{chapter_id}/{stem}.wav"
+
 
-        metadata = []
-        for cut_1 in tqdm(cuts_subset.data):
-            for cut_2 in cuts_subset.data:
-                if cut_1.duration < cut_2.duration:
-                    continue
-                if cut_1.supervisions[0].speaker == cut_2.supervisions[0].speaker:
-                    continue
+def gains(rng: np.random.Generator, target: tuple[float, float], lufs: float, n: int):
+    return 10 ** ((rng.uniform(*target, n) - lufs) / 20)
 
-                i = np.random.uniform(0, 1)
-                if i < 0.001:
-                    metadata.append(dict(id_1=cut_1.id, id_2=cut_2.id))
 
-        df = pd.DataFrame(metadata)
-        df = df.sample(n=min(samples, len(df)), random_state=42)
-        df.to_csv(metadata_path / f"{subset}.csv", index=False)
+def create_metadata(
+    cuts: list,
+    subset: str,
+    num_mixtures: int,
+    noise_paths: list[str],
+    rng: np.random.Generator,
+    min_duration: float = 3.0,
+    max_duration: float = 20.0,
+    speaker_balanced: bool = False,
+) -> pd.DataFrame:
+    """Mix `num_mixtures` distinct pairs of different speakers, the first longer"""
+    cuts = [cut for cut in cuts if min_duration <= cut.duration < max_duration]
+    sampler = PairSampler(
+        np.array([cut.duration for cut in cuts]),
+        [cut.supervisions[0].speaker for cut in cuts],
+    )
+    pairs = sampler.uniform(num_mixtures, rng, speaker_balanced)
+    paths = np.array([source_path(cut, subset) for cut in cuts])
+    names = np.array([f"{cut.recording.id}.wav" for cut in cuts], dtype=object)
+
+    num_rows = len(pairs)
+    if noise_paths:
+        noise = np.array(noise_paths)[rng.integers(0, len(noise_paths), num_rows)]
+        noise_gain = gains(rng, NOISE_TARGET_LUFS, NOISE_LUFS, num_rows)
+    else:
+        noise = np.full(num_rows, "")
+        noise_gain = np.zeros(num_rows)
+
+    return pd.DataFrame(
+        {
+            "mixture_ID": names[pairs[:, 0]] + "_" + names[pairs[:, 1]],
+            "source_1_path": paths[pairs[:, 0]],
+            "source_1_gain": gains(rng, SPEECH_TARGET_LUFS, SPEECH_LUFS, num_rows),
+            "source_2_path": paths[pairs[:, 1]],
+            "source_2_gain": gains(rng, SPEECH_TARGET_LUFS, SPEECH_LUFS, num_rows),
+            "noise_path": noise,
+            "noise_gain": noise_gain,
+        }
+    )
+
+
+def load_noise_paths(wham_shar_dir: Path | None) -> dict[str, list[str]]:
+    """WHAM! noise paths below wham_noise/ per directory (tr, cv, tt)"""
+    if wham_shar_dir is None:
+        return {}
+    cut_paths = sorted(list(map(str, wham_shar_dir.glob("cuts.*.jsonl.gz"))))
+    noise_paths: dict[str, list[str]] = {}
+    for cut in CutSet.from_shar({"cuts": cut_paths}):
+        dir = WHAM_DIRS[cut.custom["subset"]]
+        noise_paths.setdefault(dir, []).append(f"{dir}/{cut.id}.wav")
+    for paths in noise_paths.values():
+        paths.sort()
+    return noise_paths
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(
+        description="Write LibriTTS-R mixture metadata in the layout read by "
+        "LibriTTSRMixClean"
+    )
     parser.add_argument("--shar_dir", type=str, required=True)
+    parser.add_argument("--wham_shar_dir", type=str, default=None)
+    parser.add_argument(
+        "--output_dir", type=str, default="src/lhotse_dataset/data/libritts_r_mix"
+    )
+    parser.add_argument(
+        "--num_mixtures",
+        type=str,
+        nargs="+",
+        default=[f"{subset}={n}" for subset, n in NUM_MIXTURES.items()],
+        help="SUBSET=N for each subset to write, e.g. train_clean_360=300000",
+    )
+    parser.add_argument("--min_duration", type=float, default=3.0)
+    parser.add_argument("--max_duration", type=float, default=20.0)
+    parser.add_argument("--speaker_balanced", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
     args = parser.parse_args()
-    shar_dir = Path(args.shar_dir)
-    main(shar_dir)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cuts = load_cuts(Path(args.shar_dir))
+    wham_shar_dir = Path(args.wham_shar_dir) if args.wham_shar_dir else None
+    noise_paths = load_noise_paths(wham_shar_dir)
+
+    for item in args.num_mixtures:
+        subset, num_mixtures = item.split("=")
+        if subset not in cuts:
+            print(f"Warning: No cuts of subset {subset}")
+            continue
+        # every subset gets its own stream, so adding one leaves the others alike
+        rng = np.random.default_rng([args.seed, list(SUBSETS).index(subset)])
+        wham_dir = WHAM_DIRS[subset.split("_")[0]]
+        df = create_metadata(
+            cuts[subset],
+            subset,
+            int(num_mixtures),
+            noise_paths.get(wham_dir, []),
+            rng,
+            min_duration=args.min_duration,
+            max_duration=args.max_duration,
+            speaker_balanced=args.speaker_balanced,
+        )
+        path = output_dir / f"librittsr2mix_{SUBSETS[subset]}.csv"
+        df.to_csv(path, index=False)
+        print(f"{len(df)} mixtures written to {path}")
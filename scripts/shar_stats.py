@@ -0,0 +1,24 @@
+import argparse
+import os
+from pathlib import Path
+
+from lhotse_dataset.shar_stats import shar_stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Hours, cut counts and duration histograms of a shar directory"
+    )
+    parser.add_argument("--shar_dir", type=str, required=True)
+    parser.add_argument("--num_workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max_rows", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print JSON, not a table")
+    parser.add_argument("--output", type=str, help="also save the JSON to this path")
+    args = parser.parse_args()
+
+    stats = shar_stats(Path(args.shar_dir), num_workers=args.num_workers)
+    if args.output is not None:
+        Path(args.output).write_text(stats.model_dump_json(indent=2), "utf-8")
+    if args.json:
+        print(stats.model_dump_json(indent=2))
+    else:
+        print(stats.table(max_rows=args.max_rows))
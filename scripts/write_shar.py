@@ -3,13 +3,36 @@ from pathlib import Path
 import hydra
 from omegaconf import DictConfig
 
+from lhotse_dataset.buckets import BucketConfig
+from lhotse_dataset.instrumentation import InstrumentationConfig
+from lhotse_dataset.shar import ShardRollover
+from lhotse_dataset.shuffle import ShuffleConfig
+
 
 @hydra.main(config_path="../config", config_name="default", version_base=None)
 def main(cfg: DictConfig) -> None:
     corpus = hydra.utils.instantiate(cfg.data.corpus)
 
     output_dir = Path(cfg.data.shar_dir)
-    corpus.write_shar(output_dir)
+    rollover = None
+    if cfg.rollover is not None:
+        rollover = ShardRollover(**cfg.rollover)
+    buckets = None
+    if cfg.buckets is not None:
+        buckets = BucketConfig(**cfg.buckets)
+    shuffle = None
+    if cfg.shuffle is not None:
+        shuffle = ShuffleConfig(**cfg.shuffle)
+    corpus.write_shar(
+        output_dir,
+        shard_size=rollover,
+        num_workers=cfg.num_workers,
+        resume=cfg.resume,
+        passthrough=cfg.passthrough,
+        instrumentation=InstrumentationConfig(**cfg.instrumentation),
+        buckets=buckets,
+        shuffle=shuffle,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,169 @@
+import functools
+import io
+import mmap
+import struct
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import lhotse
+import soundfile as sf
+from lhotse.audio.source import AudioSource
+from pydantic import BaseModel
+
+from lhotse_dataset.instrumentation import stage
+from lhotse_dataset.probe import AudioHeader, probe
+from lhotse_dataset.sources import register_source
+
+LOCAL_HEADER_SIZE = 30
+MAX_OPEN_ZIP_FILES = 16
+
+ZIP_SOURCE_TYPE = "zip"
+
+
+class ZipMember(BaseModel):
+    """Where the audio of a zip member is, kept as the JSON `source` of its source"""
+
+    path: str
+    member: str
+    offset: int = 0
+    length: int = 0
+    stored: bool = False
+    format: str = ""
+
+
+@dataclass
+class ZipMemberSource(AudioSource):
+    """Audio stored as a member of a zip archive, read only when the audio is loaded
+
+    `ZIP_STORED` members are read through `mmap` at `offset`, other members are
+    decompressed lazily by `zipfile`.
+    """
+
+    @property
+    def zip_member(self) -> ZipMember:
+        return ZipMember.model_validate_json(self.source)
+
+    def _prepare_for_reading(self, offset, duration):
+        member = self.zip_member
+        if member.stored:
+            return MmapSlice(member.path, member.offset, member.length)
+        return open_zip(member.path).open(member.member)
+
+    def _get_format(self) -> str:
+        return self.zip_member.format
+
+
+register_source(ZIP_SOURCE_TYPE, ZipMemberSource)
+
+
+@functools.lru_cache(maxsize=MAX_OPEN_ZIP_FILES)
+def open_zip(path: str) -> zipfile.ZipFile:
+    """Handle on the archive at `path` shared by its members within the process"""
+    return zipfile.ZipFile(path)
+
+
+class MmapSlice(io.RawIOBase):
+    """Read-only file object over `length` bytes of `path` starting at `offset`"""
+
+    def __init__(self, path: str, offset: int, length: int) -> None:
+        # mmap offsets have to be aligned to the allocation granularity
+        start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(
+                f.fileno(),
+                offset + length - start,
+                access=mmap.ACCESS_READ,
+                offset=start,
+            )
+        self._start = offset - start
+        self._length = length
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = max(0, min(len(buffer), self._length - self._position))
+        begin = self._start + self._position
+        buffer[:size] = self._mmap[begin : begin + size]
+        self._position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._length
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if not self.closed:
+            self._mmap.close()
+        super().close()
+
+
+def recording_from_zip(
+    zip_file: zipfile.ZipFile, member: str, recording_id: str
+) -> lhotse.Recording:
+    """Recording of a zip member that is only read when its audio is loaded
+
+    The recording points at the archive, so its audio only loads while the
+    archive is in place: `get_cuts` of the corpora reads it from their downloads,
+    which last until the generator is closed.
+    """
+    assert zip_file.filename is not None
+    info = zip_file.getinfo(member)
+    # encrypted members can not be mapped, so they are decompressed like the rest
+    stored = info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1
+    member = ZipMember(
+        path=str(Path(zip_file.filename).resolve()),
+        member=member,
+        offset=data_offset(zip_file, info) if stored else 0,
+        length=info.file_size,
+        stored=stored,
+    )
+    source = ZipMemberSource(
+        type=ZIP_SOURCE_TYPE, channels=[], source=member.model_dump_json()
+    )
+
+    with stage("probe"), source._prepare_for_reading(0.0, None) as f:
+        # the known size, as seeking to the end would decompress the whole member
+        header = probe(f, size=info.file_size)
+        if header is None:
+            audio_info = sf.info(f)
+            header = AudioHeader(
+                format=audio_info.format.lower(),
+                sampling_rate=audio_info.samplerate,
+                num_channels=audio_info.channels,
+                num_samples=audio_info.frames,
+            )
+    member.format = header.format
+    source.channels = list(range(header.num_channels))
+    source.source = member.model_dump_json()
+
+    return lhotse.Recording(
+        id=recording_id,
+        sources=[source],
+        sampling_rate=header.sampling_rate,
+        num_samples=header.num_samples,
+        duration=header.duration,
+        channel_ids=source.channels,
+    )
+
+
+def data_offset(zip_file: zipfile.ZipFile, info: zipfile.ZipInfo) -> int:
+    """Offset of the member data, past the local file header"""
+    assert zip_file.filename is not None
+    with open(zip_file.filename, "rb") as f:
+        f.seek(info.header_offset)
+        header = f.read(LOCAL_HEADER_SIZE)
+    filename_length, extra_length = struct.unpack("<HH", header[26:30])
+    return info.header_offset + LOCAL_HEADER_SIZE + filename_length + extra_length
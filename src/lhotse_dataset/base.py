@@ -1,13 +1,40 @@
 import enum
+import multiprocessing
+import time
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Generator
+from typing import Generator, Iterable, TypeVar
 
 from lhotse.cut import Cut
-from lhotse.shar import SharWriter
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from tqdm import tqdm
 
+from lhotse_dataset.buckets import (
+    BucketConfig,
+    BucketedSharWriter,
+    BucketManifest,
+    finish_buckets,
+    merge_buckets,
+)
+from lhotse_dataset.instrumentation import (
+    Instrumentation,
+    InstrumentationConfig,
+    Report,
+)
+from lhotse_dataset.shar import (
+    Ledger,
+    ResumableSharWriter,
+    ShardRollover,
+    merge_shards,
+    remove_shar_dir,
+    state_dir,
+)
+from lhotse_dataset.shar_metadata import write_rollup
+from lhotse_dataset.shuffle import SHUFFLE_DIRNAME, ShuffleConfig, external_shuffle
+
+T = TypeVar("T")
+
 
 @enum.unique
 class Gender(enum.Enum):
@@ -27,23 +54,243 @@ class SpeakerInfo(BaseModel):
     gender: Gender
 
 
+class Partition(BaseModel):
+    """Work unit `index` out of `num_partitions` round-robin splits of a corpus"""
+
+    model_config = ConfigDict(frozen=True)
+
+    index: int = 0
+    num_partitions: int = 1
+
+    def includes(self, i: int) -> bool:
+        return i % self.num_partitions == self.index
+
+    def select(self, items: Iterable[T], start: int = 0) -> Generator[T, None, None]:
+        """Yield this partition's items; `start` is the global index of the first one"""
+        for i, item in enumerate(items, start):
+            if self.includes(i):
+                yield item
+
+
 class BaseCorpus(metaclass=ABCMeta):
     @abstractmethod
-    def get_cuts(self) -> Generator[Cut, None, None]:
-        pass
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[Cut, None, None]:
+        """Cuts of `partition` of the corpus
+
+        The audio of a cut may be read from the downloads of the generator, so it
+        only loads until the generator is closed. `write_shar` encodes every cut
+        before that; `cut.move_to_memory()` keeps one for longer.
+        """
 
     @property
     def shard_size(self) -> int:
         return 1000
 
-    def write_shar(self, output_dir: Path, shard_size: int | None = None) -> None:
+    @property
+    def shar_fields(self) -> dict[str, str]:
+        """Fields of `write_shar`; without "recording" only the manifests are written"""
+        return {"recording": "flac"}
+
+    def write_shar(
+        self,
+        output_dir: Path,
+        shard_size: int | ShardRollover | None = None,
+        num_workers: int = 1,
+        resume: bool = False,
+        passthrough: bool = True,
+        instrumentation: InstrumentationConfig = InstrumentationConfig(),
+        buckets: BucketConfig | None = None,
+        shuffle: ShuffleConfig | None = None,
+    ) -> Report:
+        """shard_size: cuts per shard, or byte and duration targets of each shard
+
+        The ledger, the partitions of the workers, the report and the profiles go
+        to the `state_dir` of `output_dir`, which holds nothing but the shards.
+        """
         output_dir.mkdir(parents=True, exist_ok=True)
+        work_dir = state_dir(output_dir)
+        work_dir.mkdir(exist_ok=True)
 
         if shard_size is None:
             shard_size = self.shard_size
 
-        with SharWriter(
-            str(output_dir), fields={"recording": "flac"}, shard_size=shard_size
-        ) as writer:
-            for cut in tqdm(self.get_cuts()):
-                writer.write(cut)
+        edges = None
+        if buckets is not None:
+            edges = self._bucket_edges(output_dir, buckets, resume)
+
+        if num_workers <= 1:
+            report = self._write_partition(
+                output_dir,
+                shard_size,
+                Partition(),
+                resume,
+                passthrough,
+                instrumentation,
+                work_dir,
+                edges,
+                shuffle,
+            )
+            self._finish(output_dir, edges)
+            if instrumentation.print_summary:
+                print(report.summary())
+            report.write(work_dir)
+            return report
+
+        # Each worker writes its partition into its own directory, and the shards are
+        # renumbered into one contiguous index range once every worker has finished.
+        partition_dirs = [work_dir / f"partition.{i:06d}" for i in range(num_workers)]
+        ledger = Ledger.for_dir(output_dir)
+        if resume:
+            if ledger.complete:
+                return Report()
+            existing_dirs = sorted(work_dir.glob("partition.??????"))
+            if existing_dirs and existing_dirs != partition_dirs:
+                raise ValueError(
+                    f"{output_dir} was written with {len(existing_dirs)} workers, "
+                    f"cannot resume with {num_workers}"
+                )
+        else:
+            ledger.reset()
+            for partition_dir in work_dir.glob("partition.??????"):
+                remove_shar_dir(partition_dir)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._write_partition,
+                    partition_dir,
+                    shard_size,
+                    Partition(index=i, num_partitions=num_workers),
+                    resume,
+                    passthrough,
+                    instrumentation,
+                    work_dir,
+                    edges,
+                    shuffle,
+                )
+                for i, partition_dir in enumerate(partition_dirs)
+            ]
+            report = Report()
+            for future in futures:
+                report = report.merge(future.result())
+
+        if edges is None:
+            merge_shards(partition_dirs, output_dir, ledger)
+        else:
+            merge_buckets(partition_dirs, output_dir, len(edges) + 1, resume)
+            ledger.mark_complete()
+        self._finish(output_dir, edges)
+        report.wall_seconds = time.perf_counter() - start
+        if instrumentation.print_summary:
+            print(report.summary())
+        report.write(work_dir)
+        return report
+
+    def _write_partition(
+        self,
+        output_dir: Path,
+        shard_size: int | ShardRollover,
+        partition: Partition,
+        resume: bool,
+        passthrough: bool = True,
+        instrumentation: InstrumentationConfig = InstrumentationConfig(),
+        report_dir: Path | None = None,
+        edges: list[float] | None = None,
+        shuffle: ShuffleConfig | None = None,
+    ) -> Report:
+        profile_path = None
+        if report_dir is not None:
+            profile_path = report_dir / f"profile_{partition.index:06d}"
+
+        with (
+            Instrumentation(instrumentation, profile_path) as timer,
+            self._open_writer(
+                output_dir, shard_size, resume, passthrough, edges
+            ) as writer,
+        ):
+            if writer.complete:
+                return timer.report
+
+            cuts = self.get_cuts(partition)
+            if shuffle is not None:
+                # partitions are round-robin splits, so each is spread over the
+                # whole corpus and shuffling it alone is enough
+                cuts = external_shuffle(
+                    cuts,
+                    state_dir(output_dir) / SHUFFLE_DIRNAME,
+                    self.shar_fields,
+                    shuffle.model_copy(update={"seed": shuffle.seed + partition.index}),
+                    passthrough,
+                    resume,
+                )
+            cuts = iter(writer.skip_committed(cuts))
+            pbar = tqdm(
+                desc=f"partition {partition.index}/{partition.num_partitions}",
+                position=partition.index,
+            )
+            while True:
+                with timer.stage("enumerate"):
+                    cut = next(cuts, None)
+                if cut is None:
+                    break
+                with timer.stage("write"):
+                    writer.write(cut)
+                timer.add_cut(cut.duration)
+                pbar.update()
+            pbar.close()
+
+        timer.count("passthrough", writer.stats.num_passthrough)
+        timer.count("transcoded", writer.stats.num_transcoded)
+        timer.count("encoded", writer.stats.num_encoded)
+        return timer.report
+
+    def _open_writer(
+        self,
+        output_dir: Path,
+        shard_size: int | ShardRollover,
+        resume: bool,
+        passthrough: bool,
+        edges: list[float] | None,
+    ) -> ResumableSharWriter | BucketedSharWriter:
+        if edges is None:
+            return ResumableSharWriter(
+                output_dir,
+                fields=self.shar_fields,
+                shard_size=shard_size,
+                resume=resume,
+                passthrough=passthrough,
+            )
+        return BucketedSharWriter(
+            output_dir,
+            edges,
+            fields=self.shar_fields,
+            shard_size=shard_size,
+            resume=resume,
+            passthrough=passthrough,
+        )
+
+    def _bucket_edges(
+        self, output_dir: Path, buckets: BucketConfig, resume: bool
+    ) -> list[float]:
+        """Edges of an earlier run when resuming, so cuts stay in their buckets
+
+        Quantile edges take a pass over every cut of the corpus before any is
+        written, see `BucketConfig`.
+        """
+        if resume and BucketManifest.path(output_dir).exists():
+            return BucketManifest.load(output_dir).edges
+        edges = buckets.resolve(self.get_cuts())
+        BucketManifest(edges=edges).save(output_dir)
+        return edges
+
+    @staticmethod
+    def _finish(output_dir: Path, edges: list[float] | None) -> None:
+        if edges is None:
+            write_rollup(output_dir)
+        else:
+            finish_buckets(output_dir, edges)
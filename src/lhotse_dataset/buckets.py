@@ -0,0 +1,221 @@
+import bisect
+from pathlib import Path
+from typing import Generator, Iterable
+
+import numpy as np
+from lhotse.cut import Cut
+from pydantic import BaseModel
+
+from lhotse_dataset.shar import (
+    EncodeStats,
+    Ledger,
+    ResumableSharWriter,
+    ShardRollover,
+    merge_shards,
+    remove_shar_dir,
+)
+from lhotse_dataset.shar_metadata import SIDECAR_FIELD, write_rollup
+
+MANIFEST_FILENAME = "buckets.json"
+
+
+class BucketConfig(BaseModel):
+    """Duration buckets of `write_shar`, each written to shards of its own
+
+    Either `edges` in seconds, where bucket i holds the cuts of `edges[i - 1]` up to
+    but not including `edges[i]`, or `num_buckets` quantiles of the durations of a
+    uniform sample of `num_estimate_cuts` cuts, or of all cuts when it is None.
+
+    The corpora enumerate their cuts by subset, speaker or length, so the sample is
+    drawn from a full pass over the cuts, which for quantiles means the corpus is
+    enumerated, downloads and mixing included, once before writing starts. Give
+    `edges` to skip that pass.
+    """
+
+    edges: list[float] | None = None
+    num_buckets: int | None = None
+    num_estimate_cuts: int | None = 10000
+    seed: int = 0
+
+    def resolve(self, cuts: Iterable[Cut]) -> list[float]:
+        if self.edges is not None:
+            return sorted(self.edges)
+        assert self.num_buckets is not None, "Set either edges or num_buckets"
+        durations = self.sample_durations(cuts)
+        if not durations:
+            return []
+        quantiles = np.linspace(0, 1, self.num_buckets + 1)[1:-1]
+        # equal quantiles of repeated durations would leave empty buckets
+        return sorted(set(np.quantile(durations, quantiles).tolist()))
+
+    def sample_durations(self, cuts: Iterable[Cut]) -> list[float]:
+        """Reservoir sample of `num_estimate_cuts` durations over all of `cuts`"""
+        size = self.num_estimate_cuts
+        if size is None:
+            return [cut.duration for cut in cuts]
+        rng = np.random.default_rng(self.seed)
+        sample: list[float] = []
+        for i, cut in enumerate(cuts):
+            if i < size:
+                sample.append(cut.duration)
+                continue
+            j = rng.integers(i + 1)
+            if j < size:
+                sample[j] = cut.duration
+        return sample
+
+
+class Bucket(BaseModel):
+    min_duration: float | None
+    max_duration: float | None
+    dir: str
+    num_cuts: int = 0
+    shards: dict[str, list[str]] = {}
+
+
+class BucketManifest(BaseModel):
+    """Buckets of a shar directory and the shards of each, relative to it"""
+
+    edges: list[float]
+    buckets: list[Bucket] = []
+
+    @staticmethod
+    def path(output_dir: Path) -> Path:
+        return output_dir / MANIFEST_FILENAME
+
+    @classmethod
+    def load(cls, output_dir: Path) -> "BucketManifest":
+        return cls.model_validate_json(cls.path(output_dir).read_text(encoding="utf-8"))
+
+    def save(self, output_dir: Path) -> None:
+        self.path(output_dir).write_text(self.model_dump_json(indent=2), "utf-8")
+
+    @property
+    def num_buckets(self) -> int:
+        return len(self.edges) + 1
+
+    def bucket(self, duration: float) -> int:
+        return bisect.bisect_right(self.edges, duration)
+
+    def fields(self, output_dir: Path, bucket: int) -> dict[str, list[str]]:
+        """Shards of `bucket` for `CutSet.from_shar(fields=...)`"""
+        return {
+            field: [str(output_dir / path) for path in paths]
+            for field, paths in self.buckets[bucket].shards.items()
+        }
+
+    def collect(self, output_dir: Path) -> None:
+        """Fill in the shards of every bucket from its ledger"""
+        self.buckets = []
+        bounds = [None, *self.edges, None]
+        for i in range(self.num_buckets):
+            bucket_dir = bucket_dirname(i)
+            ledger = Ledger.for_dir(output_dir / bucket_dir)
+            shards: dict[str, list[str]] = {}
+            for record in ledger.records:
+                for f in record.files:
+                    field = f.name.split(".")[0]
+                    # the sidecars are in the metadata_dir of the bucket
+                    if field != SIDECAR_FIELD:
+                        shards.setdefault(field, []).append(f"{bucket_dir}/{f.name}")
+            self.buckets.append(
+                Bucket(
+                    min_duration=bounds[i],
+                    max_duration=bounds[i + 1],
+                    dir=bucket_dir,
+                    num_cuts=ledger.num_cuts,
+                    shards=shards,
+                )
+            )
+
+
+def bucket_dirname(bucket: int) -> str:
+    return f"bucket_{bucket:03d}"
+
+
+class BucketedSharWriter:
+    """Routes cuts by duration to one `ResumableSharWriter` per bucket
+
+    Each bucket is a shar directory of its own below `output_dir`, with its own
+    ledger, so resuming skips the cuts each bucket already committed.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        edges: list[float],
+        fields: dict[str, str],
+        shard_size: int | ShardRollover,
+        resume: bool = False,
+        passthrough: bool = True,
+    ) -> None:
+        self.manifest = BucketManifest(edges=edges)
+        self.writers = [
+            ResumableSharWriter(
+                output_dir / bucket_dirname(i),
+                fields=fields,
+                shard_size=shard_size,
+                resume=resume,
+                passthrough=passthrough,
+            )
+            for i in range(self.manifest.num_buckets)
+        ]
+
+    @property
+    def complete(self) -> bool:
+        return all(writer.complete for writer in self.writers)
+
+    @property
+    def stats(self) -> EncodeStats:
+        return sum((writer.stats for writer in self.writers), EncodeStats())
+
+    def __enter__(self) -> "BucketedSharWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        for writer in self.writers:
+            writer.__exit__(exc_type, exc_val, exc_tb)
+
+    def skip_committed(self, cuts: Iterable[Cut]) -> Generator[Cut, None, None]:
+        """Skip as many cuts of each bucket as its ledger covers"""
+        num_committed = [writer.ledger.num_cuts for writer in self.writers]
+        for cut in cuts:
+            bucket = self.manifest.bucket(cut.duration)
+            if num_committed[bucket] > 0:
+                num_committed[bucket] -= 1
+                continue
+            yield cut
+
+    def write(self, cut: Cut) -> None:
+        self.writers[self.manifest.bucket(cut.duration)].write(cut)
+
+    def close(self) -> None:
+        for writer in self.writers:
+            writer.close()
+
+
+def merge_buckets(
+    partition_dirs: list[Path], output_dir: Path, num_buckets: int, resume: bool
+) -> None:
+    """`merge_shards` for every bucket of the partition directories"""
+    for i in range(num_buckets):
+        bucket_dir = output_dir / bucket_dirname(i)
+        bucket_dir.mkdir(exist_ok=True)
+        ledger = Ledger.for_dir(bucket_dir)
+        if not resume:
+            ledger.reset()
+        src_dirs = [
+            partition_dir / bucket_dirname(i) for partition_dir in partition_dirs
+        ]
+        merge_shards([d for d in src_dirs if d.exists()], bucket_dir, ledger)
+    for partition_dir in partition_dirs:
+        remove_shar_dir(partition_dir)
+
+
+def finish_buckets(output_dir: Path, edges: list[float]) -> None:
+    """Write the metadata rollup of every bucket and the complete manifest"""
+    manifest = BucketManifest(edges=edges)
+    for i in range(manifest.num_buckets):
+        write_rollup(output_dir / bucket_dirname(i))
+    manifest.collect(output_dir)
+    manifest.save(output_dir)
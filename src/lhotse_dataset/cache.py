@@ -0,0 +1,155 @@
+import contextlib
+import fcntl
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Callable, Generator, TextIO
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "lhotse_dataset"
+DEFAULT_MAX_BYTES = 500 * 1024**3
+# partial downloads untouched for this long are given up on
+STALE_PARTIAL_SECONDS = 7 * 24 * 3600
+
+# shared locks held on the blobs linked by symbolic links, by link path
+_pins: dict[Path, tuple[Path, TextIO]] = {}
+
+
+class DownloadCache:
+    """Persistent download cache shared by every corpus and process
+
+    Files are keyed by URL plus an optional sha256 checksum and evicted in
+    least-recently-used order once the cache grows beyond `max_bytes`. A blob
+    that could only be symlinked is not evicted while the process that linked it
+    runs and the link is in place.
+    """
+
+    def __init__(self, root: Path, max_bytes: int | None = DEFAULT_MAX_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = root / "blobs"
+        self.lock_dir = root / "locks"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(url: str, checksum: str | None = None) -> str:
+        return hashlib.sha256(f"{url}\n{checksum or ''}".encode()).hexdigest()
+
+    def blob_path(self, key: str) -> Path:
+        return self.blob_dir / key
+
+    def partial_path(self, key: str) -> Path:
+        return self.blob_dir / f"{key}.partial"
+
+    def fetch(
+        self,
+        url: str,
+        path: Path,
+        download_fn: Callable[[Path], None],
+        checksum: str | None = None,
+    ) -> None:
+        """Place the file at `url` on `path`, calling `download_fn` on a cache miss"""
+        key = self.key(url, checksum)
+        blob_path = self.blob_path(key)
+
+        with self._lock(self.lock_dir / f"{key}.lock"):
+            if not blob_path.exists():
+                partial_path = self.partial_path(key)
+                download_fn(partial_path)
+                if checksum is not None and _sha256(partial_path) != checksum:
+                    partial_path.unlink()
+                    raise ValueError(f"Checksum mismatch for {url}")
+                os.replace(partial_path, blob_path)
+            # the modification time doubles as the last access time for eviction
+            now = time.time_ns()
+            os.utime(blob_path, ns=(now, now))
+
+            path.unlink(missing_ok=True)
+            try:
+                os.link(blob_path, path)
+            except OSError:
+                os.symlink(blob_path, path)
+                self._pin(key, path)
+
+        self.evict(keep=key)
+
+    def evict(self, keep: str | None = None) -> None:
+        """Remove least recently used blobs beyond `max_bytes` and stale partials
+
+        Only blobs whose key lock is free, with no download or reader on them,
+        are removed.
+        """
+        with self._lock(self.root / "evict.lock"):
+            blobs = []
+            stale_before = time.time_ns() - STALE_PARTIAL_SECONDS * 10**9
+            for path in self.blob_dir.iterdir():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                # `{key}.partial` and the `.progress` of a download in progress
+                key, _, suffix = path.name.partition(".")
+                if not suffix:
+                    blobs.append((stat.st_mtime_ns, stat.st_size, path))
+                elif stat.st_mtime_ns < stale_before:
+                    self._remove(key, path)
+
+            if self.max_bytes is None:
+                return
+            total_bytes = sum(size for _, size, _ in blobs)
+            for _, size, blob_path in sorted(blobs):
+                if total_bytes <= self.max_bytes:
+                    break
+                if blob_path.name == keep:
+                    continue
+                if self._remove(blob_path.name, blob_path):
+                    total_bytes -= size
+
+    def _remove(self, key: str, path: Path) -> bool:
+        with (
+            self._lock(self.lock_dir / f"{key}.lock", blocking=False) as locked,
+            self._lock(self.lock_dir / f"{key}.pin", blocking=False) as unpinned,
+        ):
+            if locked and unpinned:
+                path.unlink(missing_ok=True)
+            return locked and unpinned
+
+    def _pin(self, key: str, link_path: Path) -> None:
+        """Hold a shared lock on the blob of `key` while `link_path` links to it"""
+        for path, (blob_path, f) in list(_pins.items()):
+            if not path.is_symlink() or path.readlink() != blob_path:
+                f.close()
+                del _pins[path]
+        if link_path in _pins:
+            _pins.pop(link_path)[1].close()
+        f = open(self.lock_dir / f"{key}.pin", "a")
+        fcntl.flock(f, fcntl.LOCK_SH)
+        _pins[link_path] = (self.blob_path(key), f)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _lock(path: Path, blocking: bool = True) -> Generator[bool, None, None]:
+        with open(path, "a") as f:
+            try:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                fcntl.flock(f, flags)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def get_download_cache() -> DownloadCache:
+    """Cache set up from LHOTSE_DATASET_CACHE_DIR and LHOTSE_DATASET_CACHE_MAX_BYTES"""
+    root = os.environ.get("LHOTSE_DATASET_CACHE_DIR", str(DEFAULT_CACHE_DIR))
+    max_bytes = os.environ.get("LHOTSE_DATASET_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)
+    return DownloadCache(Path(root), int(max_bytes))
+
+
+def _sha256(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
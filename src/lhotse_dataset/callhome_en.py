@@ -6,7 +6,8 @@ import lhotse
 import requests
 from bs4 import BeautifulSoup
 
-from lhotse_dataset.base import BaseCorpus, Language
+from lhotse_dataset.base import BaseCorpus, Language, Partition
+from lhotse_dataset.probe import recording_from_file
 from lhotse_dataset.utils import download_file
 
 
@@ -36,7 +37,9 @@ class CallHomeEn(BaseCorpus):
     def shard_size(self) -> int:
         return 10
 
-    def get_cuts(self) -> Generator[lhotse.MultiCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MultiCut, None, None]:
         session = requests.Session()
         headers = {"Content-Type": "application/json"}
         data = {"email": self.email, "pswd": self.pswd}
@@ -56,12 +59,12 @@ class CallHomeEn(BaseCorpus):
         ]
 
         with tempfile.TemporaryDirectory() as tmp_dir:
-            for link in links:
+            for link in partition.select(links):
                 audio_id = f"callhome_en_{Path(link).stem}"
                 tmp_path = Path(tmp_dir) / Path(link).name.split("?")[0]
                 download_file(link, tmp_path, session)
 
-                recording = lhotse.Recording.from_file(tmp_path)
+                recording = recording_from_file(tmp_path)
                 supervision_0 = lhotse.SupervisionSegment(
                     id=f"segment_{audio_id}_0",
                     recording_id=recording.id,
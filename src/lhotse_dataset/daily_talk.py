@@ -6,7 +6,9 @@ from typing import Generator
 import gdown
 import lhotse
 
-from lhotse_dataset.base import BaseCorpus, Language
+from lhotse_dataset.archive import recording_from_zip
+from lhotse_dataset.base import BaseCorpus, Language, Partition
+from lhotse_dataset.cache import get_download_cache
 
 
 class DailyTalk(BaseCorpus):
@@ -22,10 +24,16 @@ class DailyTalk(BaseCorpus):
     def language(self) -> Language:
         return Language.EN
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir) / "dailytalk.zip"
-            gdown.download(self.download_url, str(tmp_path))
+            get_download_cache().fetch(
+                self.download_url,
+                tmp_path,
+                lambda path: gdown.download(self.download_url, str(path)),
+            )
 
             zip_file = zipfile.ZipFile(tmp_path)
 
@@ -35,14 +43,12 @@ class DailyTalk(BaseCorpus):
                 if file_name.filename.endswith(".wav")
             ]
 
-            for wav_zippath in sorted(wav_zippaths):
+            for wav_zippath in partition.select(sorted(wav_zippaths)):
                 audio_id = Path(wav_zippath).stem
                 _, speaker_id, dialogue_id = audio_id.split("_")
 
-                with zip_file.open(wav_zippath, "r") as audio_file:
-                    wav_bytes = audio_file.read()
-                recording = lhotse.Recording.from_bytes(
-                    wav_bytes, f"recording_{audio_id}"
+                recording = recording_from_zip(
+                    zip_file, wav_zippath, f"recording_{audio_id}"
                 )
 
                 transcript_zippath = str(Path(wav_zippath).with_suffix(".txt"))
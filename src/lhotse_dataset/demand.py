@@ -3,10 +3,11 @@ import zipfile
 from pathlib import Path
 from typing import Generator
 
-from lhotse import MonoCut, Recording
+from lhotse import MonoCut
 from lhotse.utils import uuid
 
-from lhotse_dataset.base import BaseCorpus
+from lhotse_dataset.archive import recording_from_zip
+from lhotse_dataset.base import BaseCorpus, Partition
 from lhotse_dataset.utils import download_file
 
 
@@ -41,9 +42,12 @@ class DEMAND(BaseCorpus):
     def shard_size(self) -> int:
         return 10
 
-    def get_cuts(self) -> Generator[MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[MonoCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_dir = Path(tmp_dir)
+            num_files = 0
             for download_url in self.download_urls:
                 filename = download_url.split("/")[-1].split("?")[0]
 
@@ -57,12 +61,12 @@ class DEMAND(BaseCorpus):
                     if file_name.filename.endswith(".wav")
                 ]
 
-                for wav_zippath in sorted(wav_zippaths):
-                    with demand_zip.open(wav_zippath, "r") as audio_file:
-                        wav_bytes = audio_file.read()
-
+                wav_zippaths = sorted(wav_zippaths)
+                for wav_zippath in partition.select(wav_zippaths, start=num_files):
                     id = uuid.uuid4().hex
-                    recording = Recording.from_bytes(wav_bytes, f"recording_{id}")
+                    recording = recording_from_zip(
+                        demand_zip, wav_zippath, f"recording_{id}"
+                    )
 
                     cut = MonoCut(
                         id=id,
@@ -73,3 +77,5 @@ class DEMAND(BaseCorpus):
                     )
 
                     yield cut
+
+                num_files += len(wav_zippaths)
@@ -5,7 +5,8 @@ from typing import Generator
 
 import lhotse
 
-from lhotse_dataset.base import BaseCorpus, Gender, Language
+from lhotse_dataset.archive import recording_from_zip
+from lhotse_dataset.base import BaseCorpus, Gender, Language, Partition
 from lhotse_dataset.utils import download_file
 
 
@@ -23,7 +24,9 @@ class HiFiCAPTAIN(BaseCorpus):
             "ja-JP_M": "https://ast-astrec.nict.go.jp/release/hi-fi-captain/hfc_ja-JP_M.zip",
         }
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             for lang_gender, download_url in self.download_url.items():
                 zip_path = Path(tmp_dir) / f"{lang_gender}.zip"
@@ -39,60 +42,59 @@ class HiFiCAPTAIN(BaseCorpus):
                     if file_name.filename.endswith(".txt")
                 ]
 
+                utterances = []
                 for transcript_zippath in sorted(transcript_zippaths):
                     with zip_file.open(transcript_zippath) as transcript_file:
                         lines = transcript_file.read().decode("utf-8").splitlines()
-
-                    for line in lines:
-                        name = line.split()[0]
-                        text = " ".join(line.split()[1:])
-                        dataset_type = Path(transcript_zippath).stem
-
-                        audio_id = f"hfc_{lang_gender}_{dataset_type}_{name}"
-
-                        audio_path = (
-                            Path(transcript_zippath).parent.parent
-                            / "wav"
-                            / f"{dataset_type}"
-                            / f"{name}.wav"
-                        )
-
-                        with zip_file.open(str(audio_path), "r") as audio_file:
-                            wav_bytes = audio_file.read()
-
-                        recording = lhotse.Recording.from_bytes(
-                            wav_bytes, f"recording_{audio_id}"
-                        )
-
-                        language = (
-                            Language.EN
-                            if lang_gender in ["en-US_F", "en-US_M"]
-                            else Language.JA
-                        )
-                        gender = (
-                            Gender.MALE
-                            if lang_gender in ["en-US_M", "ja-JP_M"]
-                            else Gender.FEMALE
-                        )
-
-                        supervision = lhotse.SupervisionSegment(
-                            id=f"transcript_{audio_id}",
-                            recording_id=recording.id,
-                            start=0,
-                            duration=recording.duration,
-                            channel=0,
-                            text=text,
-                            language=language.value,
-                            speaker=f"hfc_{lang_gender}",
-                            gender=gender.value,
-                            custom={"dataset_type": dataset_type},
-                        )
-                        cut = lhotse.MonoCut(
-                            id=f"{audio_id}",
-                            start=0,
-                            duration=recording.duration,
-                            channel=0,
-                            supervisions=[supervision],
-                            recording=recording,
-                        )
-                        yield cut
+                    utterances.extend((transcript_zippath, line) for line in lines)
+
+                for transcript_zippath, line in partition.select(utterances):
+                    name = line.split()[0]
+                    text = " ".join(line.split()[1:])
+                    dataset_type = Path(transcript_zippath).stem
+
+                    audio_id = f"hfc_{lang_gender}_{dataset_type}_{name}"
+
+                    audio_path = (
+                        Path(transcript_zippath).parent.parent
+                        / "wav"
+                        / f"{dataset_type}"
+                        / f"{name}.wav"
+                    )
+
+                    recording = recording_from_zip(
+                        zip_file, str(audio_path), f"recording_{audio_id}"
+                    )
+
+                    language = (
+                        Language.EN
+                        if lang_gender in ["en-US_F", "en-US_M"]
+                        else Language.JA
+                    )
+                    gender = (
+                        Gender.MALE
+                        if lang_gender in ["en-US_M", "ja-JP_M"]
+                        else Gender.FEMALE
+                    )
+
+                    supervision = lhotse.SupervisionSegment(
+                        id=f"transcript_{audio_id}",
+                        recording_id=recording.id,
+                        start=0,
+                        duration=recording.duration,
+                        channel=0,
+                        text=text,
+                        language=language.value,
+                        speaker=f"hfc_{lang_gender}",
+                        gender=gender.value,
+                        custom={"dataset_type": dataset_type},
+                    )
+                    cut = lhotse.MonoCut(
+                        id=f"{audio_id}",
+                        start=0,
+                        duration=recording.duration,
+                        channel=0,
+                        supervisions=[supervision],
+                        recording=recording,
+                    )
+                    yield cut
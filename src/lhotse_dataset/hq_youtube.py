@@ -4,7 +4,9 @@ from typing import Generator
 
 import lhotse
 
-from lhotse_dataset.base import BaseCorpus, Language
+from lhotse_dataset.base import BaseCorpus, Language, Partition
+from lhotse_dataset.probe import recording_from_bytes
+from lhotse_dataset.streaming import read_member
 
 
 class HQYouTube(BaseCorpus):
@@ -21,36 +23,35 @@ class HQYouTube(BaseCorpus):
     def shard_size(self) -> int:
         return 100000
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         with tarfile.TarFile(self.tar_path) as hq_youtube_tar:
-            for member in hq_youtube_tar.getmembers():
-                if member.isfile():
-                    path = Path(member.name)
-                    if path.suffix != ".flac":
-                        continue
-                    audio_file = hq_youtube_tar.extractfile(member)
-                    assert audio_file is not None
-
-                    audio_id = path.stem
-                    wav_bytes = audio_file.read()
-                    recording = lhotse.Recording.from_bytes(
-                        wav_bytes, f"recording_{audio_id}"
-                    )
-
-                    supervision = lhotse.SupervisionSegment(
-                        id=f"segment_{audio_id}",
-                        recording_id=recording.id,
-                        start=0,
-                        duration=recording.duration,
-                        channel=0,
-                        language=self.language.value,
-                    )
-                    cut = lhotse.MonoCut(
-                        id=f"{audio_id}",
-                        start=0,
-                        duration=recording.duration,
-                        channel=0,
-                        supervisions=[supervision],
-                        recording=recording,
-                    )
-                    yield cut
+            members = [
+                member
+                for member in hq_youtube_tar.getmembers()
+                if member.isfile() and Path(member.name).suffix == ".flac"
+            ]
+            for member in partition.select(members):
+                path = Path(member.name)
+                audio_id = path.stem
+                wav_bytes = read_member(hq_youtube_tar, member)
+                recording = recording_from_bytes(wav_bytes, f"recording_{audio_id}")
+
+                supervision = lhotse.SupervisionSegment(
+                    id=f"segment_{audio_id}",
+                    recording_id=recording.id,
+                    start=0,
+                    duration=recording.duration,
+                    channel=0,
+                    language=self.language.value,
+                )
+                cut = lhotse.MonoCut(
+                    id=f"{audio_id}",
+                    start=0,
+                    duration=recording.duration,
+                    channel=0,
+                    supervisions=[supervision],
+                    recording=recording,
+                )
+                yield cut
@@ -0,0 +1,222 @@
+import contextlib
+import cProfile
+import importlib.util
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Generator, Literal
+
+from pydantic import BaseModel, field_validator
+from tqdm import tqdm
+
+REPORT_FILENAME = "export_report.json"
+TRACE_FILENAME = "export_trace.json"
+
+
+class InstrumentationConfig(BaseModel):
+    summary_interval: float | None = 60.0
+    print_summary: bool = True
+    trace: bool = False
+    profiler: Literal["cprofile", "pyinstrument"] | None = None
+    profile_start: int = 0
+    profile_num_cuts: int = 100
+
+    @field_validator("profiler")
+    @classmethod
+    def check_profiler(cls, profiler: str | None) -> str | None:
+        # fail before the export starts, not once the profiler is started
+        if profiler == "pyinstrument" and importlib.util.find_spec(profiler) is None:
+            raise ValueError(
+                "pyinstrument is not installed, install lhotse-dataset[profile]"
+            )
+        return profiler
+
+
+class StageStats(BaseModel):
+    seconds: float = 0.0
+    calls: int = 0
+    num_bytes: int = 0
+
+
+class Report(BaseModel):
+    wall_seconds: float = 0.0
+    num_cuts: int = 0
+    audio_seconds: float = 0.0
+    stages: dict[str, StageStats] = {}
+    counters: dict[str, int] = {}
+    trace_events: list[dict] = []
+
+    def merge(self, other: "Report") -> "Report":
+        """Combine the reports of partitions that ran concurrently"""
+        stages = {k: v.model_copy() for k, v in self.stages.items()}
+        for name, stats in other.stages.items():
+            total = stages.setdefault(name, StageStats())
+            total.seconds += stats.seconds
+            total.calls += stats.calls
+            total.num_bytes += stats.num_bytes
+        counters = dict(self.counters)
+        for name, value in other.counters.items():
+            counters[name] = counters.get(name, 0) + value
+        return Report(
+            wall_seconds=max(self.wall_seconds, other.wall_seconds),
+            num_cuts=self.num_cuts + other.num_cuts,
+            audio_seconds=self.audio_seconds + other.audio_seconds,
+            stages=stages,
+            counters=counters,
+            trace_events=self.trace_events + other.trace_events,
+        )
+
+    def summary(self) -> str:
+        wall_seconds = max(self.wall_seconds, 1e-9)
+        lines = [
+            f"{self.num_cuts} cuts in {self.wall_seconds:.1f}s: "
+            f"{self.num_cuts / wall_seconds:.1f} cuts/s, "
+            f"{self.audio_seconds / 3600 / wall_seconds:.4f} audio-hours/s"
+        ]
+        for name, stats in sorted(self.stages.items()):
+            line = f"  {name:<12} {stats.seconds:10.2f}s {stats.calls:10d} calls"
+            if stats.num_bytes > 0 and stats.seconds > 0:
+                line += f" {stats.num_bytes / 1024**2 / stats.seconds:10.1f} MB/s"
+            lines.append(line)
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name:<12} {value:10d}")
+        return "\n".join(lines)
+
+    def write(self, output_dir: Path) -> None:
+        """Write the report as JSON, and the Chrome trace if events were recorded"""
+        with open(output_dir / REPORT_FILENAME, "w", encoding="utf-8") as f:
+            f.write(self.model_dump_json(indent=2, exclude={"trace_events"}))
+        if self.trace_events:
+            with open(output_dir / TRACE_FILENAME, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": self.trace_events}, f)
+
+
+class Instrumentation:
+    """Per-stage timers and counters for one process exporting a corpus
+
+    Stages nest, so the time of a stage includes the stages opened inside it.
+    """
+
+    def __init__(
+        self,
+        config: InstrumentationConfig = InstrumentationConfig(),
+        profile_path: Path | None = None,
+    ) -> None:
+        self.config = config
+        self.profile_path = profile_path
+        self.report = Report()
+        self.start = time.perf_counter()
+        self.last_summary = self.start
+        self.lock = threading.Lock()
+        self.profiler = None
+        self.previous: Instrumentation | None = None
+
+    def __enter__(self) -> "Instrumentation":
+        """Make this instance receive the stages and counts of this process"""
+        global _current
+        self.previous = _current
+        _current = self
+        self.start = time.perf_counter()
+        self.last_summary = self.start
+        if self.config.profiler is not None and self.config.profile_start == 0:
+            self._start_profiler()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        global _current
+        self._stop_profiler()
+        self.report.wall_seconds = time.perf_counter() - self.start
+        assert self.previous is not None
+        _current = self.previous
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Generator[StageStats, None, None]:
+        """Time the block; add to `num_bytes` of the yielded stats to count bytes"""
+        stats = StageStats()
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                total = self.report.stages.setdefault(name, StageStats())
+                total.seconds += end - start
+                total.calls += 1
+                total.num_bytes += stats.num_bytes
+                if self.config.trace:
+                    self.report.trace_events.append(
+                        {
+                            "name": name,
+                            "ph": "X",
+                            "ts": start * 1e6,
+                            "dur": (end - start) * 1e6,
+                            "pid": os.getpid(),
+                            "tid": threading.get_ident(),
+                            "args": {"bytes": stats.num_bytes},
+                        }
+                    )
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self.lock:
+            self.report.counters[name] = self.report.counters.get(name, 0) + value
+
+    def add_cut(self, duration: float) -> None:
+        self.report.num_cuts += 1
+        self.report.audio_seconds += duration
+
+        if self.config.profiler is not None:
+            if self.report.num_cuts == self.config.profile_start:
+                self._start_profiler()
+            elif (
+                self.report.num_cuts
+                == self.config.profile_start + self.config.profile_num_cuts
+            ):
+                self._stop_profiler()
+
+        now = time.perf_counter()
+        interval = self.config.summary_interval
+        if interval is not None and now - self.last_summary >= interval:
+            self.report.wall_seconds = now - self.start
+            tqdm.write(self.report.summary())
+            self.last_summary = now
+
+    def _start_profiler(self) -> None:
+        if self.config.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self.profiler = Profiler()
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def _stop_profiler(self) -> None:
+        if self.profiler is None:
+            return
+        if isinstance(self.profiler, cProfile.Profile):
+            self.profiler.disable()
+            if self.profile_path is not None:
+                self.profiler.dump_stats(self.profile_path.with_suffix(".prof"))
+        else:
+            self.profiler.stop()
+            if self.profile_path is not None:
+                html = self.profiler.output_html()
+                self.profile_path.with_suffix(".html").write_text(html)
+        self.profiler = None
+
+
+_current = Instrumentation(InstrumentationConfig(summary_interval=None))
+
+
+def get_instrumentation() -> Instrumentation:
+    return _current
+
+
+def stage(name: str) -> contextlib.AbstractContextManager[StageStats]:
+    return _current.stage(name)
+
+
+def count(name: str, value: int = 1) -> None:
+    _current.count(name, value)
@@ -3,7 +3,8 @@ from typing import Generator
 
 import lhotse
 
-from lhotse_dataset.base import BaseCorpus, Gender, Language
+from lhotse_dataset.base import BaseCorpus, Gender, Language, Partition
+from lhotse_dataset.probe import recording_from_file
 
 
 class JIS(BaseCorpus):
@@ -16,12 +17,14 @@ class JIS(BaseCorpus):
     def language(self) -> Language:
         return Language.JA
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         wav_paths = sorted(list(map(str, self.root_dir.glob("**/*.wav"))))
-        for wav_path in wav_paths:
+        for wav_path in partition.select(wav_paths):
             wav_path = Path(wav_path)
             audio_id = wav_path.stem
-            recording = lhotse.Recording.from_file(wav_path, f"recording_{audio_id}")
+            recording = recording_from_file(wav_path, f"recording_{audio_id}")
 
             speaker, recording_type = wav_path.parent.name.split("_")
             group_name = wav_path.parent.parent.name
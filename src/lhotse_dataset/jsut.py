@@ -5,7 +5,8 @@ from typing import Generator
 
 import lhotse
 
-from lhotse_dataset.base import BaseCorpus, Gender, Language
+from lhotse_dataset.archive import recording_from_zip
+from lhotse_dataset.base import BaseCorpus, Gender, Language, Partition
 from lhotse_dataset.utils import download_file
 
 
@@ -26,7 +27,9 @@ class JSUT(BaseCorpus):
     def shard_size(self) -> int:
         return 1000
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         """Download the corpus to temporary file"""
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir) / "jsut.zip"
@@ -38,37 +41,35 @@ class JSUT(BaseCorpus):
                 for file_name in jsut_zip.filelist
                 if "transcript_utf8" in file_name.filename
             ]
+            utterances = []
             for transcript_zippath in sorted(transcript_zippaths):
                 with jsut_zip.open(transcript_zippath) as transcript_file:
                     lines = transcript_file.read().decode("utf-8").splitlines()
-                for line in lines:
-                    audio_id, text = line.split(":")
-                    audio_path = (
-                        Path(transcript_zippath).parent / "wav" / f"{audio_id}.wav"
-                    )
-                    with jsut_zip.open(str(audio_path), "r") as audio_file:
-                        wav_bytes = audio_file.read()
+                utterances.extend((transcript_zippath, line) for line in lines)
 
-                    recording = lhotse.Recording.from_bytes(
-                        wav_bytes, f"recording_{audio_id}"
-                    )
-                    supervision = lhotse.SupervisionSegment(
-                        id=f"transcript_{audio_id}",
-                        recording_id=recording.id,
-                        start=0,
-                        duration=recording.duration,
-                        channel=0,
-                        text=text,
-                        language=self.language.value,
-                        speaker="JSUT",
-                        gender=Gender.FEMALE.value,
-                    )
-                    cut = lhotse.MonoCut(
-                        id=f"{audio_id}",
-                        start=0,
-                        duration=recording.duration,
-                        channel=0,
-                        supervisions=[supervision],
-                        recording=recording,
-                    )
-                    yield cut
+            for transcript_zippath, line in partition.select(utterances):
+                audio_id, text = line.split(":")
+                audio_path = Path(transcript_zippath).parent / "wav" / f"{audio_id}.wav"
+                recording = recording_from_zip(
+                    jsut_zip, str(audio_path), f"recording_{audio_id}"
+                )
+                supervision = lhotse.SupervisionSegment(
+                    id=f"transcript_{audio_id}",
+                    recording_id=recording.id,
+                    start=0,
+                    duration=recording.duration,
+                    channel=0,
+                    text=text,
+                    language=self.language.value,
+                    speaker="JSUT",
+                    gender=Gender.FEMALE.value,
+                )
+                cut = lhotse.MonoCut(
+                    id=f"{audio_id}",
+                    start=0,
+                    duration=recording.duration,
+                    channel=0,
+                    supervisions=[supervision],
+                    recording=recording,
+                )
+                yield cut
@@ -7,7 +7,8 @@ from typing import Generator
 import lhotse
 from lhotse.supervision import AlignmentItem
 
-from lhotse_dataset.base import BaseCorpus, Gender, Language
+from lhotse_dataset.archive import recording_from_zip
+from lhotse_dataset.base import BaseCorpus, Gender, Language, Partition
 from lhotse_dataset.utils import download_file
 
 
@@ -30,7 +31,9 @@ class JVNV(BaseCorpus):
     def language(self) -> Language:
         return Language.JA
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir) / "jvnv.zip"
             download_file(self.download_url, tmp_path)
@@ -54,12 +57,10 @@ class JVNV(BaseCorpus):
                 if file_name.filename.endswith(".wav")
             ]
 
-            for wav_zippath in sorted(wav_zippaths):
+            for wav_zippath in partition.select(sorted(wav_zippaths)):
                 audio_id = Path(wav_zippath).stem
-                with jvnv_zip.open(str(wav_zippath), "r") as audio_file:
-                    wav_bytes = audio_file.read()
-                recording = lhotse.Recording.from_bytes(
-                    wav_bytes, f"recording_{audio_id}"
+                recording = recording_from_zip(
+                    jvnv_zip, str(wav_zippath), f"recording_{audio_id}"
                 )
                 speaker = audio_id.split("_")[0]
                 utterance = "_".join(audio_id.split("_")[1:])
@@ -6,7 +6,9 @@ from typing import Generator
 import gdown
 import lhotse
 
-from lhotse_dataset.base import BaseCorpus, Gender, Language
+from lhotse_dataset.archive import recording_from_zip
+from lhotse_dataset.base import BaseCorpus, Gender, Language, Partition
+from lhotse_dataset.cache import get_download_cache
 
 
 class JVS(BaseCorpus):
@@ -22,10 +24,16 @@ class JVS(BaseCorpus):
     def language(self) -> Language:
         return Language.JA
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir) / "jvs.zip"
-            gdown.download(self.download_url, str(tmp_path))
+            get_download_cache().fetch(
+                self.download_url,
+                tmp_path,
+                lambda path: gdown.download(self.download_url, str(path)),
+            )
             jvs_zip = zipfile.ZipFile(tmp_path)
             transcript_zippaths = [
                 file_name.filename
@@ -50,47 +58,46 @@ class JVS(BaseCorpus):
                     Gender.MALE if str_gender == "M" else Gender.FEMALE
                 )
 
+            utterances = []
             for transcript_zippath in sorted(transcript_zippaths):
                 with jvs_zip.open(transcript_zippath) as transcript_file:
                     lines = transcript_file.read().decode("utf-8").splitlines()
-                for line in lines:
-                    audio_id, text = line.split(":")
-                    name, text = line.split(":")
-                    transcript_path = Path(transcript_zippath)
-                    utter_type = transcript_path.parent.name
-                    speaker_id = transcript_path.parent.parent.name
-                    audio_path = (
-                        transcript_path.parent / "wav24kHz16bit" / f"{name}.wav"
-                    )
+                utterances.extend((transcript_zippath, line) for line in lines)
+
+            for transcript_zippath, line in partition.select(utterances):
+                audio_id, text = line.split(":")
+                name, text = line.split(":")
+                transcript_path = Path(transcript_zippath)
+                utter_type = transcript_path.parent.name
+                speaker_id = transcript_path.parent.parent.name
+                audio_path = transcript_path.parent / "wav24kHz16bit" / f"{name}.wav"
 
-                    audio_id = f"{speaker_id}_{utter_type}_{name}"
-                    try:
-                        with jvs_zip.open(str(audio_path), "r") as audio_file:
-                            wav_bytes = audio_file.read()
-                        recording = lhotse.Recording.from_bytes(
-                            wav_bytes, f"recording_{audio_id}"
-                        )
-                        supervision = lhotse.SupervisionSegment(
-                            id=f"transcript_{audio_id}",
-                            recording_id=recording.id,
-                            start=0,
-                            duration=recording.duration,
-                            channel=0,
-                            text=text,
-                            language=self.language.value,
-                            speaker=speaker_id,
-                            gender=speaker_gender[speaker_id].value,
-                            custom={"utter_type": utter_type},
-                        )
-                        cut = lhotse.MonoCut(
-                            id=f"{audio_id}",
-                            start=0,
-                            duration=recording.duration,
-                            channel=0,
-                            supervisions=[supervision],
-                            recording=recording,
-                        )
-                        yield cut
-                    except KeyError:
-                        # NOTE: transcriptファイルにあるのに音源が無いものがある
-                        continue
+                audio_id = f"{speaker_id}_{utter_type}_{name}"
+                try:
+                    recording = recording_from_zip(
+                        jvs_zip, str(audio_path), f"recording_{audio_id}"
+                    )
+                    supervision = lhotse.SupervisionSegment(
+                        id=f"transcript_{audio_id}",
+                        recording_id=recording.id,
+                        start=0,
+                        duration=recording.duration,
+                        channel=0,
+                        text=text,
+                        language=self.language.value,
+                        speaker=speaker_id,
+                        gender=speaker_gender[speaker_id].value,
+                        custom={"utter_type": utter_type},
+                    )
+                    cut = lhotse.MonoCut(
+                        id=f"{audio_id}",
+                        start=0,
+                        duration=recording.duration,
+                        channel=0,
+                        supervisions=[supervision],
+                        recording=recording,
+                    )
+                    yield cut
+                except KeyError:
+                    # NOTE: transcriptファイルにあるのに音源が無いものがある
+                    continue
@@ -1,21 +1,35 @@
-import io
-import tarfile
 import tempfile
 from pathlib import Path
-from typing import Generator
+from typing import Any, Generator, Iterable
 
 import git
-import lhotse
-import numpy as np
-import pandas as pd
-import soundfile as sf
-from lhotse import MultiCut, SupervisionSegment
-
-from lhotse_dataset.base import BaseCorpus, Language
+from lhotse import MultiCut, Recording, SupervisionSegment
+
+from lhotse_dataset.base import BaseCorpus, Language, Partition
+from lhotse_dataset.instrumentation import stage
+from lhotse_dataset.mixing import (
+    Mixer,
+    array_recording,
+    decode,
+    get_decoded_audio_cache,
+)
+from lhotse_dataset.recipes import RecipeTable
+from lhotse_dataset.streaming import stream_tar_members
 from lhotse_dataset.utils import download_file
+from lhotse_dataset.virtual_mix import (
+    MixtureChannel,
+    MixtureRecipe,
+    SourceShar,
+    mixture_recording,
+)
 
 
 class Libri2MixClean(BaseCorpus):
+    def __init__(self, librispeech_shar_dir: str | Path | None = None) -> None:
+        """librispeech_shar_dir: LibriSpeech shar to write recipe-only mixtures of"""
+        super(Libri2MixClean, self).__init__()
+        self.librispeech_shar_dir = librispeech_shar_dir
+
     @property
     def url(self) -> str:
         return "https://github.com/JorisCos/LibriMix"
@@ -37,14 +51,26 @@ class Libri2MixClean(BaseCorpus):
     def shard_size(self) -> int:
         return 5000
 
-    def get_cuts(self) -> Generator[MultiCut, None, None]:
+    @property
+    def shar_fields(self) -> dict[str, str]:
+        if self.librispeech_shar_dir is not None:
+            return {}
+        return super().shar_fields
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[MultiCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             dir = Path(tmp_dir) / "LibriMix"
             git.Repo.clone_from(self.url, dir)
 
             libri2mix_csv_paths = dir.glob("**/Libri2Mix/*.csv")
+            if self.librispeech_shar_dir is not None:
+                yield from self.get_virtual_cuts(libri2mix_csv_paths, partition)
+                return
 
             tmp_dir_path = Path(tmp_dir)
+            mixer = Mixer(num_channels=2)
 
             for csv_path in sorted(list(libri2mix_csv_paths)):
                 if str(csv_path).endswith("_info.csv"):
@@ -52,74 +78,136 @@ class Libri2MixClean(BaseCorpus):
 
                 subset = csv_path.stem.split("_")[1]
 
-                df = pd.read_csv(csv_path)
+                recipes = RecipeTable.from_csv(csv_path)
 
                 tmp_ls_path = tmp_dir_path / f"{subset}.tar.gz"
                 download_file(self.download_url[subset], tmp_ls_path)
 
-                with tarfile.open(tmp_ls_path) as tar:
-                    tar.extractall(tmp_dir_path, filter="fully_trusted")
-
-                transcriptions = {}
-                trans_files = list(tmp_dir_path.glob("LibriSpeech/**/*.trans.txt"))
-                for trans_file_path in trans_files:
-                    with open(trans_file_path, "r", encoding="utf-8") as f:
-                        lines = f.readlines()
-                    for line in lines:
-                        parts = line.strip().split(" ")
-                        audio_id, transcript = parts[0], " ".join(parts[1:])
-                        transcriptions[audio_id] = transcript
-
-                for row in df.itertuples():
-                    source_1_path = tmp_dir_path / "LibriSpeech" / row.source_1_path  # type: ignore
-                    source_2_path = tmp_dir_path / "LibriSpeech" / row.source_2_path  # type: ignore
-
-                    wav_1, sr = sf.read(source_1_path)
-                    wav_2, sr = sf.read(source_2_path)
-                    wav_len = max(wav_1.shape[0], wav_2.shape[0])
-
-                    wav = np.zeros((2, wav_len), dtype=wav_1.dtype)
-                    wav[0, : wav_1.shape[0]] = wav_1 * row.source_1_gain  # type: ignore
-                    wav[1, : wav_2.shape[0]] = wav_2 * row.source_2_gain  # type: ignore
-
-                    buf = io.BytesIO()
-                    sf.write(buf, wav.T, sr, format="WAV")
-
-                    mixture_id = row.mixture_ID  # type: ignore
-                    audio_id_1 = mixture_id.split("_")[0]
-                    audio_id_2 = mixture_id.split("_")[1]
-                    recording = lhotse.Recording.from_bytes(
-                        buf.getvalue(), recording_id=f"recording_{mixture_id}"
-                    )
-                    assert recording.channel_ids is not None
-
-                    supervision_source_1 = SupervisionSegment(
-                        id=f"source_1_{row.source_1_path}",  # type: ignore
-                        recording_id=recording.id,
-                        start=0,
-                        duration=wav_1.shape[0] / sr,
-                        channel=0,
-                        text=transcriptions.get(audio_id_1, ""),
-                        custom={"wav_len": wav_1.shape[0]},
-                    )
-                    supervision_source_2 = SupervisionSegment(
-                        id=f"source_2_{row.source_2_path}",  # type: ignore
-                        recording_id=recording.id,
-                        start=0,
-                        duration=wav_2.shape[0] / sr,
-                        channel=1,
-                        text=transcriptions.get(audio_id_2, ""),
-                        custom={"wav_len": wav_2.shape[0]},
-                    )
-
-                    cut = MultiCut(
-                        id=mixture_id,
-                        start=0,
-                        duration=recording.duration,
-                        supervisions=[supervision_source_1, supervision_source_2],
-                        channel=recording.channel_ids,
-                        recording=recording,
-                        custom={"subset": subset},
-                    )
-
-                    yield cut
+                rows = list(recipes.rows(partition))
+                stream = stream_tar_members(tmp_ls_path, rows, self.source_members)
+                yield from self.mix_rows(mixer, tmp_ls_path, subset, stream)
+
+    def mix_rows(
+        self,
+        mixer: Mixer,
+        archive: Path,
+        subset: str,
+        rows: Iterable[tuple[Any, dict[str, bytes]]],
+    ) -> Generator[MultiCut, None, None]:
+        """Mixtures of CSV rows with their tar members"""
+        cache = get_decoded_audio_cache()
+        for row, members in rows:
+            mixture_id = row.mixture_ID
+            source_1_path = f"LibriSpeech/{row.source_1_path}"
+            source_2_path = f"LibriSpeech/{row.source_2_path}"
+            if source_1_path not in members or source_2_path not in members:
+                print("Warning: Source audio not found for", mixture_id)
+                continue
+
+            transcriptions = {}
+            for name, data in members.items():
+                if not name.endswith(".trans.txt"):
+                    continue
+                for line in data.decode("utf-8").splitlines():
+                    parts = line.strip().split(" ")
+                    audio_id, transcript = parts[0], " ".join(parts[1:])
+                    transcriptions[audio_id] = transcript
+            texts = [
+                transcriptions.get(audio_id, "")
+                for audio_id in mixture_id.split("_")[:2]
+            ]
+
+            wav_1, sr = cache.get(
+                f"{archive}:{source_1_path}", lambda: decode(members[source_1_path])
+            )
+            wav_2, sr = cache.get(
+                f"{archive}:{source_2_path}", lambda: decode(members[source_2_path])
+            )
+            with stage("mix"):
+                wav = mixer.mix([wav_1, wav_2], [row.source_1_gain, row.source_2_gain])
+                recording = array_recording(wav, sr, f"recording_{mixture_id}")
+            yield self.make_cut(row, subset, recording, [len(wav_1), len(wav_2)], texts)
+
+    def get_virtual_cuts(
+        self, csv_paths: Iterable[Path], partition: Partition
+    ) -> Generator[MultiCut, None, None]:
+        """Mixtures kept as recipes over the LibriSpeech shar, rendered when loaded"""
+        assert self.librispeech_shar_dir is not None
+        source_shar = SourceShar(self.librispeech_shar_dir)
+        shar_dirs = {"librispeech": str(source_shar.shar_dir)}
+
+        for csv_path in sorted(list(csv_paths)):
+            if str(csv_path).endswith("_info.csv"):
+                continue
+
+            subset = csv_path.stem.split("_")[1]
+            recipes = RecipeTable.from_csv(csv_path)
+
+            for row in recipes.rows(partition):
+                paths = [row.source_1_path, row.source_2_path]  # type: ignore
+                gains = [row.source_1_gain, row.source_2_gain]  # type: ignore
+                sources = [source_shar.get(Path(path).stem) for path in paths]
+                if sources[0] is None or sources[1] is None:
+                    print("Warning: Source audio not found for", row.mixture_ID)  # type: ignore
+                    continue
+
+                wav_lens = [source.num_samples for source in sources]
+                recipe = MixtureRecipe(
+                    sampling_rate=sources[0].sampling_rate,
+                    num_samples=max(wav_lens),
+                    channels=[
+                        MixtureChannel(shar="librispeech", cut_id=source.id, gain=gain)
+                        for source, gain in zip(sources, gains)
+                    ],
+                )
+                recording = mixture_recording(
+                    f"recording_{row.mixture_ID}",  # type: ignore
+                    recipe,
+                    shar_dirs,
+                )
+                texts = [source.supervisions[0].text or "" for source in sources]
+                yield self.make_cut(row, subset, recording, wav_lens, texts)
+
+    @staticmethod
+    def make_cut(
+        row,
+        subset: str,
+        recording: Recording,
+        wav_lens: list[int],
+        texts: list[str],
+    ) -> MultiCut:
+        assert recording.channel_ids is not None
+        supervisions = [
+            SupervisionSegment(
+                id=f"source_{channel + 1}_{source_path}",
+                recording_id=recording.id,
+                start=0,
+                duration=wav_lens[channel] / recording.sampling_rate,
+                channel=channel,
+                text=texts[channel],
+                custom={"wav_len": wav_lens[channel]},
+            )
+            for channel, source_path in enumerate(
+                [row.source_1_path, row.source_2_path]
+            )
+        ]
+
+        return MultiCut(
+            id=row.mixture_ID,
+            start=0,
+            duration=recording.duration,
+            supervisions=supervisions,
+            channel=recording.channel_ids,
+            recording=recording,
+            custom={"subset": subset},
+        )
+
+    @staticmethod
+    def source_members(row) -> list[str]:
+        members = []
+        for source_path in (row.source_1_path, row.source_2_path):
+            path = Path("LibriSpeech") / source_path
+            speaker_id, chapter_id = path.parent.parts[-2:]
+            members.append(str(path))
+            members.append(str(path.parent / f"{speaker_id}-{chapter_id}.trans.txt"))
+        return members
@@ -1,22 +1,54 @@
-import io
-import tarfile
 import tempfile
 import zipfile
 from pathlib import Path
-from typing import Generator
+from typing import Any, Generator, Iterable
 
 import git
-import lhotse
 import numpy as np
-import pandas as pd
-import soundfile as sf
-from lhotse import MultiCut, SupervisionSegment
+from lhotse import MultiCut, Recording, SupervisionSegment
 
-from lhotse_dataset.base import BaseCorpus, Language
+from lhotse_dataset.base import BaseCorpus, Language, Partition
+from lhotse_dataset.instrumentation import stage
+from lhotse_dataset.mixing import (
+    Mixer,
+    array_recording,
+    decode,
+    extend_noise,
+    get_decoded_audio_cache,
+)
+from lhotse_dataset.recipes import RecipeTable
+from lhotse_dataset.streaming import stream_tar_members
 from lhotse_dataset.utils import download_file
+from lhotse_dataset.virtual_mix import (
+    MixtureChannel,
+    MixtureRecipe,
+    SourceShar,
+    mixture_recording,
+)
 
 
 class Libri2MixWithNoise(BaseCorpus):
+    def __init__(
+        self,
+        librispeech_shar_dir: str | Path | None = None,
+        wham_noise_shar_dir: str | Path | None = None,
+    ) -> None:
+        """With both shars given, mixtures are written as recipes over them
+
+        librispeech_shar_dir: shar written by LibriSpeech
+        wham_noise_shar_dir: shar written by WhamNoise
+        """
+        super(Libri2MixWithNoise, self).__init__()
+        self.librispeech_shar_dir = librispeech_shar_dir
+        self.wham_noise_shar_dir = wham_noise_shar_dir
+
+    @property
+    def virtual(self) -> bool:
+        return (
+            self.librispeech_shar_dir is not None
+            and self.wham_noise_shar_dir is not None
+        )
+
     @property
     def url(self) -> str:
         return "https://github.com/JorisCos/LibriMix"
@@ -43,17 +75,29 @@ class Libri2MixWithNoise(BaseCorpus):
     def shard_size(self) -> int:
         return 5000
 
-    def get_cuts(self) -> Generator[MultiCut, None, None]:
+    @property
+    def shar_fields(self) -> dict[str, str]:
+        if self.virtual:
+            return {}
+        return super().shar_fields
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[MultiCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             dir = Path(tmp_dir) / "LibriMix"
             git.Repo.clone_from(self.url, dir)
 
             libri2mix_csv_paths = dir.glob("**/Libri2Mix/*.csv")
+            if self.virtual:
+                yield from self.get_virtual_cuts(libri2mix_csv_paths, partition)
+                return
 
             tmp_dir_path = Path(tmp_dir)
             tmp_wham_path = tmp_dir_path / "wham_noise.zip"
             download_file(self.download_url["wham_noise"]["all"], tmp_wham_path)
             wham_zip = zipfile.ZipFile(tmp_wham_path)
+            mixer = Mixer(num_channels=3)
 
             for csv_path in sorted(list(libri2mix_csv_paths)):
                 if str(csv_path).endswith("_info.csv"):
@@ -61,106 +105,162 @@ class Libri2MixWithNoise(BaseCorpus):
 
                 subset = csv_path.stem.split("_")[1]
 
-                df = pd.read_csv(csv_path)
+                recipes = RecipeTable.from_csv(csv_path)
 
                 tmp_ls_path = tmp_dir_path / f"{subset}.tar.gz"
                 download_file(self.download_url["librispeech"][subset], tmp_ls_path)
 
-                with tarfile.open(tmp_ls_path) as tar:
-                    tar.extractall(tmp_dir_path, filter="fully_trusted")
-
-                for row in df.itertuples():
-                    source_1_path = tmp_dir_path / "LibriSpeech" / row.source_1_path  # type: ignore
-                    source_2_path = tmp_dir_path / "LibriSpeech" / row.source_2_path  # type: ignore
-                    noise_path = f"wham_noise/{row.noise_path}"  # type: ignore
-
-                    try:
-                        with wham_zip.open(noise_path, "r") as audio_file:
-                            noise, sr = sf.read(audio_file)
-                    except KeyError:
-                        continue
-
-                    if len(noise.shape) > 1:
-                        noise = noise[:, 0]
-
-                    wav_1, sr = sf.read(source_1_path)
-                    wav_2, sr = sf.read(source_2_path)
-                    wav_len = max(wav_1.shape[0], wav_2.shape[0], noise.shape[0])
-
-                    if len(noise) < wav_len:
-                        noise = self.extend_noise(noise, wav_len)
-
-                    wav = np.zeros((3, wav_len), dtype=wav_1.dtype)
-                    wav[0, : wav_1.shape[0]] = wav_1 * row.source_1_gain  # type: ignore
-                    wav[1, : wav_2.shape[0]] = wav_2 * row.source_2_gain  # type: ignore
-                    wav[2, : noise.shape[0]] = noise * row.noise_gain  # type: ignore
-
-                    buf = io.BytesIO()
-                    sf.write(buf, wav.T, sr, format="WAV")
-
-                    mixture_id = row.mixture_ID  # type: ignore
-                    recording = lhotse.Recording.from_bytes(
-                        buf.getvalue(), recording_id=f"recording_{mixture_id}"
-                    )
-                    assert recording.channel_ids is not None
-
-                    supervision_source_1 = SupervisionSegment(
-                        id=f"source_1_{row.source_1_path}",  # type: ignore
-                        recording_id=recording.id,
-                        start=0,
-                        duration=recording.duration,
-                        channel=0,
-                    )
-                    supervision_source_2 = SupervisionSegment(
-                        id=f"source_2_{row.source_2_path}",  # type: ignore
-                        recording_id=recording.id,
-                        start=0,
-                        duration=recording.duration,
-                        channel=1,
-                    )
-                    supervision_noise = SupervisionSegment(
-                        id=f"noise_{row.noise_path}",  # type: ignore
-                        recording_id=recording.id,
-                        start=0,
-                        duration=recording.duration,
-                        channel=2,
-                    )
-
-                    cut = MultiCut(
-                        id=mixture_id,
-                        start=0,
-                        duration=recording.duration,
-                        supervisions=[
-                            supervision_source_1,
-                            supervision_source_2,
-                            supervision_noise,
-                        ],
-                        channel=recording.channel_ids,
-                        recording=recording,
-                        custom={"subset": subset},
-                    )
-
-                    yield cut
+                rows = list(recipes.rows(partition))
+                stream = stream_tar_members(tmp_ls_path, rows, self.source_members)
+                yield from self.mix_rows(mixer, wham_zip, tmp_ls_path, subset, stream)
 
-    @staticmethod
-    def extend_noise(noise: np.ndarray, max_length: int) -> np.ndarray:
-        """Concatenate noise using hanning window"""
-        RATE = 16000
-        noise_ex = noise
-        window = np.hanning(RATE + 1)
-        # Increasing window
-        i_w = window[: len(window) // 2 + 1]
-        # Decreasing window
-        d_w = window[len(window) // 2 :: -1]
-        # Extend until max_length is reached
-        while len(noise_ex) < max_length:
-            noise_ex = np.concatenate(
-                (
-                    noise_ex[: len(noise_ex) - len(d_w)],
-                    np.multiply(noise_ex[len(noise_ex) - len(d_w) :], d_w)
-                    + np.multiply(noise[: len(i_w)], i_w),
-                    noise[len(i_w) :],
+    def mix_rows(
+        self,
+        mixer: Mixer,
+        wham_zip: zipfile.ZipFile,
+        archive: Path,
+        subset: str,
+        rows: Iterable[tuple[Any, dict[str, bytes]]],
+    ) -> Generator[MultiCut, None, None]:
+        """Mixtures of CSV rows with their tar members"""
+        cache = get_decoded_audio_cache()
+        for row, members in rows:
+            source_1_path = f"LibriSpeech/{row.source_1_path}"
+            source_2_path = f"LibriSpeech/{row.source_2_path}"
+            noise_path = f"wham_noise/{row.noise_path}"
+
+            try:
+                noise, noise_sr = cache.get(
+                    f"{wham_zip.filename}:{noise_path}",
+                    lambda: decode(wham_zip.read(noise_path)),
                 )
+            except KeyError:
+                continue
+
+            if len(noise.shape) > 1:
+                noise = noise[:, 0]
+
+            if source_1_path not in members or source_2_path not in members:
+                print("Warning: Source audio not found for", row.mixture_ID)
+                continue
+
+            wav_1, sr = cache.get(
+                f"{archive}:{source_1_path}", lambda: decode(members[source_1_path])
             )
-        noise_ex = noise_ex[:max_length]
-        return noise_ex
+            wav_2, sr = cache.get(
+                f"{archive}:{source_2_path}", lambda: decode(members[source_2_path])
+            )
+            wav_len = max(wav_1.shape[0], wav_2.shape[0], noise.shape[0])
+
+            with stage("mix"):
+                if len(noise) < wav_len:
+                    noise = self.extend_noise(noise, wav_len, noise_sr)
+                wav = mixer.mix(
+                    [wav_1, wav_2, noise],
+                    [row.source_1_gain, row.source_2_gain, row.noise_gain],
+                )
+                recording = array_recording(wav, sr, f"recording_{row.mixture_ID}")
+            yield self.make_cut(row, subset, recording)
+
+    def get_virtual_cuts(
+        self, csv_paths: Iterable[Path], partition: Partition
+    ) -> Generator[MultiCut, None, None]:
+        """Mixtures kept as recipes over the source shars, rendered when loaded"""
+        assert self.librispeech_shar_dir is not None
+        assert self.wham_noise_shar_dir is not None
+        speech_shar = SourceShar(self.librispeech_shar_dir)
+        noise_shar = SourceShar(self.wham_noise_shar_dir, key=lambda cut: cut.id)
+        shar_dirs = {
+            "librispeech": str(speech_shar.shar_dir),
+            "wham_noise": str(noise_shar.shar_dir),
+        }
+
+        for csv_path in sorted(list(csv_paths)):
+            if str(csv_path).endswith("_info.csv"):
+                continue
+
+            subset = csv_path.stem.split("_")[1]
+            recipes = RecipeTable.from_csv(csv_path)
+
+            for row in recipes.rows(partition):
+                noise = noise_shar.get(Path(row.noise_path).stem)  # type: ignore
+                if noise is None:
+                    continue
+                paths = [row.source_1_path, row.source_2_path]  # type: ignore
+                sources = [speech_shar.get(Path(path).stem) for path in paths]
+                if sources[0] is None or sources[1] is None:
+                    print("Warning: Source audio not found for", row.mixture_ID)  # type: ignore
+                    continue
+
+                recipe = MixtureRecipe(
+                    sampling_rate=sources[0].sampling_rate,
+                    num_samples=max(cut.num_samples for cut in [*sources, noise]),
+                    channels=[
+                        MixtureChannel(
+                            shar="librispeech",
+                            cut_id=sources[0].id,
+                            gain=row.source_1_gain,  # type: ignore
+                        ),
+                        MixtureChannel(
+                            shar="librispeech",
+                            cut_id=sources[1].id,
+                            gain=row.source_2_gain,  # type: ignore
+                        ),
+                        MixtureChannel(
+                            shar="wham_noise",
+                            cut_id=noise.id,
+                            gain=row.noise_gain,  # type: ignore
+                            extend=True,
+                        ),
+                    ],
+                )
+                recording = mixture_recording(
+                    f"recording_{row.mixture_ID}",  # type: ignore
+                    recipe,
+                    shar_dirs,
+                )
+                yield self.make_cut(row, subset, recording)
+
+    @staticmethod
+    def make_cut(row, subset: str, recording: Recording) -> MultiCut:
+        assert recording.channel_ids is not None
+        supervisions = [
+            SupervisionSegment(
+                id=supervision_id,
+                recording_id=recording.id,
+                start=0,
+                duration=recording.duration,
+                channel=channel,
+            )
+            for channel, supervision_id in enumerate(
+                [
+                    f"source_1_{row.source_1_path}",
+                    f"source_2_{row.source_2_path}",
+                    f"noise_{row.noise_path}",
+                ]
+            )
+        ]
+
+        return MultiCut(
+            id=row.mixture_ID,
+            start=0,
+            duration=recording.duration,
+            supervisions=supervisions,
+            channel=recording.channel_ids,
+            recording=recording,
+            custom={"subset": subset},
+        )
+
+    @staticmethod
+    def source_members(row) -> list[str]:
+        return [
+            f"LibriSpeech/{row.source_1_path}",
+            f"LibriSpeech/{row.source_2_path}",
+        ]
+
+    @staticmethod
+    def extend_noise(
+        noise: np.ndarray, max_length: int, sampling_rate: int = 16000
+    ) -> np.ndarray:
+        """Concatenate noise using hanning window"""
+        return extend_noise(noise, max_length, sampling_rate)
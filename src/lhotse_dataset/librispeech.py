@@ -5,7 +5,15 @@ from typing import Generator
 
 import lhotse
 
-from lhotse_dataset.base import BaseCorpus, Gender, Language, SpeakerInfo
+from lhotse_dataset.base import (
+    BaseCorpus,
+    Gender,
+    Language,
+    Partition,
+    SpeakerInfo,
+)
+from lhotse_dataset.probe import recording_from_bytes
+from lhotse_dataset.streaming import read_member
 from lhotse_dataset.utils import download_file
 
 
@@ -34,71 +42,112 @@ class LibriSpeech(BaseCorpus):
     def shard_size(self) -> int:
         return 5000
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
+        speakers: dict[str, SpeakerInfo] = {}
+
         with tempfile.TemporaryDirectory() as tmp_dir:
             for dataset_type, download_url in self.download_url.items():
-                tmp_dir_path = Path(tmp_dir)
-                tmp_path = tmp_dir_path / f"{dataset_type}.tar.gz"
+                tmp_path = Path(tmp_dir) / f"{dataset_type}.tar.gz"
                 download_file(download_url, tmp_path)
 
-                with tarfile.open(tmp_path) as tar:
-                    tar.extractall(tmp_dir_path, filter="fully_trusted")
+                # Audio is held back until its transcript, and SPEAKERS.TXT in the
+                # first archive, have streamed past.
+                transcripts: dict[str, str] = {}
+                pending_audio: dict[str, bytes] = {}
+                num_audio = 0
+
+                with tarfile.open(tmp_path, mode="r|gz") as tar:
+                    for member in tar:
+                        if not member.isfile():
+                            continue
 
-                speakers = {}
-                speakers_file_path = Path(tmp_dir) / "LibriSpeech/SPEAKERS.TXT"
-                with open(speakers_file_path, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                    for line in lines:
-                        if line.startswith(";"):
+                        path = Path(member.name)
+                        if path.name == "SPEAKERS.TXT":
+                            text = read_member(tar, member).decode("utf-8")
+                            speakers.update(self.parse_speakers(text))
+                            stems = list(pending_audio)
+                        elif path.name.endswith(".trans.txt"):
+                            lines = read_member(tar, member).decode("utf-8")
+                            stems = []
+                            for line in lines.splitlines():
+                                parts = line.strip().split(" ")
+                                transcripts[parts[0]] = " ".join(parts[1:])
+                                stems.append(parts[0])
+                        elif path.suffix == ".flac":
+                            if partition.includes(num_audio):
+                                pending_audio[path.stem] = read_member(tar, member)
+                            num_audio += 1
+                            stems = [path.stem]
+                        else:
                             continue
-                        parts = [p.strip() for p in line.split("|")]
-                        speaker_id, gender_str, name = (
-                            parts[0],
-                            parts[1],
-                            "".join(parts[4:]),
-                        )
-                        gender = Gender.MALE if gender_str == "M" else Gender.FEMALE
-                        speakers[speaker_id] = SpeakerInfo(
-                            id=speaker_id, name=name, gender=gender
-                        )
-
-                trans_files = list(tmp_dir_path.glob("LibriSpeech/**/*.trans.txt"))
-                for trans_file_path in trans_files:
-                    with open(trans_file_path, "r", encoding="utf-8") as f:
-                        lines = f.readlines()
-
-                    for line in lines:
-                        parts = line.strip().split(" ")
-                        stem, transcript = parts[0], " ".join(parts[1:])
-                        speaker_id = stem.split("-")[0]
-                        audio_id = f"librispeech_{dataset_type}_{stem}"
-
-                        wav_file_path = trans_file_path.parent / f"{stem}.flac"
-
-                        recording = lhotse.Recording.from_file(str(wav_file_path))
-
-                        supervision = lhotse.SupervisionSegment(
-                            id=f"segment_{audio_id}",
-                            recording_id=recording.id,
-                            start=0,
-                            duration=recording.duration,
-                            channel=0,
-                            text=transcript,
-                            language=self.language.value,
-                            speaker=speaker_id,
-                            gender=speakers[speaker_id].gender.value,
-                            custom={
-                                "subset": dataset_type,
-                                "speaker_name": speakers[speaker_id].name,
-                            },
-                        )
-
-                        cut = lhotse.MonoCut(
-                            id=audio_id,
-                            start=0,
-                            duration=recording.duration,
-                            channel=0,
-                            supervisions=[supervision],
-                            recording=recording,
-                        )
-                        yield cut
+
+                        for stem in stems:
+                            speaker_id = stem.split("-")[0]
+                            if (
+                                stem in pending_audio
+                                and stem in transcripts
+                                and speaker_id in speakers
+                            ):
+                                yield self.make_cut(
+                                    dataset_type,
+                                    stem,
+                                    transcripts.pop(stem),
+                                    pending_audio.pop(stem),
+                                    speakers[speaker_id],
+                                )
+
+    def make_cut(
+        self,
+        dataset_type: str,
+        stem: str,
+        transcript: str,
+        audio: bytes,
+        speaker: SpeakerInfo,
+    ) -> lhotse.MonoCut:
+        audio_id = f"librispeech_{dataset_type}_{stem}"
+
+        recording = recording_from_bytes(audio, stem)
+
+        supervision = lhotse.SupervisionSegment(
+            id=f"segment_{audio_id}",
+            recording_id=recording.id,
+            start=0,
+            duration=recording.duration,
+            channel=0,
+            text=transcript,
+            language=self.language.value,
+            speaker=speaker.id,
+            gender=speaker.gender.value,
+            custom={
+                "subset": dataset_type,
+                "speaker_name": speaker.name,
+            },
+        )
+
+        cut = lhotse.MonoCut(
+            id=audio_id,
+            start=0,
+            duration=recording.duration,
+            channel=0,
+            supervisions=[supervision],
+            recording=recording,
+        )
+        return cut
+
+    @staticmethod
+    def parse_speakers(text: str) -> dict[str, SpeakerInfo]:
+        speakers = {}
+        for line in text.splitlines():
+            if line.startswith(";") or not line.strip():
+                continue
+            parts = [p.strip() for p in line.split("|")]
+            speaker_id, gender_str, name = (
+                parts[0],
+                parts[1],
+                "".join(parts[4:]),
+            )
+            gender = Gender.MALE if gender_str == "M" else Gender.FEMALE
+            speakers[speaker_id] = SpeakerInfo(id=speaker_id, name=name, gender=gender)
+        return speakers
@@ -1,3 +1,4 @@
+import io
 import tarfile
 import tempfile
 from pathlib import Path
@@ -6,7 +7,16 @@ from typing import Generator
 import lhotse
 import pandas as pd
 
-from lhotse_dataset.base import BaseCorpus, Gender, Language, SpeakerInfo
+from lhotse_dataset.base import (
+    BaseCorpus,
+    Gender,
+    Language,
+    Partition,
+    SpeakerInfo,
+)
+from lhotse_dataset.probe import recording_from_bytes
+from lhotse_dataset.streaming import read_member
+from lhotse_dataset.transcripts import TranscriptIndex
 from lhotse_dataset.utils import download_file
 
 
@@ -39,83 +49,115 @@ class LibriTTSR(BaseCorpus):
     def shard_size(self) -> int:
         return 5000
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_dir_path = Path(tmp_dir)
             tmp_doc_path = tmp_dir_path / "doc.tar.gz"
             download_file(self.doc_url, tmp_doc_path)
 
-            with tarfile.open(tmp_doc_path) as tar:
-                tar.extractall(tmp_dir_path, filter="fully_trusted")
-
             speakers = {}
-            speakers_tsv_path = Path(tmp_dir) / "LibriTTS_R/speakers.tsv"
-            df_speakers = pd.read_csv(speakers_tsv_path, sep="\t", index_col=0)
-            for row in df_speakers.itertuples():
-                gender = Gender.MALE if row[1] == "M" else Gender.FEMALE
-                speaker_id = str(row[0])
-                speakers[speaker_id] = SpeakerInfo(
-                    id=speaker_id, name=str(row[3]), gender=gender
-                )
+            with tarfile.open(tmp_doc_path, mode="r|gz") as tar:
+                for member in tar:
+                    if member.name != "LibriTTS_R/speakers.tsv":
+                        continue
+                    speakers_tsv = io.BytesIO(read_member(tar, member))
+                    df_speakers = pd.read_csv(speakers_tsv, sep="\t", index_col=0)
+                    for row in df_speakers.itertuples():
+                        gender = Gender.MALE if row[1] == "M" else Gender.FEMALE
+                        speaker_id = str(row[0])
+                        speakers[speaker_id] = SpeakerInfo(
+                            id=speaker_id, name=str(row[3]), gender=gender
+                        )
 
             for subset, download_url in self.download_url.items():
                 tmp_path = tmp_dir_path / f"{subset}.tar.gz"
                 download_file(download_url, tmp_path)
 
-                with tarfile.open(tmp_path) as tar:
-                    tar.extractall(tmp_dir_path, filter="fully_trusted")
-
-                wav_files = list(tmp_dir_path.glob("LibriTTS_R/**/*.wav"))
-                for wav_file in wav_files:
-                    normalized_txt_path = (
-                        wav_file.parent / f"{wav_file.stem}.normalized.txt"
-                    )
-
-                    try:
-                        with open(normalized_txt_path, "r", encoding="utf-8") as f:
-                            normalized_txt = f.readline()
-                    except FileNotFoundError:
-                        print("Warning: Normalized text file not found for", wav_file)
-                        normalized_txt = ""
-
-                    original_txt_path = (
-                        wav_file.parent / f"{wav_file.stem}.original.txt"
-                    )
-                    try:
-                        with open(original_txt_path, "r", encoding="utf-8") as f:
-                            original_txt = f.readline()
-                    except FileNotFoundError:
-                        print("Warning: Original text file not found for", wav_file)
-                        original_txt = ""
-
-                    speaker_id = wav_file.stem.split("_")[0]
-                    audio_id = f"libritts_r_{subset}_{wav_file.stem}"
-
-                    recording = lhotse.Recording.from_file(str(wav_file))
-
-                    supervision = lhotse.SupervisionSegment(
-                        id=f"segment_{audio_id}",
-                        recording_id=recording.id,
-                        start=0,
-                        duration=recording.duration,
-                        channel=0,
-                        text=normalized_txt,
-                        language=self.language.value,
-                        speaker=speaker_id,
-                        gender=speakers[speaker_id].gender.value,
-                        custom={
-                            "subset": subset,
-                            "original_text": original_txt,
-                            "speaker_name": speakers[speaker_id].name,
-                        },
-                    )
-
-                    cut = lhotse.MonoCut(
-                        id=audio_id,
-                        start=0,
-                        duration=recording.duration,
-                        channel=0,
-                        supervisions=[supervision],
-                        recording=recording,
-                    )
-                    yield cut
+                transcripts = TranscriptIndex.load(download_url, tmp_path)
+                cached = transcripts is not None
+                if transcripts is None:
+                    transcripts = TranscriptIndex(archive_size=tmp_path.stat().st_size)
+
+                # Without a cached index, audio is held back until its texts, which
+                # sit next to it in the archive, have streamed past.
+                pending_audio: dict[str, bytes] = {}
+                num_wavs = 0
+                with tarfile.open(tmp_path, mode="r|gz") as tar:
+                    for member in tar:
+                        if not member.isfile():
+                            continue
+
+                        path = Path(member.name)
+                        if path.suffix == ".txt":
+                            if cached:
+                                continue
+                            transcripts.add(path.name, read_member(tar, member))
+                            stem = path.name.split(".")[0]
+                        elif path.suffix == ".wav":
+                            if partition.includes(num_wavs):
+                                pending_audio[path.stem] = read_member(tar, member)
+                            num_wavs += 1
+                            stem = path.stem
+                        else:
+                            continue
+
+                        if stem in pending_audio and (
+                            cached or transcripts.complete(stem)
+                        ):
+                            yield self.make_cut(
+                                subset,
+                                stem,
+                                pending_audio.pop(stem),
+                                transcripts,
+                                speakers,
+                            )
+
+                # audio whose texts are not all in the archive, counted as missing
+                for stem, wav_bytes in pending_audio.items():
+                    yield self.make_cut(subset, stem, wav_bytes, transcripts, speakers)
+                if not cached:
+                    transcripts.cache(download_url)
+
+    def make_cut(
+        self,
+        subset: str,
+        stem: str,
+        wav_bytes: bytes,
+        transcripts: TranscriptIndex,
+        speakers: dict[str, SpeakerInfo],
+    ) -> lhotse.MonoCut:
+        normalized_txt, original_txt = transcripts.texts(stem)
+
+        speaker_id = stem.split("_")[0]
+        audio_id = f"libritts_r_{subset}_{stem}"
+
+        recording = recording_from_bytes(wav_bytes, stem)
+
+        supervision = lhotse.SupervisionSegment(
+            id=f"segment_{audio_id}",
+            recording_id=recording.id,
+            start=0,
+            duration=recording.duration,
+            channel=0,
+            text=normalized_txt,
+            language=self.language.value,
+            speaker=speaker_id,
+            gender=speakers[speaker_id].gender.value,
+            custom={
+                "subset": subset,
+                "original_text": original_txt,
+                "speaker_name": speakers[speaker_id].name,
+            },
+        )
+
+        cut = lhotse.MonoCut(
+            id=audio_id,
+            start=0,
+            duration=recording.duration,
+            channel=0,
+            supervisions=[supervision],
+            recording=recording,
+        )
+        return cut
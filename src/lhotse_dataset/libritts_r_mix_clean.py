@@ -1,19 +1,48 @@
-import io
-import tarfile
 import tempfile
 from pathlib import Path
-from typing import Generator
+from typing import Any, Generator, Iterable
 
 import lhotse
-import numpy as np
-import pandas as pd
-import soundfile as sf
 
-from lhotse_dataset.base import BaseCorpus, Language
+from lhotse_dataset.base import BaseCorpus, Language, Partition
+from lhotse_dataset.instrumentation import stage
+from lhotse_dataset.mixing import (
+    Mixer,
+    array_recording,
+    decode,
+    get_decoded_audio_cache,
+)
+from lhotse_dataset.recipes import RecipeTable
+from lhotse_dataset.streaming import stream_tar_members
+from lhotse_dataset.transcripts import (
+    NORMALIZED_SUFFIX,
+    ORIGINAL_SUFFIX,
+    TranscriptIndex,
+)
 from lhotse_dataset.utils import download_file
+from lhotse_dataset.virtual_mix import (
+    MixtureChannel,
+    MixtureRecipe,
+    SourceShar,
+    mixture_recording,
+)
 
 
 class LibriTTSRMixClean(BaseCorpus):
+    def __init__(
+        self,
+        metadata_dir: Path | None = None,
+        libritts_r_shar_dir: str | Path | None = None,
+    ) -> None:
+        """metadata_dir: directory of mixture CSVs, the packaged ones by default
+        libritts_r_shar_dir: LibriTTS-R shar to write recipe-only mixtures of
+        """
+        super(LibriTTSRMixClean, self).__init__()
+        if metadata_dir is None:
+            metadata_dir = Path(__file__).parent / "data/libritts_r_mix"
+        self.metadata_dir = metadata_dir
+        self.libritts_r_shar_dir = libritts_r_shar_dir
+
     @property
     def download_url(self) -> dict[str, str]:
         return {
@@ -31,125 +60,168 @@ class LibriTTSRMixClean(BaseCorpus):
     def shard_size(self) -> int:
         return 100
 
-    def get_cuts(self) -> Generator[lhotse.MultiCut, None, None]:
-        metadata_dir = Path(__file__).parent / "data/libritts_r_mix"
-        csv_paths = sorted(list(metadata_dir.glob("*.csv")))
+    @property
+    def shar_fields(self) -> dict[str, str]:
+        if self.libritts_r_shar_dir is not None:
+            return {}
+        return super().shar_fields
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MultiCut, None, None]:
+        csv_paths = sorted(list(self.metadata_dir.glob("*.csv")))
+        if self.libritts_r_shar_dir is not None:
+            yield from self.get_virtual_cuts(csv_paths, partition)
+            return
 
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_dir_path = Path(tmp_dir)
+            mixer = Mixer(num_channels=2)
 
             for csv_path in csv_paths:
                 subset = csv_path.stem.split("_")[-1]
-                df = pd.read_csv(csv_path)
+                recipes = RecipeTable.from_csv(csv_path)
 
                 tmp_ls_path = tmp_dir_path / f"{subset}.tar.gz"
                 download_file(self.download_url[subset], tmp_ls_path)
-
-                with tarfile.open(tmp_ls_path) as tar:
-                    tar.extractall(tmp_dir_path, filter="fully_trusted")
-
-                for row in df.itertuples():
-                    source_1_path = tmp_dir_path / "LibriTTS_R" / row.source_1_path  # type: ignore
-                    source_2_path = tmp_dir_path / "LibriTTS_R" / row.source_2_path  # type: ignore
-
-                    wav_1, sr = sf.read(source_1_path)
-                    wav_2, sr = sf.read(source_2_path)
-                    wav_len = max(wav_1.shape[0], wav_2.shape[0])
-
-                    wav = np.zeros((2, wav_len), dtype=wav_1.dtype)
-                    wav[0, : wav_1.shape[0]] = wav_1 * row.source_1_gain  # type: ignore
-                    wav[1, : wav_2.shape[0]] = wav_2 * row.source_2_gain  # type: ignore
-
-                    buf = io.BytesIO()
-                    sf.write(buf, wav.T, sr, format="WAV")
-
-                    mixture_id = row.mixture_ID  # type: ignore
-                    recording = lhotse.Recording.from_bytes(
-                        buf.getvalue(), recording_id=f"recording_{mixture_id}"
-                    )
-                    assert recording.channel_ids is not None
-
-                    normalized_txt_path_1 = (
-                        source_1_path.parent / f"{source_1_path.stem}.normalized.txt"
-                    )
-                    try:
-                        with open(normalized_txt_path_1, "r", encoding="utf-8") as f:
-                            normalized_txt_1 = f.readline()
-                    except FileNotFoundError:
-                        print(
-                            "Warning: Normalized text file not found for", source_1_path
-                        )
-                        normalized_txt_1 = ""
-
-                    original_txt_path_1 = (
-                        source_1_path.parent / f"{source_1_path.stem}.original.txt"
-                    )
-                    try:
-                        with open(original_txt_path_1, "r", encoding="utf-8") as f:
-                            original_txt_1 = f.readline()
-                    except FileNotFoundError:
-                        print(
-                            "Warning: Original text file not found for", source_1_path
-                        )
-                        original_txt_1 = ""
-
-                    normalized_txt_path_2 = (
-                        source_2_path.parent / f"{source_2_path.stem}.normalized.txt"
-                    )
-                    try:
-                        with open(normalized_txt_path_2, "r", encoding="utf-8") as f:
-                            normalized_txt_2 = f.readline()
-                    except FileNotFoundError:
-                        print(
-                            "Warning: Normalized text file not found for", source_2_path
-                        )
-                        normalized_txt_2 = ""
-
-                    original_txt_path_2 = (
-                        source_2_path.parent / f"{source_2_path.stem}.original.txt"
-                    )
-                    try:
-                        with open(original_txt_path_2, "r", encoding="utf-8") as f:
-                            original_txt_2 = f.readline()
-                    except FileNotFoundError:
-                        print(
-                            "Warning: Original text file not found for", source_2_path
-                        )
-                        original_txt_2 = ""
-
-                    supervision_source_1 = lhotse.SupervisionSegment(
-                        id=f"source_1_{row.source_1_path}",  # type: ignore
-                        recording_id=recording.id,
-                        start=0,
-                        duration=wav_1.shape[0] / sr,
-                        channel=0,
-                        text=normalized_txt_1,
-                        custom={
-                            "wav_len": wav_1.shape[0],
-                            "original_txt": original_txt_1,
-                        },
+                # the texts of the sources stream in with them on a miss
+                transcripts = TranscriptIndex.load(
+                    self.download_url[subset], tmp_ls_path
+                )
+                if transcripts is None:
+                    transcripts = TranscriptIndex()
+
+                rows = list(recipes.rows(partition))
+                stream = stream_tar_members(tmp_ls_path, rows, self.source_members)
+                yield from self.mix_rows(
+                    mixer, tmp_ls_path, transcripts, subset, stream
+                )
+
+    def mix_rows(
+        self,
+        mixer: Mixer,
+        archive: Path,
+        transcripts: TranscriptIndex,
+        subset: str,
+        rows: Iterable[tuple[Any, dict[str, bytes]]],
+    ) -> Generator[lhotse.MultiCut, None, None]:
+        """Mixtures of CSV rows with their tar members"""
+        cache = get_decoded_audio_cache()
+        for row, members in rows:
+            source_1_path = f"LibriTTS_R/{row.source_1_path}"
+            source_2_path = f"LibriTTS_R/{row.source_2_path}"
+            if source_1_path not in members or source_2_path not in members:
+                print("Warning: Source audio not found for", row.mixture_ID)
+                continue
+
+            for name, data in members.items():
+                if name.endswith(".txt"):
+                    transcripts.add(Path(name).name, data)
+            texts = [
+                transcripts.texts(Path(path).stem)
+                for path in (source_1_path, source_2_path)
+            ]
+            wav_1, sr = cache.get(
+                f"{archive}:{source_1_path}", lambda: decode(members[source_1_path])
+            )
+            wav_2, sr = cache.get(
+                f"{archive}:{source_2_path}", lambda: decode(members[source_2_path])
+            )
+            with stage("mix"):
+                wav = mixer.mix([wav_1, wav_2], [row.source_1_gain, row.source_2_gain])
+                recording = array_recording(wav, sr, f"recording_{row.mixture_ID}")
+            yield self.make_cut(row, subset, recording, [len(wav_1), len(wav_2)], texts)
+
+    def get_virtual_cuts(
+        self, csv_paths: list[Path], partition: Partition
+    ) -> Generator[lhotse.MultiCut, None, None]:
+        """Mixtures kept as recipes over the LibriTTS-R shar, rendered when loaded"""
+        assert self.libritts_r_shar_dir is not None
+        source_shar = SourceShar(self.libritts_r_shar_dir)
+        shar_dirs = {"libritts_r": str(source_shar.shar_dir)}
+
+        for csv_path in csv_paths:
+            subset = csv_path.stem.split("_")[-1]
+            recipes = RecipeTable.from_csv(csv_path)
+
+            for row in recipes.rows(partition):
+                paths = [row.source_1_path, row.source_2_path]  # type: ignore
+                gains = [row.source_1_gain, row.source_2_gain]  # type: ignore
+                sources = [source_shar.get(Path(path).stem) for path in paths]
+                if sources[0] is None or sources[1] is None:
+                    print("Warning: Source audio not found for", row.mixture_ID)  # type: ignore
+                    continue
+
+                wav_lens = [source.num_samples for source in sources]
+                recipe = MixtureRecipe(
+                    sampling_rate=sources[0].sampling_rate,
+                    num_samples=max(wav_lens),
+                    channels=[
+                        MixtureChannel(shar="libritts_r", cut_id=source.id, gain=gain)
+                        for source, gain in zip(sources, gains)
+                    ],
+                )
+                recording = mixture_recording(
+                    f"recording_{row.mixture_ID}",  # type: ignore
+                    recipe,
+                    shar_dirs,
+                )
+                texts = [
+                    (
+                        source.supervisions[0].text,
+                        source.supervisions[0].custom["original_text"],
                     )
-                    supervision_source_2 = lhotse.SupervisionSegment(
-                        id=f"source_2_{row.source_2_path}",  # type: ignore
-                        recording_id=recording.id,
-                        start=0,
-                        duration=wav_2.shape[0] / sr,
-                        channel=1,
-                        text=normalized_txt_2,
-                        custom={
-                            "wav_len": wav_2.shape[0],
-                            "original_txt": original_txt_2,
-                        },
-                    )
-
-                    cut = lhotse.MultiCut(
-                        id=mixture_id,
-                        start=0,
-                        duration=recording.duration,
-                        supervisions=[supervision_source_1, supervision_source_2],
-                        channel=recording.channel_ids,
-                        recording=recording,
-                        custom={"subset": subset},
-                    )
-
-                    yield cut
+                    for source in sources
+                ]
+                yield self.make_cut(row, subset, recording, wav_lens, texts)
+
+    @staticmethod
+    def make_cut(
+        row,
+        subset: str,
+        recording: lhotse.Recording,
+        wav_lens: list[int],
+        texts: list[tuple[str, str]],
+    ) -> lhotse.MultiCut:
+        """texts: normalized and original text of each source"""
+        assert recording.channel_ids is not None
+        supervisions = []
+        for channel, source_path in enumerate([row.source_1_path, row.source_2_path]):
+            normalized_txt, original_txt = texts[channel]
+            supervisions.append(
+                lhotse.SupervisionSegment(
+                    id=f"source_{channel + 1}_{source_path}",
+                    recording_id=recording.id,
+                    start=0,
+                    duration=wav_lens[channel] / recording.sampling_rate,
+                    channel=channel,
+                    text=normalized_txt,
+                    custom={
+                        "wav_len": wav_lens[channel],
+                        "original_txt": original_txt,
+                    },
+                )
+            )
+
+        return lhotse.MultiCut(
+            id=row.mixture_ID,
+            start=0,
+            duration=recording.duration,
+            supervisions=supervisions,
+            channel=recording.channel_ids,
+            recording=recording,
+            custom={"subset": subset},
+        )
+
+    @staticmethod
+    def source_members(row) -> list[str]:
+        """The audio of both sources with their texts, which sit next to it"""
+        members = []
+        for source_path in (row.source_1_path, row.source_2_path):
+            stem = f"LibriTTS_R/{source_path}".removesuffix(".wav")
+            members += [
+                f"{stem}.wav",
+                f"{stem}{NORMALIZED_SUFFIX}",
+                f"{stem}{ORIGINAL_SUFFIX}",
+            ]
+        return members
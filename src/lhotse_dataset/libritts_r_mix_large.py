@@ -1,15 +1,27 @@
-import io
-import uuid
+import hashlib
 from pathlib import Path
-from typing import Generator
+from typing import Generator, Iterable
 
 import lhotse
 import numpy as np
-import soundfile as sf
 from lhotse import CutSet
+from lhotse.cut import Cut
 from tqdm import tqdm
 
-from lhotse_dataset.base import BaseCorpus, Language
+from lhotse_dataset.base import BaseCorpus, Language, Partition
+from lhotse_dataset.instrumentation import stage
+from lhotse_dataset.mixing import (
+    Mixer,
+    array_recording,
+    decode,
+    get_decoded_audio_cache,
+)
+from lhotse_dataset.pairs import PairSampler
+from lhotse_dataset.shar_index import SharReader
+from lhotse_dataset.virtual_mix import MixtureChannel, MixtureRecipe, mixture_recording
+
+# each valid pair is mixed with this probability, in descending duration order
+MIX_PROBABILITY = 0.01
 
 
 class LibriTTSRMixLarge(BaseCorpus):
@@ -20,7 +32,10 @@ class LibriTTSRMixLarge(BaseCorpus):
         num_dev_clean: int = 5000,
         num_train_clean_100: int = 100000,
         num_train_clean_360: int = 300000,
+        seed: int = 42,
+        virtual: bool = False,
     ) -> None:
+        """virtual: write the mixtures as recipes over the shar, rendered when loaded"""
         super(LibriTTSRMixLarge, self).__init__()
 
         if isinstance(libritts_r_shar_dir, str):
@@ -33,6 +48,8 @@ class LibriTTSRMixLarge(BaseCorpus):
         self.num_dev_clean = num_dev_clean
         self.num_train_clean_100 = num_train_clean_100
         self.num_train_clean_360 = num_train_clean_360
+        self.seed = seed
+        self.virtual = virtual
 
     @property
     def subset_samples(self) -> dict[str, int]:
@@ -51,11 +68,21 @@ class LibriTTSRMixLarge(BaseCorpus):
     def shard_size(self) -> int:
         return 1000
 
-    def get_cuts(self) -> Generator[lhotse.MultiCut, None, None]:
+    @property
+    def shar_fields(self) -> dict[str, str]:
+        if self.virtual:
+            return {}
+        return super().shar_fields
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MultiCut, None, None]:
         cut_paths = sorted(list(map(str, self.shar_dir.glob("cuts.*.jsonl.gz"))))
-        recording_paths = sorted(list(map(str, self.shar_dir.glob("recording.*.tar"))))
+        # pairs are random, so audio is read by offset rather than tar by tar
+        reader = SharReader(self.shar_dir)
+        mixer = Mixer(num_channels=2)
 
-        cuts = CutSet.from_shar({"cuts": cut_paths, "recording": recording_paths})
+        cuts = CutSet.from_shar({"cuts": cut_paths})
         cuts = cuts.filter(lambda c: c.duration >= 3.0)  # type: ignore
         cuts = cuts.filter(lambda c: c.duration < 20.0)  # type: ignore
         cuts = cuts.filter(lambda c: len(c.supervisions) > 0)  # type: ignore
@@ -66,78 +93,111 @@ class LibriTTSRMixLarge(BaseCorpus):
             )
             cuts_subset = cuts_subset.sort_by_duration()
 
-            data_count = 0
-
-            for cut_1 in tqdm(cuts_subset.data, desc=subset):
-                if data_count >= samples:
-                    break
-
-                for cut_2 in cuts_subset.data:
-                    if data_count >= samples:
-                        break
-
-                    if cut_1.duration < cut_2.duration:
-                        continue
-                    if cut_1.supervisions[0].speaker == cut_2.supervisions[0].speaker:
-                        continue
-
-                    # Generate mix with probability (adjust as needed)
-                    if np.random.uniform(0, 1) < 0.01:
-                        wav_1 = cut_1.load_audio()
-                        wav_2 = cut_2.load_audio()
-                        wav_len = max(wav_1.shape[-1], wav_2.shape[-1])
-
-                        wav = np.zeros((2, wav_len), dtype=wav_1.dtype)
-                        wav[0, : wav_1.shape[-1]] = wav_1
-                        wav[1, : wav_2.shape[-1]] = wav_2
-
-                        buf = io.BytesIO()
-                        sr = cut_1.sampling_rate
-                        sf.write(buf, wav.T, sr, format="WAV")
-
-                        mixture_id = uuid.uuid4().hex
-                        recording = lhotse.Recording.from_bytes(
-                            buf.getvalue(), recording_id=f"recording_{mixture_id}"
-                        )
-                        assert recording.channel_ids is not None
-
-                        s1 = cut_1.supervisions[0]
-                        assert s1.custom is not None
-                        supervision_source_1 = lhotse.SupervisionSegment(
-                            id=s1.id,
-                            recording_id=recording.id,
-                            start=0,
-                            duration=wav_1.shape[-1] / sr,
-                            channel=0,
-                            text=s1.text,
-                            custom={
-                                "wav_len": wav_1.shape[-1],
-                                "original_text": s1.custom["original_text"],
-                            },
-                        )
-                        s2 = cut_2.supervisions[0]
-                        assert s2.custom is not None
-                        supervision_source_2 = lhotse.SupervisionSegment(
-                            id=s2.id,
-                            recording_id=recording.id,
-                            start=0,
-                            duration=wav_2.shape[-1] / sr,
-                            channel=1,
-                            text=s2.text,
-                            custom={
-                                "wav_len": wav_2.shape[-1],
-                                "original_text": s2.custom["original_text"],
-                            },
-                        )
-
-                        cut = lhotse.MultiCut(
-                            id=mixture_id,
-                            start=0,
-                            duration=recording.duration,
-                            supervisions=[supervision_source_1, supervision_source_2],
-                            channel=recording.channel_ids,
-                            recording=recording,
-                            custom={"subset": subset},
-                        )
-                        data_count += 1
-                        yield cut
+            cuts_data = cuts_subset.data
+            sampler = PairSampler(
+                np.array([cut.duration for cut in cuts_data]),
+                [cut.supervisions[0].speaker for cut in cuts_data],
+            )
+
+            # Every partition draws the same pairs and renders only its own share
+            rng = np.random.default_rng(self.seed)
+            pairs = sampler.thinned(samples, MIX_PROBABILITY, rng)
+
+            selected = tqdm(partition.select(pairs.tolist()), desc=subset)
+            sources = (
+                (self.mixture_id(subset, i, j), [cuts_data[i], cuts_data[j]])
+                for i, j in selected
+            )
+            if self.virtual:
+                yield from self.recipe_mixtures(subset, sources)
+            else:
+                yield from self.render_mixtures(mixer, reader, subset, sources)
+
+    def mixture_id(self, subset: str, i: int, j: int) -> str:
+        """Id of the mixture of the `i`-th and `j`-th cuts of `subset`
+
+        The same on every run, so that a resumed `write_shar` matches its ledger.
+        """
+        key = f"{self.seed}:{subset}:{i}:{j}".encode()
+        return hashlib.sha256(key).hexdigest()[:32]
+
+    def render_mixtures(
+        self,
+        mixer: Mixer,
+        reader: SharReader,
+        subset: str,
+        sources: Iterable[tuple[str, list[Cut]]],
+    ) -> Generator[lhotse.MultiCut, None, None]:
+        cache = get_decoded_audio_cache()
+
+        def load(cut: Cut) -> np.ndarray:
+            samples, _ = cache.get(
+                f"{reader.shar_dir}:{cut.id}", lambda: decode(reader.read(cut.id))
+            )
+            return samples
+
+        for mixture_id, pair in sources:
+            pair_wavs = [load(cut) for cut in pair]
+            with stage("mix"):
+                recording = array_recording(
+                    mixer.mix(pair_wavs),
+                    pair[0].sampling_rate,
+                    f"recording_{mixture_id}",
+                )
+            wav_lens = [len(pair_wav) for pair_wav in pair_wavs]
+            yield self.make_cut(mixture_id, subset, recording, pair, wav_lens)
+
+    def recipe_mixtures(
+        self, subset: str, sources: Iterable[tuple[str, list[Cut]]]
+    ) -> Generator[lhotse.MultiCut, None, None]:
+        for mixture_id, pair in sources:
+            wav_lens = [cut.num_samples for cut in pair]
+            recipe = MixtureRecipe(
+                sampling_rate=pair[0].sampling_rate,
+                num_samples=max(wav_lens),
+                channels=[
+                    MixtureChannel(shar="libritts_r", cut_id=cut.id) for cut in pair
+                ],
+            )
+            recording = mixture_recording(
+                f"recording_{mixture_id}", recipe, {"libritts_r": str(self.shar_dir)}
+            )
+            yield self.make_cut(mixture_id, subset, recording, pair, wav_lens)
+
+    @staticmethod
+    def make_cut(
+        mixture_id: str,
+        subset: str,
+        recording: lhotse.Recording,
+        sources: list[Cut],
+        wav_lens: list[int],
+    ) -> lhotse.MultiCut:
+        assert recording.channel_ids is not None
+        supervisions = []
+        for channel, (source, wav_len) in enumerate(zip(sources, wav_lens)):
+            s = source.supervisions[0]
+            assert s.custom is not None
+            supervisions.append(
+                lhotse.SupervisionSegment(
+                    id=s.id,
+                    recording_id=recording.id,
+                    start=0,
+                    duration=wav_len / recording.sampling_rate,
+                    channel=channel,
+                    text=s.text,
+                    custom={
+                        "wav_len": wav_len,
+                        "original_text": s.custom["original_text"],
+                    },
+                )
+            )
+
+        return lhotse.MultiCut(
+            id=mixture_id,
+            start=0,
+            duration=recording.duration,
+            supervisions=supervisions,
+            channel=recording.channel_ids,
+            recording=recording,
+            custom={"subset": subset},
+        )
@@ -2,9 +2,10 @@ import uuid
 from typing import Generator
 
 from datasets import DatasetDict, load_dataset
-from lhotse import MonoCut, Recording
+from lhotse import MonoCut
 
-from lhotse_dataset.base import BaseCorpus
+from lhotse_dataset.base import BaseCorpus, Partition
+from lhotse_dataset.probe import recording_from_file
 
 
 class MITEnvironmentalImpulseResponses(BaseCorpus):
@@ -16,16 +17,24 @@ class MITEnvironmentalImpulseResponses(BaseCorpus):
     def shard_size(self) -> int:
         return 10
 
-    def get_cuts(self) -> Generator[MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[MonoCut, None, None]:
         ds = load_dataset("davidscripka/MIT_environmental_impulse_responses")
         assert isinstance(ds, DatasetDict)
 
-        for data in ds["train"]:
+        ds_train = ds["train"].shard(
+            num_shards=partition.num_partitions,
+            index=partition.index,
+            # round-robin, as `Partition.includes`
+            contiguous=False,
+        )
+        for data in ds_train:
             assert isinstance(data, dict)
             audio = data["audio"]
 
             id = uuid.uuid4().hex
-            recording = Recording.from_file(
+            recording = recording_from_file(
                 audio["path"], recording_id=f"recording_{id}"
             )
 
@@ -0,0 +1,232 @@
+import functools
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Sequence
+
+import lhotse
+import numpy as np
+import soundfile as sf
+from lhotse.audio.backend import save_audio
+from lhotse.audio.source import AudioSource
+
+from lhotse_dataset.instrumentation import count, stage
+
+DEFAULT_DECODED_CACHE_MAX_BYTES = 1024**3
+
+ARRAY_SOURCE_TYPE = "array"
+
+
+class Mixer:
+    """Mixes sources channel by channel into a new float32 array
+
+    Each source goes into its own channel from `offset` on, zero padded to the
+    longest one, and is scaled by its gain as it is copied, without a temporary.
+    """
+
+    def __init__(self, num_channels: int) -> None:
+        self.num_channels = num_channels
+
+    def mix(
+        self,
+        sources: Sequence[np.ndarray],
+        gains: Sequence[float] | None = None,
+        offsets: Sequence[int] | None = None,
+        length: int | None = None,
+    ) -> np.ndarray:
+        """Mixture of shape (num_channels, length), the longest source by default"""
+        gains = gains or [1.0] * len(sources)
+        offsets = offsets or [0] * len(sources)
+        if length is None:
+            length = max(o + len(s) for o, s in zip(offsets, sources))
+
+        wav = np.empty((self.num_channels, length), dtype=np.float32)
+        for channel, row in enumerate(wav):
+            if channel >= len(sources):
+                row[:] = 0
+                continue
+            source, offset = sources[channel], offsets[channel]
+            end = min(offset + len(source), length)
+            row[:offset] = 0
+            np.multiply(
+                source[: end - offset],
+                gains[channel],
+                out=row[offset:end],
+                casting="unsafe",
+            )
+            row[end:] = 0
+        return wav
+
+
+class DecodedAudioCache:
+    """Decoded sources by path or archive member, shared by the mixing corpora
+
+    The same utterances and noise files come up in many mixtures, so they are
+    kept as read-only float32 arrays and evicted least recently used first once
+    they take more than `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_DECODED_CACHE_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[np.ndarray, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(
+        self, key: str, decode: Callable[[], tuple[np.ndarray, int]]
+    ) -> tuple[np.ndarray, int]:
+        """Samples and sampling rate of `key`, calling `decode` on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if entry is not None:
+            count("decoded_cache_hits")
+            return entry
+
+        with stage("decode"):
+            samples, sampling_rate = decode()
+        samples = np.asarray(samples, dtype=np.float32)
+        samples.flags.writeable = False
+        count("decoded_cache_misses")
+        with self._lock:
+            self.misses += 1
+            if samples.nbytes <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (samples, sampling_rate)
+                self.num_bytes += samples.nbytes
+                while self.num_bytes > self.max_bytes:
+                    _, (evicted, _) = self._entries.popitem(last=False)
+                    self.num_bytes -= evicted.nbytes
+        return samples, sampling_rate
+
+
+_decoded_audio_cache: DecodedAudioCache | None = None
+
+
+def get_decoded_audio_cache() -> DecodedAudioCache:
+    """Cache of the process, sized by LHOTSE_DATASET_DECODED_CACHE_MAX_BYTES"""
+    global _decoded_audio_cache
+    if _decoded_audio_cache is None:
+        max_bytes = os.environ.get(
+            "LHOTSE_DATASET_DECODED_CACHE_MAX_BYTES", DEFAULT_DECODED_CACHE_MAX_BYTES
+        )
+        _decoded_audio_cache = DecodedAudioCache(int(max_bytes))
+    return _decoded_audio_cache
+
+
+def decode(data: bytes) -> tuple[np.ndarray, int]:
+    """Encoded audio as float32 samples and their sampling rate"""
+    return sf.read(io.BytesIO(data), dtype="float32")
+
+
+def wav_bytes(audio: np.ndarray, sampling_rate: int) -> bytes:
+    """`audio` of shape (channels, samples) as a 16-bit WAV file"""
+    buf = io.BytesIO()
+    sf.write(buf, audio.T, sampling_rate, format="WAV")
+    return buf.getvalue()
+
+
+@dataclass(repr=False)
+class ArraySource(AudioSource):
+    """Samples held as a float32 array of shape (channels, samples)
+
+    Loading slices the array without decoding, and the shar writer encodes it
+    straight to the format of its recording field. Like the bytes of a memory
+    source, the array only lives as long as the process.
+    """
+
+    array: np.ndarray | None = field(default=None, compare=False)
+    sampling_rate: int = 0
+
+    def load_audio(self, offset=0.0, duration=None, force_opus_sampling_rate=None):
+        assert self.array is not None
+        start = round(offset * self.sampling_rate)
+        if duration is None:
+            return self.array[:, start:]
+        return self.array[:, start : start + round(duration * self.sampling_rate)]
+
+    def encode(self, format: str) -> bytes:
+        """The array encoded as the shar writer would encode the loaded audio"""
+        assert self.array is not None
+        stream = io.BytesIO()
+        save_audio(stream, self.array, self.sampling_rate, format=format)
+        return stream.getvalue()
+
+
+def array_recording(
+    audio: np.ndarray, sampling_rate: int, recording_id: str
+) -> lhotse.Recording:
+    """Recording of `audio` of shape (channels, samples), kept without a copy"""
+    array = np.asarray(audio, dtype=np.float32)
+    array.flags.writeable = False
+    num_channels, num_samples = array.shape
+    source = ArraySource(
+        type=ARRAY_SOURCE_TYPE,
+        channels=list(range(num_channels)),
+        source="",
+        array=array,
+        sampling_rate=sampling_rate,
+    )
+    return lhotse.Recording(
+        id=recording_id,
+        sources=[source],
+        sampling_rate=sampling_rate,
+        num_samples=num_samples,
+        duration=num_samples / sampling_rate,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def crossfade_windows(sampling_rate: int) -> tuple[np.ndarray, np.ndarray]:
+    """Rising and falling halves of a one-second Hanning window"""
+    window = np.hanning(sampling_rate + 1)
+    fade_in = window[: len(window) // 2 + 1]
+    fade_out = window[len(window) // 2 :: -1]
+    fade_in.flags.writeable = False
+    fade_out.flags.writeable = False
+    return fade_in, fade_out
+
+
+def extend_noise(
+    noise: np.ndarray, max_length: int, sampling_rate: int = 16000
+) -> np.ndarray:
+    """Loop `noise` up to `max_length` samples, crossfading the repeats
+
+    Each repeat overlaps the previous one by half a second, as in LibriMix,
+    where the noise grows by one concatenation per repeat. Here the repeats are
+    added into one preallocated output instead, which is linear in `max_length`
+    and gives the same samples.
+    """
+    if len(noise) >= max_length:
+        return noise[:max_length]
+    fade_in, fade_out = crossfade_windows(sampling_rate)
+    overlap = len(fade_in)
+    if len(noise) <= overlap:
+        raise ValueError(
+            f"Noise of {len(noise)} samples is too short to loop with a crossfade "
+            f"of {overlap} samples"
+        )
+
+    noise_ex = np.empty(max_length, dtype=np.result_type(noise, fade_in))
+    noise_ex[: len(noise)] = noise
+    head = np.multiply(noise[:overlap], fade_in)
+    tail = noise[overlap:]
+    length = len(noise)
+    while length < max_length:
+        # the crossfade always fits, as it ends at the current length
+        crossfade = noise_ex[length - overlap : length]
+        crossfade[:] = np.multiply(crossfade, fade_out) + head
+        end = min(length + len(tail), max_length)
+        noise_ex[length:end] = tail[: end - length]
+        length += len(tail)
+    return noise_ex
@@ -0,0 +1,129 @@
+from typing import Sequence
+
+import numpy as np
+
+
+class PairSampler:
+    """Pairs of items from different speakers, the first at least as long
+
+    The items must be sorted by descending duration. Pairs are numbered in the
+    order of the nested loop
+
+        for i in range(n):
+            for j in range(n):
+                if durations[i] >= durations[j] and speakers[i] != speakers[j]:
+                    yield i, j
+
+    but any pair can be looked up by its number without running the loop.
+    """
+
+    def __init__(self, durations: np.ndarray, speakers: Sequence) -> None:
+        durations = np.asarray(durations, dtype=np.float64)
+        assert np.all(np.diff(durations) <= 0), "durations must be sorted descending"
+        _, codes = np.unique(np.asarray(speakers, dtype=str), return_inverse=True)
+        n = len(durations)
+
+        # the partners of i are the items from `start` on, minus its own speaker's
+        self.start = np.searchsorted(-durations, -durations, side="left")
+
+        # positions grouped by speaker, ascending within each speaker
+        order = np.lexsort((np.arange(n), codes))
+        order_codes = codes[order]
+        self.segment_start = np.searchsorted(order_codes, codes, side="left")
+        segment_end = np.searchsorted(order_codes, codes, side="right")
+        self.first_excluded = np.searchsorted(
+            order_codes * n + order, codes * n + self.start, side="left"
+        )
+
+        # position minus rank within the speaker; skipping k excluded positions
+        # before p is a search on it, done for all speakers at once by offsetting
+        # each speaker's values by a multiple of 3n
+        rank = np.arange(n) - np.searchsorted(order_codes, order_codes, side="left")
+        self.offset = 3 * n
+        self.keys = order_codes * self.offset + order - rank
+        self.codes = codes
+
+        counts = (n - self.start) - (segment_end - self.first_excluded)
+        self.cumulative = np.concatenate([[0], np.cumsum(counts)])
+
+        # pairs numbered speaker by speaker, for drawing per-speaker quotas
+        self.speaker_rows = order
+        self.speaker_cumulative = np.concatenate([[0], np.cumsum(counts[order])])
+        self.speaker_totals = np.bincount(codes, weights=counts).astype(np.int64)
+
+    @property
+    def num_pairs(self) -> int:
+        return int(self.cumulative[-1])
+
+    def pairs_at(self, positions: np.ndarray) -> np.ndarray:
+        """The pairs numbered `positions`, as an array of shape (len(positions), 2)"""
+        positions = np.asarray(positions, dtype=np.int64)
+        i = np.searchsorted(self.cumulative, positions, side="right") - 1
+        k = positions - self.cumulative[i]
+        start = self.start[i]
+        first_excluded = self.first_excluded[i]
+        threshold = start + k - (first_excluded - self.segment_start[i])
+        num_skipped = (
+            np.searchsorted(
+                self.keys, self.codes[i] * self.offset + threshold, side="right"
+            )
+            - first_excluded
+        )
+        return np.stack([i, start + k + num_skipped], axis=1)
+
+    def thinned(
+        self, num_pairs: int, probability: float, rng: np.random.Generator
+    ) -> np.ndarray:
+        """The first `num_pairs` pairs kept by a coin flip with `probability` each
+
+        This is distributed like flipping a coin for every pair in order and
+        stopping after `num_pairs` heads, but the gaps between kept pairs are drawn
+        directly, so it costs O(num_pairs) rather than O(num_pairs / probability).
+        """
+        gaps = rng.geometric(probability, size=num_pairs)
+        positions = np.cumsum(gaps) - 1
+        return self.pairs_at(positions[positions < self.num_pairs])
+
+    def uniform(
+        self, num_pairs: int, rng: np.random.Generator, speaker_balanced: bool = False
+    ) -> np.ndarray:
+        """`num_pairs` distinct pairs drawn uniformly, in loop order
+
+        With `speaker_balanced`, the speakers of the first item get equal shares of
+        the pairs, as far as they have pairs, instead of shares proportional to
+        their number of pairs.
+        """
+        num_pairs = min(num_pairs, self.num_pairs)
+        if not speaker_balanced:
+            positions = rng.choice(self.num_pairs, num_pairs, replace=False)
+            return self.pairs_at(np.sort(positions))
+
+        quotas = self.speaker_quotas(num_pairs, rng)
+        bases = np.concatenate([[0], np.cumsum(self.speaker_totals)])
+        indices = np.concatenate(
+            [
+                base + rng.choice(total, quota, replace=False)
+                for base, total, quota in zip(bases, self.speaker_totals, quotas)
+                if quota > 0
+            ]
+            or [np.zeros(0, dtype=np.int64)]
+        )
+        # from speaker-by-speaker numbering back to loop order
+        k = np.searchsorted(self.speaker_cumulative, indices, side="right") - 1
+        rows = self.speaker_rows[k]
+        positions = self.cumulative[rows] + indices - self.speaker_cumulative[k]
+        return self.pairs_at(np.sort(positions))
+
+    def speaker_quotas(self, num_pairs: int, rng: np.random.Generator) -> np.ndarray:
+        """Split `num_pairs` evenly over the speakers, within their numbers of pairs"""
+        quotas = np.zeros_like(self.speaker_totals)
+        while quotas.sum() < num_pairs:
+            room = self.speaker_totals - quotas
+            speakers = rng.permutation(np.flatnonzero(room > 0))
+            remaining = num_pairs - quotas.sum()
+            share = max(remaining // len(speakers), 1)
+            added = np.minimum(room[speakers], share)
+            # a share of one may overshoot, so the leftover goes to random speakers
+            added[np.cumsum(added) > remaining] = 0
+            quotas[speakers] += added
+        return quotas
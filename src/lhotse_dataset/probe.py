@@ -0,0 +1,157 @@
+import io
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+import lhotse
+from lhotse.audio.source import AudioSource
+from pydantic import BaseModel
+
+from lhotse_dataset.instrumentation import stage
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+FLAC_STREAMINFO = 0
+
+
+class AudioHeader(BaseModel):
+    format: str
+    sampling_rate: int
+    num_channels: int
+    num_samples: int
+
+    @property
+    def duration(self) -> float:
+        return self.num_samples / self.sampling_rate
+
+
+def probe(f: BinaryIO, size: int | None = None) -> AudioHeader | None:
+    """Parse a RIFF/WAVE or FLAC header, or return None for anything else
+
+    size: bytes of `f` from its position, found by seeking to the end if None
+    """
+    start = f.tell()
+    magic = f.read(12)
+    f.seek(start)
+    if magic[:4] == b"RIFF" and magic[8:12] == b"WAVE":
+        return _probe_wav(f, size)
+    if magic[:4] == b"fLaC":
+        return _probe_flac(f)
+    return None
+
+
+def probe_file(path: Path) -> AudioHeader | None:
+    with open(path, "rb") as f:
+        return probe(f)
+
+
+def probe_bytes(data: bytes) -> AudioHeader | None:
+    return probe(io.BytesIO(data))
+
+
+def recording_from_file(
+    path: str | Path, recording_id: str | None = None
+) -> lhotse.Recording:
+    """Same as `Recording.from_file`, reading only the header of WAV and FLAC files"""
+    path = Path(path)
+    with stage("probe"):
+        header = probe_file(path)
+        if header is None:
+            return lhotse.Recording.from_file(path, recording_id)
+
+    source = AudioSource(
+        type="file", channels=list(range(header.num_channels)), source=str(path)
+    )
+    return _recording(recording_id or path.stem, source, header)
+
+
+def recording_from_bytes(data: bytes, recording_id: str) -> lhotse.Recording:
+    """Same as `Recording.from_bytes`, reading only the header of WAV and FLAC data"""
+    with stage("probe"):
+        header = probe_bytes(data)
+        if header is None:
+            return lhotse.Recording.from_bytes(data, recording_id)
+
+    source = AudioSource(
+        type="memory", channels=list(range(header.num_channels)), source=data
+    )
+    return _recording(recording_id, source, header)
+
+
+def _recording(
+    recording_id: str, source: AudioSource, header: AudioHeader
+) -> lhotse.Recording:
+    return lhotse.Recording(
+        id=recording_id,
+        sources=[source],
+        sampling_rate=header.sampling_rate,
+        num_samples=header.num_samples,
+        duration=header.duration,
+    )
+
+
+def _probe_wav(f: BinaryIO, size: int | None = None) -> AudioHeader | None:
+    start = f.tell()
+    end = f.seek(0, os.SEEK_END) if size is None else start + size
+    f.seek(start + 12)
+
+    fmt = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"fmt ":
+            fmt = f.read(chunk_size)
+            if len(fmt) < 16:
+                return None
+            # chunks are padded to an even size
+            f.seek(chunk_size % 2, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            break
+        else:
+            f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+    if fmt is None:
+        return None
+    format_tag, num_channels, sampling_rate, _, block_align, _ = struct.unpack(
+        "<HHIIHH", fmt[:16]
+    )
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack("<H", fmt[24:26])[0]
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        return None
+    if num_channels == 0 or sampling_rate == 0 or block_align == 0:
+        return None
+
+    # streamed WAVs may carry a placeholder size, so trust the file length instead
+    data_size = min(chunk_size, end - f.tell())
+    return AudioHeader(
+        format="wav",
+        sampling_rate=sampling_rate,
+        num_channels=num_channels,
+        num_samples=data_size // block_align,
+    )
+
+
+def _probe_flac(f: BinaryIO) -> AudioHeader | None:
+    header = f.read(4 + 4 + 18)
+    if len(header) < 26 or header[4] & 0x7F != FLAC_STREAMINFO:
+        return None
+
+    # STREAMINFO: 20 bits sample rate, 3 bits channels - 1, 5 bits bits per sample - 1
+    # and 36 bits total samples, starting at byte 10 of the block
+    info = int.from_bytes(header[18:26], "big")
+    sampling_rate = info >> 44
+    num_channels = ((info >> 41) & 0x7) + 1
+    num_samples = info & 0xFFFFFFFFF
+    if sampling_rate == 0 or num_samples == 0:
+        return None
+    return AudioHeader(
+        format="flac",
+        sampling_rate=sampling_rate,
+        num_channels=num_channels,
+        num_samples=num_samples,
+    )
@@ -4,7 +4,8 @@ from typing import Generator
 import lhotse
 from datasets import DatasetDict, load_dataset
 
-from lhotse_dataset.base import BaseCorpus, Language
+from lhotse_dataset.base import BaseCorpus, Language, Partition
+from lhotse_dataset.probe import recording_from_file
 
 
 class ReazonSpeech(BaseCorpus):
@@ -22,14 +23,22 @@ class ReazonSpeech(BaseCorpus):
     def language(self) -> Language:
         return Language.JA
 
-    def get_cuts(self) -> Generator[lhotse.MonoCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
         ds = load_dataset(
             "reazon-research/reazonspeech", self.dataset_size, trust_remote_code=True
         )
         assert type(ds) is DatasetDict
 
-        for sample in ds["train"]:
-            recording = lhotse.Recording.from_file(sample["audio"]["path"])  # type: ignore
+        ds_train = ds["train"].shard(
+            num_shards=partition.num_partitions,
+            index=partition.index,
+            # round-robin, as `Partition.includes`
+            contiguous=False,
+        )
+        for sample in ds_train:
+            recording = recording_from_file(sample["audio"]["path"])  # type: ignore
 
             audio_id = Path(sample["name"]).stem  # type: ignore
 
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import warnings
+from collections import namedtuple
+from pathlib import Path
+from typing import Any, Generator, Literal
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from lhotse_dataset.base import Partition
+from lhotse_dataset.cache import get_download_cache
+from lhotse_dataset.instrumentation import stage
+
+SCHEMA_FILENAME = "schema.json"
+STRINGS_FILENAME = "strings.npy"
+STRING_OFFSETS_FILENAME = "string_offsets.npy"
+# rows converted to Python objects at once while iterating
+ROW_CHUNK_SIZE = 4096
+
+
+class RecipeColumn(BaseModel):
+    name: str
+    kind: Literal["string", "float", "int"]
+
+
+class RecipeSchema(BaseModel):
+    num_rows: int
+    columns: list[RecipeColumn]
+
+
+class RecipeTable:
+    """Mixture recipes stored column-wise in a directory of memory-mapped .npy files
+
+    Strings such as source paths are stored once in a string table and referred to
+    by int32 codes; floats such as gains and offsets are float32 and integers int64.
+    Opening a table maps the files without reading them, so it takes the same time
+    for any number of rows.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.schema = RecipeSchema.model_validate_json(
+            (path / SCHEMA_FILENAME).read_text(encoding="utf-8")
+        )
+        self.columns = {
+            column.name: np.load(path / f"{column.name}.npy", mmap_mode="r")
+            for column in self.schema.columns
+        }
+        self.strings = np.load(path / STRINGS_FILENAME, mmap_mode="r")
+        self.string_offsets = np.load(path / STRING_OFFSETS_FILENAME, mmap_mode="r")
+        self.row_type = namedtuple(
+            "Recipe", [column.name for column in self.schema.columns]
+        )
+
+    def __len__(self) -> int:
+        return self.schema.num_rows
+
+    def __iter__(self) -> Generator[Any, None, None]:
+        return self.rows()
+
+    def string(self, code: int) -> str:
+        start, end = self.string_offsets[code], self.string_offsets[code + 1]
+        return self.strings[start:end].tobytes().decode("utf-8")
+
+    def rows(self, partition: Partition = Partition()) -> Generator[Any, None, None]:
+        """Rows of `partition` as named tuples with the column names of the CSV"""
+        strings = memoryview(self.strings)
+        step = partition.num_partitions
+        for start in range(0, len(self), ROW_CHUNK_SIZE * step):
+            end = min(start + ROW_CHUNK_SIZE * step, len(self))
+            # the first row of the partition from `start` on, then every `step`th
+            first = start + (partition.index - start) % step
+            values = []
+            for column in self.schema.columns:
+                chunk = self.columns[column.name][first:end:step]
+                if column.kind == "string":
+                    starts = self.string_offsets[chunk].tolist()
+                    ends = self.string_offsets[chunk + 1].tolist()
+                    values.append(
+                        [str(strings[s:e], "utf-8") for s, e in zip(starts, ends)]
+                    )
+                else:
+                    values.append(chunk.tolist())
+            for row in zip(*values):
+                yield self.row_type(*row)
+
+    @classmethod
+    def convert(cls, csv_path: Path, path: Path) -> "RecipeTable":
+        """Write the recipes of `csv_path` to the directory `path`"""
+        df = pd.read_csv(csv_path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        codes: dict[str, int] = {}
+        columns = []
+        for name in df.columns:
+            values = df[name]
+            if pd.api.types.is_float_dtype(values):
+                kind, array = "float", values.to_numpy(dtype=np.float32)
+            elif pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(
+                values
+            ):
+                kind, array = "int", values.to_numpy(dtype=np.int64)
+            else:
+                kind = "string"
+                column_codes, uniques = pd.factorize(values.astype(str))
+                table_codes = [codes.setdefault(v, len(codes)) for v in uniques]
+                array = np.asarray(table_codes, dtype=np.int32)[column_codes]
+            np.save(path / f"{name}.npy", array)
+            columns.append(RecipeColumn(name=str(name), kind=kind))
+
+        encoded = [s.encode("utf-8") for s in codes]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in encoded], out=offsets[1:])
+        np.save(path / STRINGS_FILENAME, np.frombuffer(b"".join(encoded), np.uint8))
+        np.save(path / STRING_OFFSETS_FILENAME, offsets)
+
+        # written last, so a directory with a schema is complete
+        schema = RecipeSchema(num_rows=len(df), columns=columns)
+        (path / SCHEMA_FILENAME).write_text(schema.model_dump_json(), encoding="utf-8")
+        return cls(path)
+
+    @classmethod
+    def from_csv(cls, csv_path: Path) -> "RecipeTable":
+        """Table of `csv_path`, converted once into the download cache"""
+        with open(csv_path, "rb") as f:
+            key = hashlib.file_digest(f, "sha256").hexdigest()
+        path = get_download_cache().root / "recipes" / key
+        if (path / SCHEMA_FILENAME).exists():
+            return cls(path)
+
+        with stage("recipe_convert"):
+            try:
+                # processes of one write_shar may convert the same CSV at once
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(f"{key}.{os.getpid()}.tmp")
+                cls.convert(csv_path, tmp_path)
+                try:
+                    os.replace(tmp_path, path)
+                except OSError:
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                return cls(path)
+            except OSError:
+                warnings.warn(f"Could not save the converted recipes to {path}")
+                return cls.convert(csv_path, Path(tempfile.mkdtemp()))
@@ -0,0 +1,494 @@
+import hashlib
+import io
+import itertools
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import warnings
+from pathlib import Path
+from typing import Generator, Iterable
+
+from lhotse import fastcopy
+from lhotse.audio.source import AudioSource
+from lhotse.cut import Cut, MonoCut, MultiCut
+from lhotse.shar import SharWriter
+from lhotse.shar.utils import to_shar_placeholder
+from pydantic import BaseModel, model_validator
+
+from lhotse_dataset.instrumentation import stage
+from lhotse_dataset.mixing import ArraySource
+from lhotse_dataset.probe import probe
+from lhotse_dataset.shar_metadata import (
+    SIDECAR_FIELD,
+    cut_metadata,
+    metadata_dir,
+    sidecar_name,
+    write_sidecar,
+)
+
+LEDGER_FILENAME = "ledger.jsonl"
+STAGING_DIRNAME = "staging"
+
+SHARD_FILE_PATTERN = re.compile(r"^(?P<field>[^.]+)\.(?P<shard>\d{6})\.(?P<ext>.+)$")
+
+
+def state_dir(shar_dir: Path) -> Path:
+    """Bookkeeping of `shar_dir`, next to it rather than in it
+
+    `CutSet.from_shar(in_dir=...)` takes every file of a shar directory for a
+    field, so nothing but the shards may be written there.
+    """
+    shar_dir = shar_dir.absolute()
+    return shar_dir.with_name(f"{shar_dir.name}.state")
+
+
+def shard_file_path(shar_dir: Path, name: str) -> Path:
+    """Path of a file recorded in the ledger, sidecars being in the `metadata_dir`"""
+    if name.split(".")[0] == SIDECAR_FIELD:
+        return metadata_dir(shar_dir) / name
+    return shar_dir / name
+
+
+class ShardFile(BaseModel):
+    name: str
+    size: int
+    sha256: str
+
+
+class ShardRecord(BaseModel):
+    shard: int
+    num_cuts: int
+    last_cut_id: str
+    files: list[ShardFile]
+
+
+class EncodeStats(BaseModel):
+    num_passthrough: int = 0
+    num_transcoded: int = 0
+    num_encoded: int = 0
+
+    def __add__(self, other: "EncodeStats") -> "EncodeStats":
+        return EncodeStats(
+            num_passthrough=self.num_passthrough + other.num_passthrough,
+            num_transcoded=self.num_transcoded + other.num_transcoded,
+            num_encoded=self.num_encoded + other.num_encoded,
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"{self.num_passthrough} cuts copied as encoded, "
+            f"{self.num_transcoded} cuts transcoded, "
+            f"{self.num_encoded} cuts encoded from arrays"
+        )
+
+
+class ShardRollover(BaseModel):
+    """When a shard is closed and the next one started
+
+    A shard is closed after the cut that brings it to `max_cuts` cuts, `max_bytes`
+    bytes written to its tar files, or `max_seconds` of audio, whichever comes
+    first, so it exceeds the byte and duration targets by less than one cut.
+    `max_bytes` counts the payload of the tar members only, not the cut manifest
+    or the tar headers.
+    """
+
+    max_cuts: int | None = None
+    max_bytes: int | None = None
+    max_seconds: float | None = None
+
+    @model_validator(mode="after")
+    def check_targets(self) -> "ShardRollover":
+        if (
+            self.max_cuts is None
+            and self.max_bytes is None
+            and self.max_seconds is None
+        ):
+            raise ValueError("Set at least one of max_cuts, max_bytes and max_seconds")
+        return self
+
+    def reached(self, num_cuts: int, num_bytes: int, seconds: float) -> bool:
+        return (
+            (self.max_cuts is not None and num_cuts >= self.max_cuts)
+            or (self.max_bytes is not None and num_bytes >= self.max_bytes)
+            or (self.max_seconds is not None and seconds >= self.max_seconds)
+        )
+
+
+class Ledger:
+    """Append-only record of the shards that were completely written to a directory"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.records: list[ShardRecord] = []
+        self.complete = False
+
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        # a torn line left by a crash during append
+                        break
+                    if data.get("complete", False):
+                        self.complete = True
+                    else:
+                        self.records.append(ShardRecord.model_validate(data))
+            self._rewrite()
+
+    @classmethod
+    def for_dir(cls, shar_dir: Path) -> "Ledger":
+        """Ledger of `shar_dir`, kept in its `state_dir`"""
+        return cls(state_dir(shar_dir) / LEDGER_FILENAME)
+
+    @property
+    def num_cuts(self) -> int:
+        return sum(record.num_cuts for record in self.records)
+
+    def append(self, record: ShardRecord) -> None:
+        self._append_line(record.model_dump_json())
+        self.records.append(record)
+
+    def mark_complete(self) -> None:
+        if not self.complete:
+            self._append_line(json.dumps({"complete": True}))
+            self.complete = True
+
+    def reset(self) -> None:
+        self.records = []
+        self.complete = False
+        self.path.unlink(missing_ok=True)
+
+    def validate(self, shard_dir: Path) -> None:
+        """Drop the first record with missing or truncated files and all after it"""
+        for i, record in enumerate(self.records):
+            if not all(
+                shard_file_path(shard_dir, f.name).is_file()
+                and shard_file_path(shard_dir, f.name).stat().st_size == f.size
+                for f in record.files
+            ):
+                self.records = self.records[:i]
+                self.complete = False
+                self._rewrite()
+                break
+
+    def _append_line(self, line: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _rewrite(self) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in self.records:
+                f.write(record.model_dump_json() + "\n")
+            if self.complete:
+                f.write(json.dumps({"complete": True}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class PassthroughSharWriter(SharWriter):
+    """SharWriter that copies audio already encoded in the target format as-is
+
+    A cut spanning every channel of a whole single-source recording is written without
+    a decode and encode round trip when the source is in the `recording` field format,
+    and encoded once, without a decode, when the source is an `ArraySource`. Every
+    other cut is transcoded by SharWriter.
+    """
+
+    def __init__(self, *args, passthrough: bool = True, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.passthrough = passthrough
+        self.stats = EncodeStats()
+        self.num_bytes = 0
+        for writer in self.writers.values():
+            if hasattr(writer, "tar_writer"):
+                self._instrument_tar_writer(writer.tar_writer)
+
+    def write(self, cut: Cut) -> None:
+        source = self.whole_source(cut)
+        if isinstance(source, ArraySource) and self.fields["recording"] in (
+            "flac",
+            "wav",
+        ):
+            with stage("encode") as stats:
+                data = source.encode(self.fields["recording"])
+                self.write_encoded(cut, data)
+                stats.num_bytes += len(data)
+            self.stats.num_encoded += 1
+            return
+
+        data = self.encoded_audio(cut) if self.passthrough else None
+        if data is None:
+            if "recording" not in self.fields:
+                with stage("manifest"):
+                    super().write(cut)
+                return
+            if cut.has_recording:
+                self.stats.num_transcoded += 1
+            with stage("transcode"):
+                super().write(cut)
+            return
+
+        with stage("passthrough") as stats:
+            self.write_encoded(cut, data)
+            stats.num_bytes += len(data)
+        self.stats.num_passthrough += 1
+
+    def write_encoded(self, cut: Cut, data: bytes) -> None:
+        """Write `data` as the recording of `cut`, already in the field format"""
+        recording = to_shar_placeholder(cut.recording, cut)
+        writer = self.writers["recording"]
+        writer.tar_writer.write(f"{cut.id}.{writer.format}", io.BytesIO(data))
+        json_stream = io.BytesIO(json.dumps(recording.to_dict()).encode() + b"\n")
+        writer.tar_writer.write(f"{cut.id}.json", json_stream, count=False)
+
+        if "cuts" in self.writers:
+            self.writers["cuts"].write(fastcopy(cut, recording=recording, start=0))
+
+    def _instrument_tar_writer(self, tar_writer) -> None:
+        write = tar_writer.write
+
+        def instrumented_write(key: str, data: io.BytesIO, count: bool = True) -> None:
+            with stage("tar_write") as stats:
+                num_bytes = data.getbuffer().nbytes
+                stats.num_bytes += num_bytes
+                self.num_bytes += num_bytes
+                write(key, data, count=count)
+
+        tar_writer.write = instrumented_write
+
+    def whole_source(self, cut: Cut) -> AudioSource | None:
+        """Only source of the cut if it spans all of it and nothing else is written"""
+        if set(self.fields) != {"recording"}:
+            return None
+        if not isinstance(cut, (MonoCut, MultiCut)) or not cut.has_recording:
+            return None
+
+        recording = cut.recording
+        channels = cut.channel if isinstance(cut.channel, list) else [cut.channel]
+        if (
+            len(recording.sources) != 1
+            or recording.transforms
+            or cut.start != 0
+            or not math.isclose(cut.duration, recording.duration)
+            or channels != recording.channel_ids
+        ):
+            return None
+        return recording.sources[0]
+
+    def encoded_audio(self, cut: Cut) -> bytes | None:
+        """Source bytes of the cut if they can be copied into the shard unchanged"""
+        source = self.whole_source(cut)
+        if source is None or source.type not in (
+            "file",
+            "memory",
+            "zip",
+        ):
+            return None
+        recording = cut.recording
+        f = source._prepare_for_reading(0.0, None)
+        if isinstance(f, str):
+            f = open(f, "rb")
+        with f:
+            header = probe(f)
+            if header is None or header.format != self.fields["recording"]:
+                return None
+            if (
+                header.sampling_rate != recording.sampling_rate
+                or header.num_samples != recording.num_samples
+            ):
+                return None
+            f.seek(0)
+            return f.read()
+
+
+class ResumableSharWriter:
+    """SharWriter that stages every shard and moves it into `output_dir` once complete
+
+    Finished shards are recorded in a ledger, so a run with `resume=True` continues
+    after the last finished shard, and the leftovers of a crashed run are removed.
+    `shard_size` is a number of cuts per shard, or a `ShardRollover`.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        fields: dict[str, str],
+        shard_size: int | ShardRollover,
+        resume: bool = False,
+        passthrough: bool = True,
+    ) -> None:
+        if isinstance(shard_size, int):
+            shard_size = ShardRollover(max_cuts=shard_size)
+        self.output_dir = output_dir
+        self.fields = fields
+        self.rollover = shard_size
+        self.passthrough = passthrough
+        self.staging_dir = state_dir(output_dir) / STAGING_DIRNAME
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        self.ledger = Ledger.for_dir(output_dir)
+        if resume:
+            self.ledger.validate(output_dir)
+        else:
+            self.ledger.reset()
+        remove_uncommitted_shards(output_dir, len(self.ledger.records))
+
+        self.writer: PassthroughSharWriter | None = None
+        self.num_cuts = 0
+        self.seconds = 0.0
+        self.metadata: list[tuple] = []
+        self.last_cut_id = ""
+        self.stats = EncodeStats()
+
+    @property
+    def complete(self) -> bool:
+        return self.ledger.complete
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.ledger.records)
+
+    def __enter__(self) -> "ResumableSharWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        elif self.writer is not None:
+            self.writer.close()
+
+    def skip_committed(self, cuts: Iterable[Cut]) -> Generator[Cut, None, None]:
+        """Skip the cuts already covered by the ledger without encoding them"""
+        cuts = iter(cuts)
+        if self.ledger.records:
+            last_cut = None
+            for last_cut in itertools.islice(cuts, self.ledger.num_cuts):
+                pass
+            if last_cut is None or last_cut.id != self.ledger.records[-1].last_cut_id:
+                warnings.warn(f"The cuts do not match the ledger in {self.output_dir}")
+        yield from cuts
+
+    def write(self, cut: Cut) -> None:
+        if self.writer is None:
+            self.staging_dir.mkdir(parents=True, exist_ok=True)
+            self.writer = PassthroughSharWriter(
+                str(self.staging_dir),
+                fields=self.fields,
+                # shards are closed by `_commit`, never by the writer itself
+                shard_size=sys.maxsize,
+                shard_offset=self.num_shards,
+                passthrough=self.passthrough,
+                # recipe-only cuts keep their recordings in the manifests
+                warn_unused_fields="recording" in self.fields,
+            )
+
+        self.writer.write(cut)
+        self.metadata.append(cut_metadata(cut))
+        self.num_cuts += 1
+        self.seconds += cut.duration
+        self.last_cut_id = cut.id
+
+        if self.rollover.reached(self.num_cuts, self.writer.num_bytes, self.seconds):
+            self._commit()
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self._commit()
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        self.ledger.mark_complete()
+
+    def _commit(self) -> None:
+        assert self.writer is not None
+        self.writer.close()
+        self.stats += self.writer.stats
+        metadata_path = self.staging_dir / sidecar_name(self.num_shards)
+        write_sidecar(metadata_path, self.metadata)
+        metadata_dir(self.output_dir).mkdir(exist_ok=True)
+
+        files = []
+        for paths in [*self.writer.output_paths.values(), [metadata_path]]:
+            for path in map(Path, paths):
+                with open(path, "rb") as f:
+                    sha256 = hashlib.file_digest(f, "sha256").hexdigest()
+                    os.fsync(f.fileno())
+                files.append(
+                    ShardFile(name=path.name, size=path.stat().st_size, sha256=sha256)
+                )
+                os.replace(path, shard_file_path(self.output_dir, path.name))
+
+        self.ledger.append(
+            ShardRecord(
+                shard=self.num_shards,
+                num_cuts=self.num_cuts,
+                last_cut_id=self.last_cut_id,
+                files=files,
+            )
+        )
+        self.writer = None
+        self.num_cuts = 0
+        self.seconds = 0.0
+        self.metadata = []
+
+
+def shard_index(path: Path) -> int | None:
+    m = SHARD_FILE_PATTERN.match(path.name)
+    return int(m.group("shard")) if m is not None else None
+
+
+def remove_uncommitted_shards(output_dir: Path, num_shards: int) -> None:
+    """Remove staged files and any shard files numbered `num_shards` or above"""
+    shutil.rmtree(state_dir(output_dir) / STAGING_DIRNAME, ignore_errors=True)
+    paths = list(output_dir.iterdir())
+    if metadata_dir(output_dir).is_dir():
+        paths += metadata_dir(output_dir).iterdir()
+    for path in paths:
+        index = shard_index(path)
+        if index is not None and index >= num_shards:
+            path.unlink()
+
+
+def merge_shards(src_dirs: list[Path], output_dir: Path, ledger: Ledger) -> None:
+    """Move the shards of every directory in `src_dirs` into one contiguous range
+
+    Shards already recorded in `ledger` are skipped, so an interrupted merge can be
+    repeated.
+    """
+    shard = 0
+    for src_dir in src_dirs:
+        for record in Ledger.for_dir(src_dir).records:
+            if shard >= len(ledger.records):
+                files = []
+                for f in record.files:
+                    m = SHARD_FILE_PATTERN.match(f.name)
+                    assert m is not None
+                    name = f"{m.group('field')}.{shard:06d}.{m.group('ext')}"
+                    src_path = shard_file_path(src_dir, f.name)
+                    if src_path.exists():
+                        path = shard_file_path(output_dir, name)
+                        path.parent.mkdir(exist_ok=True)
+                        os.replace(src_path, path)
+                    files.append(f.model_copy(update={"name": name}))
+                ledger.append(
+                    record.model_copy(update={"shard": shard, "files": files})
+                )
+            shard += 1
+
+    remove_uncommitted_shards(output_dir, len(ledger.records))
+    ledger.mark_complete()
+    for src_dir in src_dirs:
+        remove_shar_dir(src_dir)
+
+
+def remove_shar_dir(shar_dir: Path) -> None:
+    """Remove `shar_dir` with its `state_dir` and `metadata_dir`"""
+    for path in [shar_dir, state_dir(shar_dir), metadata_dir(shar_dir)]:
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,205 @@
+import functools
+import hashlib
+import os
+import tarfile
+import threading
+import warnings
+from collections import OrderedDict
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from lhotse_dataset.cache import get_download_cache
+from lhotse_dataset.instrumentation import count, stage
+
+DEFAULT_MAX_OPEN_FILES = 64
+
+
+class SharIndex(BaseModel):
+    """Where the data of every cut sits in the tars of one shar field
+
+    Stored column-wise, one entry per cut, so that a directory of hundreds of
+    shards loads in one pass over a single file.
+    """
+
+    field: str = "recording"
+    shards: list[str] = []
+    shard_sizes: list[int] = []
+    cut_ids: list[str] = []
+    shard: list[int] = []
+    offset: list[int] = []
+    size: list[int] = []
+    format: list[str] = []
+
+    @staticmethod
+    def path(shar_dir: Path, field: str = "recording") -> Path:
+        """Default location, in the download cache
+
+        Not in `shar_dir`, where `CutSet.from_shar(in_dir=...)` would take the
+        file for a field of its own.
+        """
+        key = hashlib.sha256(str(shar_dir.resolve()).encode()).hexdigest()
+        return get_download_cache().root / "shar_index" / f"{key}.{field}.json"
+
+    @staticmethod
+    def shard_paths(shar_dir: Path, field: str = "recording") -> list[Path]:
+        return sorted(shar_dir.glob(f"{field}.*.tar"))
+
+    @classmethod
+    def build(cls, shar_dir: Path, field: str = "recording") -> "SharIndex":
+        """Index the tars of `field` by reading only their member headers"""
+        index = cls(field=field)
+        for shard, path in enumerate(cls.shard_paths(shar_dir, field)):
+            index.shards.append(path.name)
+            index.shard_sizes.append(path.stat().st_size)
+            with tarfile.open(path, "r:") as tar:
+                for info in tar:
+                    name, ext = info.name.rsplit(".", 1)
+                    # the metadata written next to every member
+                    if ext == "json":
+                        continue
+                    index.cut_ids.append(name)
+                    index.shard.append(shard)
+                    index.offset.append(info.offset_data)
+                    index.size.append(info.size)
+                    index.format.append(ext)
+        return index
+
+    @classmethod
+    def load(
+        cls,
+        shar_dir: Path,
+        field: str = "recording",
+        index_path: Path | None = None,
+    ) -> "SharIndex":
+        """Index from `index_path`, built and saved there if missing or stale"""
+        if index_path is None:
+            index_path = cls.path(shar_dir, field)
+        if index_path.exists():
+            index = cls.model_validate_json(index_path.read_text(encoding="utf-8"))
+            if index.field == field and index.is_current(shar_dir):
+                return index
+
+        with stage("shar_index"):
+            index = cls.build(shar_dir, field)
+        try:
+            index.save(index_path)
+        except OSError:
+            warnings.warn(f"Could not save the shar index to {index_path}")
+        return index
+
+    def save(self, path: Path) -> None:
+        # processes of one write_shar may save the same index at once
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(self.model_dump_json(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def is_current(self, shar_dir: Path) -> bool:
+        """Whether the tars are still the ones that were indexed"""
+        paths = self.shard_paths(shar_dir, self.field)
+        return [path.name for path in paths] == self.shards and [
+            path.stat().st_size for path in paths
+        ] == self.shard_sizes
+
+
+class FilePool:
+    """Open file descriptors for positional reads, closing the least recently used
+    beyond `max_open`"""
+
+    def __init__(self, max_open: int = DEFAULT_MAX_OPEN_FILES) -> None:
+        self.max_open = max_open
+        self._fds: OrderedDict[str, int] = OrderedDict()
+        # reads in flight by fd, whose close waits for the last of them
+        self._readers: dict[int, int] = {}
+        self._unused: set[int] = set()
+        self._lock = threading.Lock()
+
+    def pread(self, path: str, offset: int, size: int) -> bytes:
+        fd = self._acquire(path)
+        try:
+            # pread leaves the file position alone, so the fd is safe to share
+            data = os.pread(fd, size, offset)
+        finally:
+            self._release(fd)
+        count("shar_pread_bytes", len(data))
+        return data
+
+    def close(self) -> None:
+        with self._lock:
+            for fd in self._fds.values():
+                self._discard(fd)
+            self._fds.clear()
+
+    def _acquire(self, path: str) -> int:
+        with self._lock:
+            fd = self._fds.get(path)
+            if fd is None:
+                fd = os.open(path, os.O_RDONLY)
+                self._fds[path] = fd
+                while len(self._fds) > self.max_open:
+                    _, evicted = self._fds.popitem(last=False)
+                    self._discard(evicted)
+            else:
+                self._fds.move_to_end(path)
+            self._readers[fd] = self._readers.get(fd, 0) + 1
+            return fd
+
+    def _release(self, fd: int) -> None:
+        with self._lock:
+            self._readers[fd] -= 1
+            if self._readers[fd] == 0:
+                del self._readers[fd]
+                if fd in self._unused:
+                    self._unused.remove(fd)
+                    os.close(fd)
+
+    def _discard(self, fd: int) -> None:
+        if fd in self._readers:
+            self._unused.add(fd)
+        else:
+            os.close(fd)
+
+
+_file_pool = FilePool()
+
+
+def get_file_pool() -> FilePool:
+    """Pool shared by every `SharReader` of the process"""
+    return _file_pool
+
+
+class SharReader:
+    """Random access by cut id to the encoded audio of a shar directory"""
+
+    def __init__(
+        self,
+        shar_dir: str | Path,
+        field: str = "recording",
+        index_path: Path | None = None,
+    ) -> None:
+        self.shar_dir = Path(shar_dir).resolve()
+        self.index = SharIndex.load(self.shar_dir, field, index_path)
+        self.rows = {cut_id: i for i, cut_id in enumerate(self.index.cut_ids)}
+        self.shard_paths = [str(self.shar_dir / name) for name in self.index.shards]
+
+    def __contains__(self, cut_id: str) -> bool:
+        return cut_id in self.rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def read(self, cut_id: str) -> bytes:
+        """Encoded data of `cut_id`"""
+        row = self.rows[cut_id]
+        return get_file_pool().pread(
+            self.shard_paths[self.index.shard[row]],
+            self.index.offset[row],
+            self.index.size[row],
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def get_shar_reader(shar_dir: str) -> SharReader:
+    """Reader of `shar_dir` shared within the process"""
+    return SharReader(shar_dir)
@@ -0,0 +1,222 @@
+import os
+from pathlib import Path
+
+import numpy as np
+from lhotse.cut import Cut
+from pydantic import BaseModel
+
+SIDECAR_FIELD = "metadata"
+ROLLUP_FILENAME = "metadata.npy"
+STRING_COLUMNS = ["id", "speaker", "gender", "language", "subset"]
+NUMERIC_COLUMNS = [
+    ("duration", "<f8"),
+    ("sampling_rate", "<i4"),
+    ("num_channels", "<i2"),
+]
+
+
+class MetadataStats(BaseModel):
+    num_cuts: int = 0
+    total_seconds: float = 0.0
+    min_duration: float = 0.0
+    max_duration: float = 0.0
+    num_speakers: int = 0
+    subsets: dict[str, int] = {}
+    genders: dict[str, int] = {}
+    languages: dict[str, int] = {}
+    sampling_rates: dict[int, int] = {}
+
+    @property
+    def hours(self) -> float:
+        return self.total_seconds / 3600
+
+
+def cut_metadata(cut: Cut) -> tuple:
+    """Row of `cut`, with the speaker, gender and language of its first supervision"""
+    supervision = cut.supervisions[0] if cut.supervisions else None
+    subset = (cut.custom or {}).get("subset")
+    if subset is None and supervision is not None:
+        subset = (supervision.custom or {}).get("subset")
+    return (
+        cut.id,
+        cut.duration,
+        cut.sampling_rate if cut.has_recording else 0,
+        cut.num_channels,
+        getattr(supervision, "speaker", None) or "",
+        getattr(supervision, "gender", None) or "",
+        getattr(supervision, "language", None) or "",
+        subset or "",
+    )
+
+
+def metadata_array(rows: list[tuple]) -> np.ndarray:
+    """Structured array of `cut_metadata` rows, strings as fixed-width UTF-8"""
+    names = ["id", "duration", "sampling_rate", "num_channels"]
+    names += ["speaker", "gender", "language", "subset"]
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    values = dict(zip(names, columns))
+    for name in STRING_COLUMNS:
+        values[name] = [value.encode("utf-8") for value in values[name]]
+    dtype = _dtype({name: _width(values[name]) for name in STRING_COLUMNS})
+    array = np.empty(len(rows), dtype=dtype)
+    for name in dtype.names or []:
+        array[name] = values[name]
+    return array
+
+
+def metadata_dir(shar_dir: Path) -> Path:
+    """Sidecars and rollup of `shar_dir`, next to it rather than in it
+
+    `CutSet.from_shar(in_dir=...)` would take them for a field of the shards.
+    """
+    shar_dir = shar_dir.absolute()
+    return shar_dir.with_name(f"{shar_dir.name}.metadata")
+
+
+def sidecar_name(shard: int) -> str:
+    return f"{SIDECAR_FIELD}.{shard:06d}.npy"
+
+
+def sidecar_path(shar_dir: Path, shard: int) -> Path:
+    return metadata_dir(shar_dir) / sidecar_name(shard)
+
+
+def write_sidecar(path: Path, rows: list[tuple]) -> None:
+    with open(path, "wb") as f:
+        np.save(f, metadata_array(rows))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def sidecar_paths(shar_dir: Path) -> list[Path]:
+    return sorted(metadata_dir(shar_dir).glob(f"{SIDECAR_FIELD}.*.npy"))
+
+
+def rollup(shar_dir: Path) -> np.ndarray:
+    """Rows of every sidecar in shard order, with their shard and index in it"""
+    sidecars = []
+    for path in sidecar_paths(shar_dir):
+        shard = int(path.name.split(".")[1])
+        sidecars.append((shard, np.load(path, mmap_mode="r")))
+    if not sidecars:
+        raise FileNotFoundError(f"No metadata sidecars in {shar_dir}")
+
+    widths = {
+        name: max(sidecar.dtype[name].itemsize for _, sidecar in sidecars)
+        for name in STRING_COLUMNS
+    }
+    dtype = _dtype(widths, rollup=True)
+    array = np.empty(sum(len(sidecar) for _, sidecar in sidecars), dtype=dtype)
+    start = 0
+    for shard, sidecar in sidecars:
+        end = start + len(sidecar)
+        for name in sidecar.dtype.names or []:
+            array[name][start:end] = sidecar[name]
+        array["shard"][start:end] = shard
+        array["index"][start:end] = np.arange(len(sidecar))
+        start = end
+    return array
+
+
+def write_rollup(shar_dir: Path) -> None:
+    """Save the rollup of the sidecars of `shar_dir` next to them, if there are any"""
+    if not sidecar_paths(shar_dir):
+        return
+    path = metadata_dir(shar_dir) / ROLLUP_FILENAME
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, rollup(shar_dir))
+    os.replace(tmp_path, path)
+
+
+class SharMetadata:
+    """Query the cuts of a shar directory by their metadata alone
+
+    Reads the rollup written by `write_shar` to the `metadata_dir` of the shards,
+    memory-mapped, or the per-shard sidecars when there is no rollup, never the
+    cut manifests or the audio.
+    """
+
+    def __init__(self, shar_dir: str | Path) -> None:
+        self.shar_dir = Path(shar_dir)
+        path = metadata_dir(self.shar_dir) / ROLLUP_FILENAME
+        if path.exists():
+            self.table = np.load(path, mmap_mode="r")
+        else:
+            self.table = rollup(self.shar_dir)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def mask(
+        self,
+        min_duration: float | None = None,
+        max_duration: float | None = None,
+        speaker: str | None = None,
+        gender: str | None = None,
+        language: str | None = None,
+        subset: str | None = None,
+    ) -> np.ndarray:
+        """Whether each cut matches every filter that is given"""
+        mask = np.ones(len(self.table), dtype=bool)
+        if min_duration is not None:
+            mask &= self.table["duration"] >= min_duration
+        if max_duration is not None:
+            mask &= self.table["duration"] <= max_duration
+        filters = {
+            "speaker": speaker,
+            "gender": gender,
+            "language": language,
+            "subset": subset,
+        }
+        for name, value in filters.items():
+            if value is not None:
+                mask &= self.table[name] == value.encode("utf-8")
+        return mask
+
+    def query(self, **filters) -> list[tuple[int, int]]:
+        """(shard, index in the shard) of each matching cut, see `mask`"""
+        rows = self.table[self.mask(**filters)]
+        return list(zip(rows["shard"].tolist(), rows["index"].tolist()))
+
+    def cut_ids(self, **filters) -> list[str]:
+        return [i.decode("utf-8") for i in self.table["id"][self.mask(**filters)]]
+
+    def stats(self, **filters) -> MetadataStats:
+        """Aggregates over the matching cuts, see `mask`"""
+        rows = self.table[self.mask(**filters)]
+        if len(rows) == 0:
+            return MetadataStats()
+        durations = rows["duration"]
+        return MetadataStats(
+            num_cuts=len(rows),
+            total_seconds=float(durations.sum()),
+            min_duration=float(durations.min()),
+            max_duration=float(durations.max()),
+            num_speakers=int((np.unique(rows["speaker"]) != b"").sum()),
+            subsets=_counts(rows["subset"]),
+            genders=_counts(rows["gender"]),
+            languages=_counts(rows["language"]),
+            sampling_rates=_counts(rows["sampling_rate"]),
+        )
+
+
+def _dtype(widths: dict[str, int], rollup: bool = False) -> np.dtype:
+    fields = [("id", f"S{widths['id']}"), *NUMERIC_COLUMNS]
+    fields += [(name, f"S{widths[name]}") for name in STRING_COLUMNS[1:]]
+    if rollup:
+        fields += [("shard", "<i4"), ("index", "<i4")]
+    return np.dtype(fields)
+
+
+def _width(values: list[bytes]) -> int:
+    # numpy has no zero-width strings
+    return max([len(value) for value in values] + [1])
+
+
+def _counts(values: np.ndarray) -> dict:
+    keys, counts = np.unique(values, return_counts=True)
+    return {
+        key.decode("utf-8") if isinstance(key, bytes) else int(key): int(count)
+        for key, count in zip(keys.tolist(), counts.tolist())
+    }
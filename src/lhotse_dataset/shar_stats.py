@@ -0,0 +1,176 @@
+import gzip
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from pydantic import BaseModel
+
+from lhotse_dataset.shar import shard_index
+from lhotse_dataset.shar_metadata import sidecar_path
+
+GROUPS = ["subset", "speaker", "gender", "language"]
+# upper edges in seconds of the duration histograms; the last bin is open
+HISTOGRAM_EDGES = [1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0]
+
+
+class GroupStats(BaseModel):
+    num_cuts: int = 0
+    total_seconds: float = 0.0
+    histogram: list[int] = [0] * (len(HISTOGRAM_EDGES) + 1)
+
+    @property
+    def hours(self) -> float:
+        return self.total_seconds / 3600
+
+    def add(self, other: "GroupStats") -> None:
+        self.num_cuts += other.num_cuts
+        self.total_seconds += other.total_seconds
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+
+class SharStats(BaseModel):
+    """Hours, cut counts and duration histograms of shar shards, overall and by group
+
+    Cuts without a value for a group, such as a speaker, are counted under "".
+    """
+
+    histogram_edges: list[float] = HISTOGRAM_EDGES
+    num_shards: int = 0
+    num_sidecars: int = 0
+    total: GroupStats = GroupStats()
+    groups: dict[str, dict[str, GroupStats]] = {group: {} for group in GROUPS}
+
+    @classmethod
+    def from_columns(
+        cls, durations: np.ndarray, columns: dict[str, list[str]]
+    ) -> "SharStats":
+        """Stats of one shard, from the duration and group values of its cuts"""
+        num_bins = len(HISTOGRAM_EDGES) + 1
+        bins = np.searchsorted(HISTOGRAM_EDGES, durations, side="right")
+        stats = cls(num_shards=1)
+        stats.total = GroupStats(
+            num_cuts=len(durations),
+            total_seconds=float(durations.sum()),
+            histogram=np.bincount(bins, minlength=num_bins).tolist(),
+        )
+        for group in GROUPS:
+            values, inverse = np.unique(np.asarray(columns[group]), return_inverse=True)
+            num_values = len(values)
+            num_cuts = np.bincount(inverse, minlength=num_values).tolist()
+            seconds = np.bincount(inverse, durations, minlength=num_values).tolist()
+            histograms = np.bincount(
+                inverse * num_bins + bins, minlength=num_values * num_bins
+            ).reshape(num_values, num_bins)
+            stats.groups[group] = {
+                str(value): GroupStats(
+                    num_cuts=num_cuts[i],
+                    total_seconds=seconds[i],
+                    histogram=histograms[i].tolist(),
+                )
+                for i, value in enumerate(values.tolist())
+            }
+        return stats
+
+    def add(self, other: "SharStats") -> None:
+        self.num_shards += other.num_shards
+        self.num_sidecars += other.num_sidecars
+        self.total.add(other.total)
+        for group in GROUPS:
+            values = self.groups[group]
+            for value, stats in other.groups[group].items():
+                if value in values:
+                    values[value].add(stats)
+                else:
+                    values[value] = stats
+
+    def table(self, max_rows: int = 20) -> str:
+        """Text table of the total and of the `max_rows` largest values per group"""
+        bins = [f"<{edge:g}s" for edge in self.histogram_edges]
+        bins.append(f">={self.histogram_edges[-1]:g}s")
+        header = f"  {'':<24} {'cuts':>10} {'hours':>10}"
+        header += "".join(f" {b:>8}" for b in bins)
+
+        def row(name: str, stats: GroupStats) -> str:
+            line = f"  {name[:24]:<24} {stats.num_cuts:10d} {stats.hours:10.2f}"
+            return line + "".join(f" {count:8d}" for count in stats.histogram)
+
+        lines = [
+            f"{self.num_shards} shards, {self.num_sidecars} read from sidecars",
+            header,
+            row("total", self.total),
+        ]
+        for group in GROUPS:
+            values = self.groups[group]
+            if set(values) <= {""}:
+                continue
+            lines.append(f"{group} ({len(values)})")
+            largest = sorted(values.items(), key=lambda item: -item[1].total_seconds)
+            for value, stats in largest[:max_rows]:
+                lines.append(row(value or "-", stats))
+        return "\n".join(lines)
+
+
+def shard_stats(cuts_path: Path) -> SharStats:
+    """Stats of one shard from its metadata sidecar, or its cut manifest without one
+
+    The manifest lines are read as JSON, without building any cuts.
+    """
+    index = shard_index(cuts_path)
+    sidecar = sidecar_path(cuts_path.parent, index) if index is not None else None
+    if sidecar is not None and sidecar.exists():
+        table = np.load(sidecar)
+        columns = {
+            group: [value.decode("utf-8") for value in table[group].tolist()]
+            for group in GROUPS
+        }
+        stats = SharStats.from_columns(table["duration"].astype(np.float64), columns)
+        stats.num_sidecars = 1
+        return stats
+
+    durations = []
+    columns: dict[str, list[str]] = {group: [] for group in GROUPS}
+    with gzip.open(cuts_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            cut = json.loads(line)
+            durations.append(cut["duration"])
+            supervisions = cut.get("supervisions") or [{}]
+            supervision = supervisions[0]
+            subset = (cut.get("custom") or {}).get("subset")
+            if subset is None:
+                subset = (supervision.get("custom") or {}).get("subset")
+            columns["subset"].append(subset or "")
+            for group in ["speaker", "gender", "language"]:
+                columns[group].append(supervision.get(group) or "")
+    return SharStats.from_columns(np.asarray(durations, dtype=np.float64), columns)
+
+
+def cut_paths(shar_dir: Path) -> list[Path]:
+    """Cut manifests of `shar_dir` and of the bucket directories below it
+
+    The `state_dir` of a bucket holds its staged shards, so it is left out.
+    """
+    return sorted(
+        path
+        for path in shar_dir.glob("**/cuts.*.jsonl.gz")
+        if not any(part.endswith(".state") for part in path.relative_to(shar_dir).parts)
+    )
+
+
+def shar_stats(shar_dir: Path, num_workers: int = 1) -> SharStats:
+    """Stats of every shard of `shar_dir`, one shard per task over `num_workers`"""
+    paths = cut_paths(shar_dir)
+    stats = SharStats()
+    if num_workers <= 1:
+        for path in paths:
+            stats.add(shard_stats(path))
+        return stats
+
+    with ProcessPoolExecutor(
+        max_workers=num_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        chunksize = max(1, len(paths) // (num_workers * 4))
+        for shard in executor.map(shard_stats, paths, chunksize=chunksize):
+            stats.add(shard)
+    return stats
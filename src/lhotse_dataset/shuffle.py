@@ -0,0 +1,210 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Generator, Iterable, Iterator
+
+import numpy as np
+from lhotse import CutSet
+from lhotse.cut import Cut
+from pydantic import BaseModel
+
+from lhotse_dataset.instrumentation import count, stage
+from lhotse_dataset.shar import EncodeStats, PassthroughSharWriter
+
+SHUFFLE_DIRNAME = "shuffle"
+STATE_FILENAME = "runs.json"
+# run labels drawn at once when merging
+MERGE_BATCH_SIZE = 4096
+
+
+class ShuffleConfig(BaseModel):
+    """Seeded shuffle of `write_shar` in memory bounded by the runs it spills
+
+    A run ends at `run_size` cuts or `run_bytes` of encoded data, whichever comes
+    first, and only its encoded data is held in memory. At most `max_open_runs`
+    runs are read at once, each holding open one file per field and one for the
+    cuts.
+    """
+
+    seed: int = 0
+    run_size: int = 10000
+    run_bytes: int = 1024**3
+    max_open_runs: int = 128
+
+
+class Run(BaseModel):
+    name: str
+    num_cuts: int
+
+
+class ShuffleState(BaseModel):
+    """Runs finished so far, saved after each so that a resumed shuffle keeps them"""
+
+    num_spilled: int = 0
+    spilled: bool = False
+    next_run: int = 0
+    runs: list[Run] = []
+
+    @classmethod
+    def load(cls, work_dir: Path) -> "ShuffleState":
+        path = work_dir / STATE_FILENAME
+        if not path.exists():
+            return cls()
+        return cls.model_validate_json(path.read_text(encoding="utf-8"))
+
+    def save(self, work_dir: Path) -> None:
+        path = work_dir / STATE_FILENAME
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(self.model_dump_json(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def new_run(self) -> str:
+        self.next_run += 1
+        return f"run_{self.next_run - 1:06d}"
+
+
+def external_shuffle(
+    cuts: Iterable[Cut],
+    work_dir: Path,
+    fields: dict[str, str],
+    config: ShuffleConfig = ShuffleConfig(),
+    passthrough: bool = True,
+    resume: bool = False,
+) -> Generator[Cut, None, None]:
+    """Cuts in a random order, the same for the same seed, spilled to `work_dir`
+
+    The cuts are encoded to a run file as they arrive, and each full run is read
+    back, shuffled in memory and written again. The runs are then merged by
+    drawing each next cut from a run chosen in proportion to the cuts it has
+    left. That gives every order of the cuts the same probability, and the audio
+    is encoded only once, when spilling, since shuffled and merged runs and the
+    shar writer copy it as it is. While there are more
+    than `max_open_runs` runs, groups of them are merged into longer runs first.
+
+    With `resume`, the runs of an earlier, interrupted shuffle are kept, and
+    the cuts they hold are skipped.
+    """
+    if not resume:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    state = ShuffleState.load(work_dir)
+
+    if not state.spilled:
+        cuts = iter(cuts)
+        # enumerated again, but not encoded again
+        for _ in zip(range(state.num_spilled), cuts):
+            pass
+        while True:
+            name = f"run_{state.next_run:06d}"
+            arrival_name = f"{name}.arrival"
+            with stage("spill"):
+                stats, num_cuts = _write_run(
+                    work_dir,
+                    arrival_name,
+                    cuts,
+                    fields,
+                    passthrough,
+                    config.run_size,
+                    config.run_bytes,
+                )
+            if num_cuts == 0:
+                shutil.rmtree(work_dir / arrival_name)
+                break
+            count("spilled", stats.num_encoded + stats.num_transcoded)
+
+            state.new_run()
+            # a generator per run, so that a resumed shuffle draws the same
+            rng = np.random.default_rng((config.seed, 0, state.next_run))
+            with stage("spill_shuffle"):
+                run = list(_read_run(work_dir / arrival_name, fields))
+                run = [run[i] for i in rng.permutation(len(run))]
+                _write_run(work_dir, name, iter(run), fields)
+            del run
+            shutil.rmtree(work_dir / arrival_name)
+            count("spill_runs")
+            state.runs.append(Run(name=name, num_cuts=num_cuts))
+            state.num_spilled += num_cuts
+            state.save(work_dir)
+        state.spilled = True
+        state.save(work_dir)
+
+    while len(state.runs) > config.max_open_runs:
+        group = state.runs[: config.max_open_runs]
+        name = state.new_run()
+        rng = np.random.default_rng((config.seed, 1, state.next_run))
+        with stage("spill_merge"):
+            _write_run(work_dir, name, _merge(work_dir, group, fields, rng), fields)
+        count("spill_runs")
+        state.runs = state.runs[len(group) :] + [
+            Run(name=name, num_cuts=sum(run.num_cuts for run in group))
+        ]
+        state.save(work_dir)
+        for run in group:
+            shutil.rmtree(work_dir / run.name)
+
+    rng = np.random.default_rng((config.seed, 2))
+    yield from _merge(work_dir, state.runs, fields, rng)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _merge(
+    work_dir: Path, runs: list[Run], fields: dict[str, str], rng: np.random.Generator
+) -> Generator[Cut, None, None]:
+    # the runs of the next cuts, drawn a batch at a time: how many come from each
+    # run follows the multivariate hypergeometric distribution, and their order
+    # is uniform given those counts
+    remaining = np.array([run.num_cuts for run in runs], dtype=np.int64)
+    readers = [_read_run(work_dir / run.name, fields) for run in runs]
+    while remaining.sum() > 0:
+        batch = rng.multivariate_hypergeometric(
+            remaining, min(MERGE_BATCH_SIZE, int(remaining.sum()))
+        )
+        remaining -= batch
+        for i in rng.permutation(np.repeat(np.arange(len(runs)), batch)):
+            yield next(readers[i])
+
+
+def _write_run(
+    work_dir: Path,
+    name: str,
+    cuts: Iterator[Cut],
+    fields: dict[str, str],
+    passthrough: bool = True,
+    max_cuts: int | None = None,
+    max_bytes: int | None = None,
+) -> tuple[EncodeStats, int]:
+    """Write `cuts` to the run `name`, which only exists once it is complete
+
+    Stops at `max_cuts` cuts or once `max_bytes` are written, leaving the rest of
+    `cuts` unread. Returns the encode stats and the number of cuts.
+    """
+    tmp_dir = work_dir / f"{name}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.rmtree(work_dir / name, ignore_errors=True)
+    tmp_dir.mkdir()
+    num_cuts = 0
+    with PassthroughSharWriter(
+        str(tmp_dir),
+        fields=fields,
+        shard_size=None,
+        passthrough=passthrough,
+        warn_unused_fields="recording" in fields,
+    ) as writer:
+        for cut in cuts:
+            writer.write(cut)
+            num_cuts += 1
+            if num_cuts == max_cuts or (
+                max_bytes is not None and writer.num_bytes >= max_bytes
+            ):
+                break
+    os.replace(tmp_dir, work_dir / name)
+    return writer.stats, num_cuts
+
+
+def _read_run(run_dir: Path, fields: dict[str, str]) -> Iterator[Cut]:
+    # explicit fields, as `in_dir` would take every file of the run for one
+    paths = {"cuts": [str(run_dir / "cuts.jsonl.gz")]}
+    for field in fields:
+        (path,) = run_dir.glob(f"{field}.*")
+        paths[field] = [str(path)]
+    return iter(CutSet.from_shar(fields=paths))
@@ -0,0 +1,33 @@
+from dataclasses import fields
+
+import lhotse
+from lhotse import fastcopy
+from lhotse.audio.source import AudioSource
+
+_source_types: dict[str, type[AudioSource]] = {}
+
+
+def register_source(source_type: str, cls: type[AudioSource]) -> None:
+    """Make `restore_sources` build `cls` for sources of `source_type`
+
+    `cls` has to keep to the fields of `AudioSource`, so that the manifests it
+    writes stay readable by lhotse alone.
+    """
+    assert {f.name for f in fields(cls)} == {f.name for f in fields(AudioSource)}
+    _source_types[source_type] = cls
+
+
+def restore_sources(recording: lhotse.Recording) -> lhotse.Recording:
+    """`recording` read back by lhotse, with the sources of this package restored
+
+    lhotse reads every source as a plain `AudioSource`, which can not load the
+    types registered with `register_source`.
+    """
+    sources = []
+    for source in recording.sources:
+        cls = _source_types.get(source.type)
+        if cls is not None and not isinstance(source, cls):
+            values = {f.name: getattr(source, f.name) for f in fields(AudioSource)}
+            source = cls(**values)
+        sources.append(source)
+    return fastcopy(recording, sources=sources)
@@ -0,0 +1,149 @@
+import heapq
+import itertools
+import tarfile
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Generator, TypeVar
+
+from lhotse_dataset.instrumentation import count, stage
+
+T = TypeVar("T")
+
+DEFAULT_MAX_BUFFERED_BYTES = 512 * 1024**2
+
+
+def read_member(tar: tarfile.TarFile, member: tarfile.TarInfo) -> bytes:
+    with stage("extract") as stats:
+        f = tar.extractfile(member)
+        assert f is not None
+        data = f.read()
+        stats.num_bytes += len(data)
+    return data
+
+
+def first_line(data: bytes) -> str:
+    """Same as `readline` on the decoded text, including the line feed"""
+    # only "\n" ends a line, as for files opened with newline="\n"
+    end = data.find(b"\n") + 1 or len(data)
+    return data[:end].decode("utf-8")
+
+
+class MemberBuffer:
+    """Member bytes kept for the items still waiting on them, within `max_bytes`
+
+    Beyond `max_bytes`, the members with the most references left, which are
+    likely kept the longest, are spilled to files of their own in a temporary
+    directory in `spill_dir`. A member is dropped, from memory or disk, once
+    every reference to it has been taken.
+    """
+
+    def __init__(self, max_bytes: int, spill_dir: Path | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.spill_dir = spill_dir
+        self._memory: dict[str, bytes] = {}
+        self._spilled: dict[str, Path] = {}
+        self._references: dict[str, int] = {}
+        # stale entries are skipped or pushed again with their current count
+        self._heap: list[tuple[int, int, str]] = []
+        self._seq = itertools.count()
+        self._tmp_dir: tempfile.TemporaryDirectory | None = None
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._references
+
+    def add(self, name: str, data: bytes, num_references: int) -> None:
+        self._references[name] = num_references
+        self._memory[name] = data
+        self.num_bytes += len(data)
+        heapq.heappush(self._heap, (-num_references, next(self._seq), name))
+        while self.num_bytes > self.max_bytes and self._heap:
+            references, seq, spilled = heapq.heappop(self._heap)
+            if spilled not in self._memory:
+                continue
+            if -references != self._references[spilled]:
+                current = -self._references[spilled]
+                heapq.heappush(self._heap, (current, seq, spilled))
+                continue
+            self._spill(spilled, seq)
+
+    def take(self, name: str) -> bytes:
+        """Bytes of `name` for one of the items referring to it"""
+        if name in self._memory:
+            data = self._memory[name]
+        else:
+            data = self._spilled[name].read_bytes()
+        self._references[name] -= 1
+        if self._references[name] == 0:
+            del self._references[name]
+            if name in self._memory:
+                self.num_bytes -= len(self._memory.pop(name))
+            else:
+                self._spilled.pop(name).unlink()
+        return data
+
+    def close(self) -> None:
+        if self._tmp_dir is not None:
+            self._tmp_dir.cleanup()
+
+    def _spill(self, name: str, seq: int) -> None:
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.TemporaryDirectory(dir=self.spill_dir)
+        data = self._memory.pop(name)
+        self.num_bytes -= len(data)
+        # member names may hold directories, so the files are named by sequence
+        path = Path(self._tmp_dir.name) / str(seq)
+        path.write_bytes(data)
+        self._spilled[name] = path
+        count("spilled_member_bytes", len(data))
+
+
+def stream_tar_members(
+    tar_path: Path,
+    items: list[T],
+    members_fn: Callable[[T], list[str]],
+    max_buffered_bytes: int = DEFAULT_MAX_BUFFERED_BYTES,
+) -> Generator[tuple[T, dict[str, bytes]], None, None]:
+    """Yield each item with the bytes of its members in one pass over a tar.gz archive
+
+    An item is yielded as soon as the last of its members streamed past, and member
+    bytes are only kept until every item referring to them has been yielded, in a
+    `MemberBuffer` of `max_buffered_bytes`. Items whose members are not all in the
+    archive are yielded at the end with the members that were found.
+
+    Every partition worker streams the archive on its own, so that none of them
+    waits on another or holds more than the members of its own items.
+    """
+    item_members = [list(dict.fromkeys(members_fn(item))) for item in items]
+
+    waiting: dict[str, list[int]] = defaultdict(list)
+    for i, names in enumerate(item_members):
+        for name in names:
+            waiting[name].append(i)
+    num_missing = [len(names) for names in item_members]
+    buffered = MemberBuffer(max_buffered_bytes, tar_path.parent)
+
+    def release(i: int) -> dict[str, bytes]:
+        return {
+            name: buffered.take(name) for name in item_members[i] if name in buffered
+        }
+
+    try:
+        with tarfile.open(tar_path, mode="r|gz") as tar:
+            for member in tar:
+                if not member.isfile() or member.name not in waiting:
+                    continue
+
+                indices = waiting.pop(member.name)
+                buffered.add(member.name, read_member(tar, member), len(indices))
+                for i in indices:
+                    num_missing[i] -= 1
+                    if num_missing[i] == 0:
+                        yield items[i], release(i)
+
+        for i, item in enumerate(items):
+            if num_missing[i] > 0:
+                yield item, release(i)
+    finally:
+        buffered.close()
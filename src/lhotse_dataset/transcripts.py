@@ -0,0 +1,82 @@
+import os
+import warnings
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from lhotse_dataset.cache import DownloadCache, get_download_cache
+from lhotse_dataset.instrumentation import count
+from lhotse_dataset.streaming import first_line
+
+NORMALIZED_SUFFIX = ".normalized.txt"
+ORIGINAL_SUFFIX = ".original.txt"
+
+
+class TranscriptIndex(BaseModel):
+    """Normalized and original text of every LibriTTS-R utterance of one archive
+
+    Collected in the pass over the archive that reads the audio, and kept next
+    to the download cache so that the text files are read only once.
+    """
+
+    archive_size: int = 0
+    normalized: dict[str, str] = {}
+    original: dict[str, str] = {}
+
+    @staticmethod
+    def path(url: str) -> Path:
+        """Default location, in the download cache, keyed like the archive"""
+        return (
+            get_download_cache().root / "transcripts" / f"{DownloadCache.key(url)}.json"
+        )
+
+    @classmethod
+    def load(
+        cls, url: str, path: Path, index_path: Path | None = None
+    ) -> "TranscriptIndex | None":
+        """Cached index of the archive of `url` downloaded to `path`, None if missing
+
+        On a miss, the texts are collected with `add` in the pass that reads the
+        audio, and `cache` keeps them for the next time.
+        """
+        if index_path is None:
+            index_path = cls.path(url)
+        if not index_path.exists():
+            return None
+        index = cls.model_validate_json(index_path.read_text(encoding="utf-8"))
+        if index.archive_size == path.stat().st_size:
+            return index
+        return None
+
+    def cache(self, url: str, index_path: Path | None = None) -> None:
+        if index_path is None:
+            index_path = self.path(url)
+        try:
+            self.save(index_path)
+        except OSError:
+            warnings.warn(f"Could not save the transcript index to {index_path}")
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(self.model_dump_json(), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def add(self, name: str, data: bytes) -> None:
+        if name.endswith(NORMALIZED_SUFFIX):
+            self.normalized[name.removesuffix(NORMALIZED_SUFFIX)] = first_line(data)
+        elif name.endswith(ORIGINAL_SUFFIX):
+            self.original[name.removesuffix(ORIGINAL_SUFFIX)] = first_line(data)
+
+    def complete(self, utterance_id: str) -> bool:
+        return utterance_id in self.normalized and utterance_id in self.original
+
+    def texts(self, utterance_id: str) -> tuple[str, str]:
+        """Normalized and original text, empty and counted when missing"""
+        normalized = self.normalized.get(utterance_id)
+        original = self.original.get(utterance_id)
+        if normalized is None:
+            count("missing_normalized_texts")
+        if original is None:
+            count("missing_original_texts")
+        return normalized or "", original or ""
@@ -1,20 +1,233 @@
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import BinaryIO, Generator
 
 import requests
+import urllib3
+from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
+from lhotse_dataset.cache import get_download_cache
+from lhotse_dataset.instrumentation import stage
 
-def download_file(url: str, path: Path, session: requests.Session | None = None):
-    with (
-        session.get(url, stream=True)
-        if session is not None
-        else requests.get(url, stream=True)
-    ) as r:
+NUM_SEGMENTS = 8
+MIN_SEGMENT_BYTES = 64 * 1024**2
+MIN_CHUNK_BYTES = 64 * 1024
+MAX_CHUNK_BYTES = 8 * 1024**2
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 1.0
+TIMEOUT_SECONDS = 60.0
+PROGRESS_SAVE_INTERVAL_SECONDS = 1.0
+
+
+class Segment(BaseModel):
+    start: int
+    end: int
+    done: int = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.start - self.done
+
+
+class DownloadProgress(BaseModel):
+    url: str
+    size: int
+    segments: list[Segment]
+
+
+def download_file(
+    url: str,
+    path: Path,
+    session: requests.Session | None = None,
+    checksum: str | None = None,
+):
+    with stage("download") as stats:
+
+        def fetch(dst: Path) -> None:
+            _download(url, dst, session)
+            # cache hits are not downloads
+            stats.num_bytes += dst.stat().st_size
+
+        get_download_cache().fetch(url, path, fetch, checksum=checksum)
+
+
+@functools.cache
+def _default_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=NUM_SEGMENTS, pool_maxsize=NUM_SEGMENTS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _download(url: str, path: Path, session: requests.Session | None = None):
+    """Download `url` to `path` in parallel byte ranges, resuming a partial `path`
+
+    Falls back to a single stream when the server does not support range requests.
+    """
+    if session is None:
+        session = _default_session()
+
+    url, size = _probe(url, session)
+    if size is None:
+        _download_stream(url, path, session)
+        return
+
+    progress_path = path.with_name(path.name + ".progress")
+    progress = None
+    if path.exists() and progress_path.exists():
+        progress = DownloadProgress.model_validate_json(progress_path.read_text())
+        if progress.url != url or progress.size != size:
+            progress = None
+    if progress is None:
+        num_segments = max(1, min(NUM_SEGMENTS, size // MIN_SEGMENT_BYTES))
+        bounds = [size * i // num_segments for i in range(num_segments + 1)]
+        progress = DownloadProgress(
+            url=url,
+            size=size,
+            segments=[Segment(start=s, end=e) for s, e in zip(bounds, bounds[1:])],
+        )
+        path.unlink(missing_ok=True)
+
+    pbar = tqdm(
+        total=size,
+        initial=sum(segment.done for segment in progress.segments),
+        unit="B",
+        unit_scale=True,
+    )
+    lock = threading.Lock()
+    last_save = time.monotonic()
+
+    def on_chunk(num_bytes: int) -> None:
+        nonlocal last_save
+        with lock:
+            pbar.update(num_bytes)
+            if time.monotonic() - last_save > PROGRESS_SAVE_INTERVAL_SECONDS:
+                progress_path.write_text(progress.model_dump_json())
+                last_save = time.monotonic()
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    try:
+        os.ftruncate(fd, size)
+        pending = [segment for segment in progress.segments if segment.remaining > 0]
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+            futures = [
+                executor.submit(_download_segment, url, session, fd, segment, on_chunk)
+                for segment in pending
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        os.close(fd)
+        pbar.close()
+        with lock:
+            progress_path.write_text(progress.model_dump_json())
+
+    progress_path.unlink()
+
+
+def _probe(url: str, session: requests.Session) -> tuple[str, int | None]:
+    """Resolve redirects and return the size if the server supports range requests"""
+    headers = {"Range": "bytes=0-0", "Accept-Encoding": "identity"}
+    with session.get(url, headers=headers, stream=True, timeout=TIMEOUT_SECONDS) as r:
         r.raise_for_status()
-        pbar = tqdm(
-            total=int(r.headers.get("content-length", 0)), unit="B", unit_scale=True
+        content_range = r.headers.get("Content-Range", "")
+        if r.status_code != 206 or not content_range.startswith("bytes "):
+            return r.url, None
+        total = content_range.split("/")[-1]
+        return r.url, int(total) if total.isdigit() else None
+
+
+def _download_segment(
+    url: str, session: requests.Session, fd: int, segment: Segment, on_chunk
+) -> None:
+    failures = 0
+    while segment.remaining > 0:
+        received = 0
+        try:
+            offset = segment.start + segment.done
+            headers = {
+                "Range": f"bytes={offset}-{segment.end - 1}",
+                "Accept-Encoding": "identity",
+            }
+            with session.get(
+                url, headers=headers, stream=True, timeout=TIMEOUT_SECONDS
+            ) as r:
+                r.raise_for_status()
+                if r.status_code != 206:
+                    raise ValueError(f"Range request ignored by {url}")
+                for chunk in _iter_chunks(r.raw, segment.remaining):
+                    os.pwrite(fd, chunk, segment.start + segment.done)
+                    segment.done += len(chunk)
+                    received += len(chunk)
+                    on_chunk(len(chunk))
+            if segment.remaining > 0:
+                raise ConnectionError(f"Connection to {url} closed early")
+        except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+            failures = _backoff(e, 0 if received > 0 else failures + 1)
+
+
+def _download_stream(url: str, path: Path, session: requests.Session) -> None:
+    failures = 0
+    while True:
+        received = 0
+        try:
+            headers = {"Accept-Encoding": "identity"}
+            with session.get(
+                url, headers=headers, stream=True, timeout=TIMEOUT_SECONDS
+            ) as r:
+                r.raise_for_status()
+                size = int(r.headers.get("content-length", 0))
+                pbar = tqdm(total=size, unit="B", unit_scale=True)
+                with open(path, "wb") as f:
+                    for chunk in _iter_chunks(r.raw):
+                        f.write(chunk)
+                        received += len(chunk)
+                        pbar.update(len(chunk))
+                pbar.close()
+            if 0 < size != received:
+                raise ConnectionError(f"Connection to {url} closed early")
+            return
+        except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+            failures = _backoff(e, failures + 1)
+
+
+def _backoff(e: Exception, failures: int) -> int:
+    """Sleep before the next attempt, or re-raise `e` once retries are exhausted"""
+    if isinstance(e, requests.HTTPError):
+        status_code = e.response.status_code if e.response is not None else 0
+        if status_code < 500 and status_code != 429:
+            raise e
+    if failures > MAX_RETRIES:
+        raise e
+    time.sleep(BACKOFF_SECONDS * 2 ** max(failures - 1, 0))
+    return failures
+
+
+def _iter_chunks(
+    raw: BinaryIO, remaining: int | None = None
+) -> Generator[bytes, None, None]:
+    """Read `raw` in chunks that grow while reads are fast and shrink when slow"""
+    chunk_size = MIN_CHUNK_BYTES
+    while remaining is None or remaining > 0:
+        start = time.monotonic()
+        chunk = raw.read(
+            chunk_size if remaining is None else min(chunk_size, remaining)
         )
-        with open(path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-                pbar.update(len(chunk))
+        if not chunk:
+            return
+        if remaining is not None:
+            remaining -= len(chunk)
+        yield chunk
+
+        elapsed = time.monotonic() - start
+        if elapsed < 0.1 and len(chunk) == chunk_size:
+            chunk_size = min(chunk_size * 2, MAX_CHUNK_BYTES)
+        elif elapsed > 1.0:
+            chunk_size = max(chunk_size // 2, MIN_CHUNK_BYTES)
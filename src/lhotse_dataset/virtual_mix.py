@@ -0,0 +1,182 @@
+import functools
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+import lhotse
+import numpy as np
+from lhotse import CutSet, fastcopy
+from lhotse.audio.source import AudioSource, VideoInfo
+from lhotse.cut import Cut
+from pydantic import BaseModel
+
+from lhotse_dataset.instrumentation import stage
+from lhotse_dataset.mixing import (
+    Mixer,
+    decode,
+    extend_noise,
+    get_decoded_audio_cache,
+)
+from lhotse_dataset.shar_index import SharIndex, get_shar_reader
+from lhotse_dataset.sources import register_source
+
+MIXTURE_SOURCE_TYPE = "mixture"
+
+
+class MixtureChannel(BaseModel):
+    """One channel of a mixture: a channel of a source cut, scaled and shifted"""
+
+    shar: str
+    cut_id: str
+    channel: int = 0
+    gain: float = 1.0
+    offset: int = 0
+    # loop a source shorter than the mixture with crossfades, as for noise
+    extend: bool = False
+
+
+class MixtureRecipe(BaseModel):
+    """Everything needed to render a mixture from its source shars
+
+    The channels name their shars, which are only given directories when the
+    mixtures are read, so that the shars can be moved.
+    """
+
+    sampling_rate: int
+    num_samples: int
+    channels: list[MixtureChannel]
+
+    def render(self, shar_dirs: dict[str, str]) -> np.ndarray:
+        """shar_dirs: directories of the source shars, by name"""
+        sources = []
+        for channel in self.channels:
+            if channel.shar not in shar_dirs:
+                raise ValueError(
+                    f"No directory for the source shar {channel.shar}, "
+                    "read the mixtures with read_virtual_shar"
+                )
+            shar_dir = shar_dirs[channel.shar]
+            samples, sampling_rate = get_decoded_audio_cache().get(
+                f"{shar_dir}:{channel.cut_id}",
+                lambda: decode(get_shar_reader(shar_dir).read(channel.cut_id)),
+            )
+            if samples.ndim > 1:
+                samples = samples[:, channel.channel]
+            length = self.num_samples - channel.offset
+            if channel.extend and len(samples) < length:
+                samples = extend_noise(samples, length, sampling_rate)
+            sources.append(samples)
+
+        with stage("mix"):
+            return Mixer(len(self.channels)).mix(
+                sources,
+                [channel.gain for channel in self.channels],
+                [channel.offset for channel in self.channels],
+                self.num_samples,
+            )
+
+
+@dataclass(init=False)
+class MixtureSource(AudioSource):
+    """Source of a recipe-only mixture, rendered from the source shars when loaded
+
+    The recipe is the JSON `source`, so the manifest is a plain `AudioSource` of
+    type "mixture" once written. `shar_dirs`, the directories of the source shars
+    by name, is not a field and so not written; `read_virtual_shar` gives it back.
+    """
+
+    def __init__(
+        self,
+        type: str,
+        channels: list[int],
+        source: str,
+        video: VideoInfo | None = None,
+        shar_dirs: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(type=type, channels=channels, source=source, video=video)
+        self.shar_dirs = {
+            name: str(Path(path).resolve()) for name, path in (shar_dirs or {}).items()
+        }
+
+    def load_audio(self, offset=0.0, duration=None, force_opus_sampling_rate=None):
+        recipe = MixtureRecipe.model_validate_json(self.source)
+        audio = recipe.render(self.shar_dirs)
+        start = round(offset * recipe.sampling_rate)
+        if duration is None:
+            return audio[:, start:]
+        return audio[:, start : start + round(duration * recipe.sampling_rate)]
+
+
+register_source(MIXTURE_SOURCE_TYPE, MixtureSource)
+
+
+class SourceShar:
+    """Cut manifests of a shar directory that mixtures are made of
+
+    Cuts are looked up by `key`, the recording id by default, which is the file
+    stem for LibriSpeech and LibriTTS-R.
+    """
+
+    def __init__(
+        self,
+        shar_dir: str | Path,
+        key: Callable[[Cut], str] = lambda cut: cut.recording.id,
+    ) -> None:
+        self.shar_dir = Path(shar_dir).resolve()
+        cut_paths = sorted(map(str, self.shar_dir.glob("cuts.*.jsonl.gz")))
+        self.cuts = {key(cut): cut for cut in CutSet.from_shar({"cuts": cut_paths})}
+        # built up front, so that rendering never has to scan the tars
+        SharIndex.load(self.shar_dir)
+
+    def get(self, key: str) -> Cut | None:
+        return self.cuts.get(key)
+
+
+def mixture_recording(
+    recording_id: str, recipe: MixtureRecipe, shar_dirs: dict[str, str]
+) -> lhotse.Recording:
+    """shar_dirs: directories of the source shars, by name, which are not written"""
+    channels = list(range(len(recipe.channels)))
+    source = MixtureSource(
+        type=MIXTURE_SOURCE_TYPE,
+        channels=channels,
+        source=recipe.model_dump_json(),
+        shar_dirs=shar_dirs,
+    )
+    return lhotse.Recording(
+        id=recording_id,
+        sources=[source],
+        sampling_rate=recipe.sampling_rate,
+        num_samples=recipe.num_samples,
+        duration=recipe.num_samples / recipe.sampling_rate,
+        channel_ids=channels,
+    )
+
+
+def resolve(cut: Cut, shar_dirs: dict[str, str]) -> Cut:
+    """`cut` read back from a recipe-only shar, rendered from `shar_dirs` on load
+
+    shar_dirs: directories of the source shars, by name
+    """
+    recording = cut.recording
+    if recording is None or recording.sources[0].type != MIXTURE_SOURCE_TYPE:
+        return cut
+    source = recording.sources[0]
+    source = MixtureSource(
+        type=MIXTURE_SOURCE_TYPE,
+        channels=source.channels,
+        source=source.source,
+        shar_dirs=shar_dirs,
+    )
+    return fastcopy(cut, recording=fastcopy(recording, sources=[source]))
+
+
+def read_virtual_shar(in_dir: str | Path, shar_dirs: dict[str, str]) -> CutSet:
+    """Cuts of the recipe-only shar `in_dir`, rendered from `shar_dirs` when loaded
+
+    shar_dirs: directories of the source shars, by the names in the recipes, e.g.
+        {"librispeech": "/data/librispeech"}
+    """
+    return CutSet.from_shar(in_dir=in_dir).map(
+        functools.partial(resolve, shar_dirs=shar_dirs)
+    )
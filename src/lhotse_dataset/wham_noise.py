@@ -5,7 +5,8 @@ from typing import Generator
 
 import lhotse
 
-from lhotse_dataset.base import BaseCorpus
+from lhotse_dataset.archive import recording_from_zip
+from lhotse_dataset.base import BaseCorpus, Partition
 from lhotse_dataset.utils import download_file
 
 
@@ -22,7 +23,9 @@ class WhamNoise(BaseCorpus):
     def shard_size(self) -> int:
         return 2000
 
-    def get_cuts(self) -> Generator[lhotse.MultiCut, None, None]:
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MultiCut, None, None]:
         with tempfile.TemporaryDirectory() as tmp_dir:
             tmp_path = Path(tmp_dir) / "wham_noise.zip"
             download_file(self.download_url, tmp_path)
@@ -34,10 +37,8 @@ class WhamNoise(BaseCorpus):
                 if file_name.filename.endswith(".wav")
             ]
 
-            for wav_zippath in sorted(wav_zippaths):
+            for wav_zippath in partition.select(sorted(wav_zippaths)):
                 audio_id = Path(wav_zippath).stem
-                with wham_zip.open(str(wav_zippath), "r") as audio_file:
-                    wav_bytes = audio_file.read()
 
                 dir = Path(wav_zippath).parent.name
                 if dir == "tr":
@@ -49,8 +50,8 @@ class WhamNoise(BaseCorpus):
                 else:
                     raise ValueError(f"Unknown subset {dir}")
 
-                recording = lhotse.Recording.from_bytes(
-                    wav_bytes, f"recording_{audio_id}"
+                recording = recording_from_zip(
+                    wham_zip, wav_zippath, f"recording_{audio_id}"
                 )
 
                 cut = lhotse.MultiCut(
@@ -0,0 +1,93 @@
+import io
+import zipfile
+from pathlib import Path
+
+import lhotse
+import numpy as np
+import pytest
+import soundfile as sf
+from lhotse import CutSet
+from lhotse.shar import SharWriter
+
+from lhotse_dataset.archive import ZipMemberSource, recording_from_zip
+from lhotse_dataset.sources import restore_sources
+
+
+@pytest.fixture
+def zip_path(tmp_path: Path) -> Path:
+    samples = np.linspace(-0.5, 0.5, 2 * 8000).reshape(8000, 2)
+    buf = io.BytesIO()
+    sf.write(buf, samples, 16000, format="WAV", subtype="PCM_16")
+
+    path = tmp_path / "audio.zip"
+    with zipfile.ZipFile(path, "w") as zip_file:
+        # pushes the members past the mmap allocation granularity
+        zip_file.writestr("padding.txt", b"x" * 100_000)
+        zip_file.writestr("stored.wav", buf.getvalue(), zipfile.ZIP_STORED)
+        zip_file.writestr("deflated.wav", buf.getvalue(), zipfile.ZIP_DEFLATED)
+    return path
+
+
+@pytest.mark.parametrize(
+    "member, stored", [("stored.wav", True), ("deflated.wav", False)]
+)
+def test_recording_from_zip(zip_path: Path, member: str, stored: bool) -> None:
+    with zipfile.ZipFile(zip_path) as zip_file:
+        recording = recording_from_zip(zip_file, member, "recording")
+        expected = lhotse.Recording.from_bytes(zip_file.read(member), "recording")
+
+    assert recording.sources[0].zip_member.stored == stored
+    assert recording.sampling_rate == expected.sampling_rate
+    assert recording.num_samples == expected.num_samples
+    assert recording.channel_ids == expected.channel_ids
+    assert recording.source_format == "wav"
+    np.testing.assert_array_equal(recording.load_audio(), expected.load_audio())
+    np.testing.assert_array_equal(
+        recording.load_audio(offset=0.1, duration=0.2),
+        expected.load_audio(offset=0.1, duration=0.2),
+    )
+
+
+def test_recording_from_zip_write_shar(zip_path: Path, tmp_path: Path) -> None:
+    shar_dir = tmp_path / "shar"
+    shar_dir.mkdir()
+    with zipfile.ZipFile(zip_path) as zip_file:
+        recording = recording_from_zip(zip_file, "stored.wav", "recording")
+        cut = lhotse.MultiCut(
+            id="cut",
+            start=0,
+            duration=recording.duration,
+            channel=recording.channel_ids,
+            recording=recording,
+        )
+        with SharWriter(str(shar_dir), fields={"recording": "flac"}) as writer:
+            writer.write(cut)
+
+    cuts = CutSet.from_shar(in_dir=shar_dir)
+    np.testing.assert_allclose(
+        next(iter(cuts)).load_audio(), recording.load_audio(), atol=1e-4
+    )
+
+
+def test_recording_from_zip_round_trip(zip_path: Path) -> None:
+    with zipfile.ZipFile(zip_path) as zip_file:
+        recording = recording_from_zip(zip_file, "deflated.wav", "recording")
+
+    restored = restore_sources(lhotse.Recording.from_dict(recording.to_dict()))
+    assert isinstance(restored.sources[0], ZipMemberSource)
+    assert restored == recording
+    np.testing.assert_array_equal(restored.load_audio(), recording.load_audio())
+
+
+def test_recording_from_zip_reads_header_only(
+    zip_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        assert whence != io.SEEK_END
+        return zip_seek(self, offset, whence)
+
+    zip_seek = zipfile.ZipExtFile.seek
+    monkeypatch.setattr(zipfile.ZipExtFile, "seek", seek)
+    with zipfile.ZipFile(zip_path) as zip_file:
+        recording = recording_from_zip(zip_file, "deflated.wav", "recording")
+    assert recording.num_samples == 8000
@@ -0,0 +1,110 @@
+import io
+from pathlib import Path
+from typing import Generator
+
+import lhotse
+import numpy as np
+import pytest
+import soundfile as sf
+from lhotse import CutSet
+
+from lhotse_dataset.base import BaseCorpus, Partition
+from lhotse_dataset.shar import LEDGER_FILENAME, STAGING_DIRNAME, state_dir
+
+
+class ToyCorpus(BaseCorpus):
+    def __init__(self, num_cuts: int = 10, fail_after: int | None = None) -> None:
+        self.num_cuts = num_cuts
+        self.fail_after = fail_after
+
+    @property
+    def shard_size(self) -> int:
+        return 4
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
+        for i in partition.select(range(self.num_cuts)):
+            if i == self.fail_after:
+                raise RuntimeError("crash")
+            buf = io.BytesIO()
+            sf.write(buf, np.full(1600, i / 10, dtype=np.float32), 16000, format="WAV")
+            recording = lhotse.Recording.from_bytes(buf.getvalue(), f"recording_{i}")
+            yield lhotse.MonoCut(
+                id=f"cut_{i}",
+                start=0,
+                duration=recording.duration,
+                channel=0,
+                recording=recording,
+            )
+
+
+def test_partition_select() -> None:
+    partitions = [Partition(index=i, num_partitions=3) for i in range(3)]
+    selected = [list(p.select(range(10))) for p in partitions]
+    assert sorted(sum(selected, [])) == list(range(10))
+    assert list(partitions[1].select(["a", "b"], start=2)) == []
+    assert list(partitions[2].select(["a", "b"], start=2)) == ["a"]
+
+
+def test_write_shar_num_workers(tmp_path: Path) -> None:
+    shar_dir = tmp_path / "shar"
+    ToyCorpus().write_shar(shar_dir, num_workers=3)
+
+    cut_paths = sorted(map(str, shar_dir.glob("cuts.*.jsonl.gz")))
+    recording_paths = sorted(map(str, shar_dir.glob("recording.*.tar")))
+    assert [Path(p).name for p in cut_paths] == [
+        f"cuts.{i:06d}.jsonl.gz" for i in range(len(cut_paths))
+    ]
+    assert len(recording_paths) == len(cut_paths)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "shar",
+        "shar.metadata",
+        "shar.state",
+    ]
+    assert not list(state_dir(shar_dir).glob("partition.*"))
+
+    cuts = CutSet.from_shar({"cuts": cut_paths, "recording": recording_paths})
+    assert sorted(cut.id for cut in cuts) == sorted(f"cut_{i}" for i in range(10))
+    for cut in cuts:
+        audio = cut.load_audio()
+        assert audio.shape == (1, 1600)
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_write_shar_from_shar_in_dir(tmp_path: Path, num_workers: int) -> None:
+    # the shar directory holds only the shards, whatever else write_shar writes
+    shar_dir = tmp_path / "shar"
+    ToyCorpus().write_shar(shar_dir, num_workers=num_workers)
+    assert (state_dir(shar_dir) / LEDGER_FILENAME).exists()
+
+    cuts = CutSet.from_shar(in_dir=shar_dir)
+    assert sorted(cut.id for cut in cuts) == sorted(f"cut_{i}" for i in range(10))
+    for cut in cuts:
+        assert cut.load_audio().shape == (1, 1600)
+
+
+def test_write_shar_resume(tmp_path: Path) -> None:
+    shar_dir = tmp_path / "shar"
+    with pytest.raises(RuntimeError):
+        ToyCorpus(fail_after=6).write_shar(shar_dir)
+    assert sorted(p.name for p in shar_dir.glob("cuts.*")) == ["cuts.000000.jsonl.gz"]
+
+    encoded = []
+    corpus = ToyCorpus()
+    get_cuts = corpus.get_cuts
+
+    def spy(partition: Partition = Partition()):
+        for cut in get_cuts(partition):
+            encoded.append(cut.id)
+            yield cut
+
+    corpus.get_cuts = spy  # type: ignore
+    corpus.write_shar(shar_dir, resume=True)
+
+    cuts = CutSet.from_shar(in_dir=shar_dir)
+    assert [cut.id for cut in cuts] == [f"cut_{i}" for i in range(10)]
+    assert not (state_dir(shar_dir) / STAGING_DIRNAME).exists()
+
+    corpus.write_shar(shar_dir, resume=True)
+    assert len(encoded) == 10
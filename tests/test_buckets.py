@@ -0,0 +1,99 @@
+import io
+from pathlib import Path
+from typing import Generator
+
+import lhotse
+import numpy as np
+import pytest
+import soundfile as sf
+from lhotse import CutSet
+
+from lhotse_dataset.base import BaseCorpus, Partition
+from lhotse_dataset.buckets import BucketConfig, BucketManifest, bucket_dirname
+from lhotse_dataset.shar_metadata import ROLLUP_FILENAME, metadata_dir
+
+
+class DurationCorpus(BaseCorpus):
+    @property
+    def shard_size(self) -> int:
+        return 2
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
+        # durations of 0.1 to 1.0 seconds, out of order
+        for i in partition.select(range(10)):
+            num_samples = 1600 * ((i * 7) % 10 + 1)
+            buf = io.BytesIO()
+            sf.write(buf, np.zeros(num_samples), 16000, format="WAV")
+            recording = lhotse.Recording.from_bytes(buf.getvalue(), f"recording_{i}")
+            yield lhotse.MonoCut(
+                id=f"cut_{i}",
+                start=0,
+                duration=recording.duration,
+                channel=0,
+                recording=recording,
+            )
+
+
+def load_buckets(output_dir: Path) -> list[list[lhotse.MonoCut]]:
+    manifest = BucketManifest.load(output_dir)
+    return [
+        list(CutSet.from_shar(fields=manifest.fields(output_dir, i)))
+        if bucket.num_cuts
+        else []
+        for i, bucket in enumerate(manifest.buckets)
+    ]
+
+
+def test_bucket_config() -> None:
+    cuts = list(DurationCorpus().get_cuts())
+    assert BucketConfig(edges=[0.5, 0.25]).resolve(cuts) == [0.25, 0.5]
+    edges = BucketConfig(num_buckets=2).resolve(cuts)
+    assert edges == pytest.approx([0.55])
+    assert len(BucketConfig(num_buckets=4, num_estimate_cuts=3).resolve(cuts)) == 3
+
+
+def test_bucket_config_sample() -> None:
+    # enumerated longest first, as some corpora are
+    cuts = [
+        lhotse.MonoCut(id=f"cut_{i}", start=0, duration=i / 10, channel=0)
+        for i in range(1000, 0, -1)
+    ]
+    config = BucketConfig(num_buckets=2, num_estimate_cuts=100)
+    assert len(config.sample_durations(cuts)) == 100
+    # the median of a sample of the whole corpus, not of its longest cuts
+    (edge,) = config.resolve(cuts)
+    assert 35.0 < edge < 65.0
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_write_shar_buckets(tmp_path: Path, num_workers: int) -> None:
+    DurationCorpus().write_shar(
+        tmp_path, num_workers=num_workers, buckets=BucketConfig(edges=[0.35, 0.65])
+    )
+
+    manifest = BucketManifest.load(tmp_path)
+    assert [bucket.num_cuts for bucket in manifest.buckets] == [3, 3, 4]
+    assert manifest.buckets[1].min_duration == 0.35
+    assert manifest.buckets[1].max_duration == 0.65
+    for i, cuts in enumerate(load_buckets(tmp_path)):
+        assert len(cuts) == manifest.buckets[i].num_cuts
+        assert all(manifest.bucket(cut.duration) == i for cut in cuts)
+        bucket_dir = tmp_path / bucket_dirname(i)
+        assert (metadata_dir(bucket_dir) / ROLLUP_FILENAME).exists()
+    ids = sorted(cut.id for cuts in load_buckets(tmp_path) for cut in cuts)
+    assert ids == sorted(f"cut_{i}" for i in range(10))
+
+
+def test_write_shar_buckets_resume(tmp_path: Path) -> None:
+    corpus = DurationCorpus()
+    corpus.write_shar(tmp_path, buckets=BucketConfig(num_buckets=2))
+    edges = BucketManifest.load(tmp_path).edges
+
+    # resuming keeps the edges of the first run, whatever the config says
+    corpus.write_shar(tmp_path, resume=True, buckets=BucketConfig(num_buckets=5))
+    manifest = BucketManifest.load(tmp_path)
+    assert manifest.edges == edges
+    assert sum(bucket.num_cuts for bucket in manifest.buckets) == 10
+    assert sum(len(cuts) for cuts in load_buckets(tmp_path)) == 10
@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from lhotse_dataset.cache import DownloadCache
+
+
+def make_download_fn(data: bytes, calls: list[str]):
+    def download_fn(path: Path) -> None:
+        calls.append(path.name)
+        time.sleep(0.05)
+        path.write_bytes(data)
+
+    return download_fn
+
+
+def test_fetch_reuses_cached_file(tmp_path: Path) -> None:
+    cache = DownloadCache(tmp_path / "cache")
+    calls: list[str] = []
+    download_fn = make_download_fn(b"abc", calls)
+
+    threads = [
+        threading.Thread(
+            target=cache.fetch,
+            args=("http://example.com/a.zip", tmp_path / f"a{i}.zip", download_fn),
+        )
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    for i in range(4):
+        assert (tmp_path / f"a{i}.zip").read_bytes() == b"abc"
+
+
+def test_fetch_checksum_mismatch(tmp_path: Path) -> None:
+    cache = DownloadCache(tmp_path / "cache")
+    with pytest.raises(ValueError):
+        cache.fetch(
+            "http://example.com/a.zip",
+            tmp_path / "a.zip",
+            make_download_fn(b"abc", []),
+            checksum="0" * 64,
+        )
+    assert not list(cache.blob_dir.iterdir())
+
+
+def test_evict_least_recently_used(tmp_path: Path) -> None:
+    cache = DownloadCache(tmp_path / "cache", max_bytes=8)
+    calls: list[str] = []
+    for name in ["a", "b", "a", "c"]:
+        cache.fetch(
+            f"http://example.com/{name}",
+            tmp_path / name,
+            make_download_fn(name.encode() * 3, calls),
+        )
+
+    cached = {p.name for p in cache.blob_dir.iterdir()}
+    assert cached == {
+        DownloadCache.key("http://example.com/a"),
+        DownloadCache.key("http://example.com/c"),
+    }
+    assert len(calls) == 3
+
+
+def test_evict_skips_partial_downloads(tmp_path: Path) -> None:
+    cache = DownloadCache(tmp_path / "cache", max_bytes=0)
+    key = DownloadCache.key("http://example.com/b")
+    cache.partial_path(key).write_bytes(b"bbb")
+    progress_path = cache.blob_dir / f"{key}.partial.progress"
+    progress_path.write_text("{}")
+    stale_path = cache.blob_dir / f"{DownloadCache.key('http://example.com/c')}.partial"
+    stale_path.write_bytes(b"ccc")
+    os.utime(stale_path, (0, 0))
+
+    cache.evict()
+
+    assert cache.partial_path(key).exists()
+    assert progress_path.exists()
+    assert not stale_path.exists()
+
+
+def test_evict_keeps_symlinked_blob(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def link(src: Path, dst: Path) -> None:
+        raise OSError("cross-device link")
+
+    monkeypatch.setattr(os, "link", link)
+    cache = DownloadCache(tmp_path / "cache", max_bytes=4)
+    for name in ["a", "b"]:
+        cache.fetch(
+            f"http://example.com/{name}",
+            tmp_path / name,
+            make_download_fn(name.encode() * 3, []),
+        )
+    assert (tmp_path / "a").read_bytes() == b"aaa"
+
+    # once the link is gone, the blob can be evicted
+    (tmp_path / "a").unlink()
+    cache.fetch("http://example.com/c", tmp_path / "c", make_download_fn(b"ccc", []))
+    cached = {p.name for p in cache.blob_dir.iterdir()}
+    assert DownloadCache.key("http://example.com/a") not in cached
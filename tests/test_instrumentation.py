@@ -0,0 +1,95 @@
+import importlib.util
+import json
+import time
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from lhotse_dataset.instrumentation import (
+    REPORT_FILENAME,
+    TRACE_FILENAME,
+    Instrumentation,
+    InstrumentationConfig,
+    Report,
+    StageStats,
+    get_instrumentation,
+    stage,
+)
+from lhotse_dataset.shar import state_dir
+from tests.test_base import ToyCorpus
+
+
+def test_instrumentation_stages() -> None:
+    config = InstrumentationConfig(summary_interval=None, trace=True)
+    with Instrumentation(config) as instrumentation:
+        assert get_instrumentation() is instrumentation
+        with stage("outer"):
+            with stage("inner") as stats:
+                time.sleep(0.01)
+                stats.num_bytes += 100
+        instrumentation.count("things", 2)
+        instrumentation.add_cut(1.5)
+    assert get_instrumentation() is not instrumentation
+
+    report = instrumentation.report
+    assert report.num_cuts == 1
+    assert report.audio_seconds == 1.5
+    assert report.counters == {"things": 2}
+    assert report.stages["inner"].num_bytes == 100
+    assert report.stages["outer"].seconds >= report.stages["inner"].seconds >= 0.01
+    assert [event["name"] for event in report.trace_events] == ["inner", "outer"]
+
+
+def test_report_merge() -> None:
+    a = Report(
+        wall_seconds=2.0,
+        num_cuts=1,
+        stages={"write": StageStats(seconds=1.0, calls=1, num_bytes=10)},
+        counters={"passthrough": 1},
+    )
+    b = Report(
+        wall_seconds=3.0,
+        num_cuts=2,
+        stages={"write": StageStats(seconds=2.0, calls=2, num_bytes=20)},
+        counters={"transcoded": 2},
+    )
+    merged = a.merge(b)
+    assert merged.wall_seconds == 3.0
+    assert merged.num_cuts == 3
+    assert merged.stages["write"] == StageStats(seconds=3.0, calls=3, num_bytes=30)
+    assert merged.counters == {"passthrough": 1, "transcoded": 2}
+    assert a.stages["write"].calls == 1
+
+
+def test_write_shar_report(tmp_path: Path) -> None:
+    config = InstrumentationConfig(
+        trace=True, profiler="cprofile", profile_start=2, profile_num_cuts=3
+    )
+    shar_dir = tmp_path / "shar"
+    report = ToyCorpus().write_shar(shar_dir, instrumentation=config)
+
+    assert report.num_cuts == 10
+    assert report.counters["transcoded"] == 10
+    assert {"enumerate", "write", "transcode", "tar_write"} <= set(report.stages)
+
+    # next to the shards, where `CutSet.from_shar(in_dir=...)` does not see them
+    report_dir = state_dir(shar_dir)
+    data = json.loads((report_dir / REPORT_FILENAME).read_text())
+    assert data["num_cuts"] == 10
+    assert "trace_events" not in data
+    trace = json.loads((report_dir / TRACE_FILENAME).read_text())
+    assert {event["name"] for event in trace["traceEvents"]} >= {"write"}
+    assert (report_dir / "profile_000000.prof").exists()
+    assert not list(shar_dir.glob("export_*")) + list(shar_dir.glob("profile_*"))
+
+
+def test_missing_pyinstrument(monkeypatch: pytest.MonkeyPatch) -> None:
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        importlib.util,
+        "find_spec",
+        lambda name, *args: None if name == "pyinstrument" else find_spec(name, *args),
+    )
+    with pytest.raises(ValidationError, match="pyinstrument"):
+        InstrumentationConfig(profiler="pyinstrument")
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from lhotse_dataset.mixing import (
+    DecodedAudioCache,
+    Mixer,
+    array_recording,
+    extend_noise,
+)
+
+
+def reference_mix(sources: list[np.ndarray], gains: list[float]) -> np.ndarray:
+    wav = np.zeros((len(sources), max(len(s) for s in sources)))
+    for channel, (source, gain) in enumerate(zip(sources, gains)):
+        wav[channel, : len(source)] = source * gain
+    return wav
+
+
+def test_mixer() -> None:
+    rng = np.random.default_rng(0)
+    batch = [[rng.uniform(-1, 1, rng.integers(100, 1000)) for _ in range(3)]]
+    batch += [[rng.uniform(-1, 1, 50) for _ in range(3)]]
+    gains = [list(rng.uniform(0, 2, 3)) for _ in batch]
+
+    mixer = Mixer(num_channels=3)
+    for sources, mixture_gains in zip(batch, gains):
+        wav = mixer.mix(sources, mixture_gains)
+        assert wav.dtype == np.float32
+        np.testing.assert_allclose(
+            wav, reference_mix(sources, mixture_gains), rtol=1e-6, atol=1e-6
+        )
+
+
+def test_mixer_offsets() -> None:
+    mixer = Mixer(num_channels=3)
+    wav = mixer.mix([np.ones(4), np.ones(4)], [2.0, 1.0], offsets=[0, 3], length=6)
+    np.testing.assert_array_equal(
+        wav,
+        [
+            [2, 2, 2, 2, 0, 0],
+            [0, 0, 0, 1, 1, 1],
+            [0, 0, 0, 0, 0, 0],
+        ],
+    )
+
+
+def test_decoded_audio_cache() -> None:
+    cache = DecodedAudioCache(max_bytes=3 * 400)
+    decoded = []
+
+    def decode(key: str, length: int = 100):
+        def fn() -> tuple[np.ndarray, int]:
+            decoded.append(key)
+            return np.ones(length), 16000
+
+        return fn
+
+    samples, sampling_rate = cache.get("a", decode("a"))
+    assert samples.dtype == np.float32 and sampling_rate == 16000
+    assert not samples.flags.writeable
+    assert cache.get("a", decode("a"))[0] is samples
+    cache.get("b", decode("b"))
+    cache.get("c", decode("c"))
+    assert cache.num_bytes == 3 * 400
+
+    # "a" was used more recently than "b", which makes room for "d"
+    cache.get("a", decode("a"))
+    cache.get("d", decode("d"))
+    cache.get("b", decode("b"))
+    assert decoded == ["a", "b", "c", "d", "b"]
+    assert cache.num_bytes <= cache.max_bytes
+
+    # larger than the whole cache, so decoded every time
+    cache.get("e", decode("e", 1000))
+    cache.get("e", decode("e", 1000))
+    assert decoded[-2:] == ["e", "e"]
+    assert cache.hits == 2 and cache.misses == 7
+    assert cache.hit_rate == 2 / 9
+
+
+def test_array_recording() -> None:
+    mixer = Mixer(num_channels=2)
+    wav = mixer.mix([np.linspace(-1, 1, 800), np.ones(400)], [0.5, 0.25])
+    recording = array_recording(wav, 8000, "recording")
+
+    assert recording.num_samples == 800 and recording.duration == 0.1
+    assert recording.channel_ids == [0, 1]
+    # the mixture is kept as it is, without a copy
+    assert recording.sources[0].array is wav
+    np.testing.assert_array_equal(recording.load_audio(), wav)
+    cut = recording.to_cut().truncate(offset=0.025, duration=0.05)
+    np.testing.assert_array_equal(cut.load_audio(), wav[:, 200:600])
+
+
+def concatenating_extend_noise(noise: np.ndarray, max_length: int) -> np.ndarray:
+    """The LibriMix algorithm, growing the noise one concatenation at a time"""
+    window = np.hanning(16000 + 1)
+    i_w = window[: len(window) // 2 + 1]
+    d_w = window[len(window) // 2 :: -1]
+    noise_ex = noise
+    while len(noise_ex) < max_length:
+        noise_ex = np.concatenate(
+            (
+                noise_ex[: len(noise_ex) - len(d_w)],
+                np.multiply(noise_ex[len(noise_ex) - len(d_w) :], d_w)
+                + np.multiply(noise[: len(i_w)], i_w),
+                noise[len(i_w) :],
+            )
+        )
+    return noise_ex[:max_length]
+
+
+# shorter than two crossfades, so that crossfades overlap, and longer
+@pytest.mark.parametrize("noise_length", [8001 + 3000, 40000])
+@pytest.mark.parametrize("max_length", [5000, 40000, 123457, 1_000_000])
+def test_extend_noise(noise_length: int, max_length: int) -> None:
+    noise = np.random.default_rng(0).uniform(-1, 1, noise_length).astype(np.float32)
+    expected = concatenating_extend_noise(noise, max_length)
+    extended = extend_noise(noise, max_length)
+    assert extended.dtype == expected.dtype
+    np.testing.assert_array_equal(extended, expected)
+
+
+def test_extend_noise_sampling_rate() -> None:
+    noise = np.ones(6000)
+    extended = extend_noise(noise, 20000, sampling_rate=8000)
+    assert len(extended) == 20000
+    # half a second of crossfade at 8 kHz, where the windows sum to one
+    np.testing.assert_allclose(extended, 1.0)
+
+    with pytest.raises(ValueError):
+        extend_noise(np.ones(4000), 20000, sampling_rate=8000)
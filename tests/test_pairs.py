@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from lhotse_dataset.pairs import PairSampler
+
+
+def nested_loop(durations: np.ndarray, speakers: list[str]) -> list[tuple[int, int]]:
+    pairs = []
+    for i in range(len(durations)):
+        for j in range(len(durations)):
+            if durations[i] < durations[j] or speakers[i] == speakers[j]:
+                continue
+            pairs.append((i, j))
+    return pairs
+
+
+@pytest.mark.parametrize("num_items, num_speakers", [(1, 1), (30, 1), (60, 5)])
+def test_pairs_at(num_items: int, num_speakers: int) -> None:
+    rng = np.random.default_rng(0)
+    # rounded so that equal durations come up
+    durations = -np.sort(-rng.uniform(3, 20, num_items).round(0))
+    speakers = [f"speaker_{s}" for s in rng.integers(0, num_speakers, num_items)]
+
+    expected = nested_loop(durations, speakers)
+    sampler = PairSampler(durations, speakers)
+    assert sampler.num_pairs == len(expected)
+    pairs = sampler.pairs_at(np.arange(sampler.num_pairs))
+    assert [tuple(pair) for pair in pairs.tolist()] == expected
+
+
+def test_thinned() -> None:
+    rng = np.random.default_rng(0)
+    durations = -np.sort(-rng.uniform(3, 20, 200))
+    speakers = [str(s) for s in rng.integers(0, 10, 200)]
+    sampler = PairSampler(durations, speakers)
+
+    pairs = sampler.thinned(50, 0.01, np.random.default_rng(42))
+    assert len(pairs) == 50
+    assert np.all(durations[pairs[:, 0]] >= durations[pairs[:, 1]])
+    assert all(speakers[i] != speakers[j] for i, j in pairs)
+    # kept in loop order, without repeats
+    assert np.all(np.diff(pairs[:, 0] * 200 + pairs[:, 1]) > 0)
+    np.testing.assert_array_equal(
+        pairs, sampler.thinned(50, 0.01, np.random.default_rng(42))
+    )
+
+    # fewer pairs than asked for when the coin flips run out of pairs
+    assert len(sampler.thinned(10**6, 0.01, rng)) < 10**6
+
+
+@pytest.mark.parametrize("speaker_balanced", [False, True])
+def test_uniform(speaker_balanced: bool) -> None:
+    rng = np.random.default_rng(0)
+    durations = -np.sort(-rng.uniform(3, 20, 300))
+    # one speaker has far more utterances than the others
+    speakers = [str(min(s, 5)) for s in rng.integers(0, 12, 300)]
+    sampler = PairSampler(durations, speakers)
+
+    pairs = sampler.uniform(600, np.random.default_rng(42), speaker_balanced)
+    assert len(pairs) == 600
+    assert np.all(durations[pairs[:, 0]] >= durations[pairs[:, 1]])
+    assert all(speakers[i] != speakers[j] for i, j in pairs)
+    assert np.all(np.diff(pairs[:, 0] * 300 + pairs[:, 1]) > 0)
+
+    _, counts = np.unique([speakers[i] for i in pairs[:, 0]], return_counts=True)
+    if speaker_balanced:
+        assert counts.tolist() == [100] * 6
+    else:
+        assert counts.max() > 200
+
+    assert len(sampler.uniform(10**9, rng, speaker_balanced)) == sampler.num_pairs
@@ -0,0 +1,66 @@
+import io
+from pathlib import Path
+
+import lhotse
+import numpy as np
+import pytest
+import soundfile as sf
+
+from lhotse_dataset.probe import (
+    probe_bytes,
+    recording_from_bytes,
+    recording_from_file,
+)
+
+
+def encode(format: str, subtype: str, num_channels: int, sampling_rate: int) -> bytes:
+    samples = np.random.default_rng(0).uniform(-0.5, 0.5, (12345, num_channels))
+    buf = io.BytesIO()
+    sf.write(buf, samples, sampling_rate, format=format, subtype=subtype)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize(
+    "format, subtype, num_channels, sampling_rate",
+    [
+        ("WAV", "PCM_16", 1, 16000),
+        ("WAV", "PCM_24", 2, 44100),
+        ("WAV", "FLOAT", 3, 8000),
+        ("WAVEX", "PCM_16", 2, 48000),
+        ("FLAC", "PCM_16", 1, 16000),
+        ("FLAC", "PCM_24", 2, 24000),
+    ],
+)
+def test_recording_from_bytes(
+    format: str, subtype: str, num_channels: int, sampling_rate: int
+) -> None:
+    data = encode(format, subtype, num_channels, sampling_rate)
+    assert probe_bytes(data) is not None
+
+    recording = recording_from_bytes(data, "recording")
+    expected = lhotse.Recording.from_bytes(data, "recording")
+    assert recording == expected
+
+
+def test_recording_from_file(tmp_path: Path) -> None:
+    path = tmp_path / "audio.flac"
+    path.write_bytes(encode("FLAC", "PCM_16", 1, 16000))
+
+    assert recording_from_file(path) == lhotse.Recording.from_file(path)
+    assert recording_from_file(path, "id").id == "id"
+
+
+def test_recording_from_bytes_fallback() -> None:
+    data = encode("OGG", "VORBIS", 1, 16000)
+    assert probe_bytes(data) is None
+    assert recording_from_bytes(data, "recording").num_samples == 12345
+
+
+def test_probe_wav_skips_chunks() -> None:
+    data = encode("WAV", "PCM_16", 1, 16000)
+    # an odd-sized chunk between the fmt and data chunks, padded to even size
+    extra = b"LIST" + (5).to_bytes(4, "little") + b"abcde\x00"
+    data = data[:36] + extra + data[36:]
+    header = probe_bytes(data)
+    assert header is not None
+    assert header.num_samples == 12345
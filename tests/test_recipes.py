@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lhotse_dataset.base import Partition
+from lhotse_dataset.recipes import RecipeTable
+
+
+@pytest.fixture
+def csv_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("LHOTSE_DATASET_CACHE_DIR", str(tmp_path / "cache"))
+    df = pd.DataFrame(
+        {
+            "mixture_ID": [f"mixture_{i}" for i in range(10)],
+            "source_1_path": [f"dev-clean/{i % 3}.wav" for i in range(10)],
+            "source_1_gain": np.linspace(0.1, 1.0, 10),
+            "source_2_path": [f"dév-clean/{i % 4}.wav" for i in range(10)],
+            "source_2_gain": np.linspace(1.0, 2.0, 10),
+            "length": np.arange(10) * 1000,
+        }
+    )
+    path = tmp_path / "libri2mix_dev-clean.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+def test_recipe_table(csv_path: Path) -> None:
+    table = RecipeTable.from_csv(csv_path)
+    df = pd.read_csv(csv_path)
+    assert len(table) == 10
+    # each distinct path is stored once
+    assert len(table.string_offsets) - 1 == 10 + 3 + 4
+    assert table.columns["source_1_gain"].dtype == np.float32
+
+    rows = list(table)
+    for row, expected in zip(rows, df.itertuples()):
+        assert row.mixture_ID == expected.mixture_ID
+        assert row.source_2_path == expected.source_2_path
+        assert row.source_1_gain == np.float32(expected.source_1_gain)
+        assert row.length == expected.length
+
+    partition = Partition(index=1, num_partitions=3)
+    assert list(table.rows(partition)) == list(partition.select(rows))
+
+    # converted once, then opened from the cache
+    assert RecipeTable.from_csv(csv_path).path == table.path
+
+
+def test_recipe_table_rows_span_chunks(
+    csv_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr("lhotse_dataset.recipes.ROW_CHUNK_SIZE", 3)
+    table = RecipeTable.convert(csv_path, csv_path.parent / "recipes")
+    assert [row.mixture_ID for row in table] == [f"mixture_{i}" for i in range(10)]
+    partition = Partition(index=0, num_partitions=4)
+    assert [row.length for row in table.rows(partition)] == [0, 4000, 8000]
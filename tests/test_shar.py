@@ -0,0 +1,166 @@
+import io
+import tarfile
+from pathlib import Path
+
+import lhotse
+import numpy as np
+import pytest
+import soundfile as sf
+from lhotse import CutSet
+from pydantic import ValidationError
+
+from lhotse_dataset.mixing import array_recording, wav_bytes
+from lhotse_dataset.probe import recording_from_bytes
+from lhotse_dataset.shar import (
+    LEDGER_FILENAME,
+    Ledger,
+    PassthroughSharWriter,
+    ResumableSharWriter,
+    ShardFile,
+    ShardRecord,
+    ShardRollover,
+    remove_uncommitted_shards,
+)
+
+
+def make_record(shard: int, size: int) -> ShardRecord:
+    return ShardRecord(
+        shard=shard,
+        num_cuts=2,
+        last_cut_id=f"cut_{shard}",
+        files=[ShardFile(name=f"cuts.{shard:06d}.jsonl.gz", size=size, sha256="")],
+    )
+
+
+def test_ledger_recovers_from_torn_line(tmp_path: Path) -> None:
+    ledger = Ledger(tmp_path / LEDGER_FILENAME)
+    ledger.append(make_record(0, 3))
+    with open(ledger.path, "a", encoding="utf-8") as f:
+        f.write('{"shard": 1, "num_')
+
+    ledger = Ledger(tmp_path / LEDGER_FILENAME)
+    assert [r.shard for r in ledger.records] == [0]
+    assert ledger.num_cuts == 2
+    assert not ledger.complete
+
+
+def test_ledger_validate(tmp_path: Path) -> None:
+    ledger = Ledger(tmp_path / LEDGER_FILENAME)
+    for shard in range(3):
+        ledger.append(make_record(shard, 3))
+        (tmp_path / f"cuts.{shard:06d}.jsonl.gz").write_bytes(b"abc")
+    ledger.mark_complete()
+    (tmp_path / "cuts.000001.jsonl.gz").write_bytes(b"ab")
+
+    ledger.validate(tmp_path)
+    assert [r.shard for r in ledger.records] == [0]
+    assert not ledger.complete
+    assert [r.shard for r in Ledger(tmp_path / LEDGER_FILENAME).records] == [0]
+
+    remove_uncommitted_shards(tmp_path, len(ledger.records))
+    assert sorted(p.name for p in tmp_path.glob("cuts.*")) == ["cuts.000000.jsonl.gz"]
+
+
+def make_cut(cut_id: str, format: str) -> lhotse.MonoCut:
+    buf = io.BytesIO()
+    sf.write(buf, np.linspace(-0.5, 0.5, 1600), 16000, format=format)
+    recording = lhotse.Recording.from_bytes(buf.getvalue(), f"recording_{cut_id}")
+    return lhotse.MonoCut(
+        id=cut_id,
+        start=0,
+        duration=recording.duration,
+        channel=0,
+        recording=recording,
+    )
+
+
+def test_passthrough_shar_writer(tmp_path: Path) -> None:
+    flac_cut = make_cut("flac", "FLAC")
+    wav_cut = make_cut("wav", "WAV")
+    truncated_cut = make_cut("truncated", "FLAC").truncate(duration=0.05)
+
+    with PassthroughSharWriter(
+        str(tmp_path), fields={"recording": "flac"}, shard_size=None
+    ) as writer:
+        for cut in [flac_cut, wav_cut, truncated_cut]:
+            writer.write(cut)
+    assert writer.stats.num_passthrough == 1
+    assert writer.stats.num_transcoded == 2
+
+    with tarfile.open(tmp_path / "recording.tar") as tar:
+        member = tar.extractfile("flac.flac")
+        assert member is not None
+        assert member.read() == flac_cut.recording.sources[0].source
+
+    cuts = CutSet.from_shar(in_dir=tmp_path)
+    for cut, expected in zip(cuts, [flac_cut, wav_cut, truncated_cut]):
+        assert cut.id == expected.id
+        assert cut.num_samples == expected.num_samples
+        np.testing.assert_allclose(cut.load_audio(), expected.load_audio(), atol=1e-4)
+
+
+def test_array_recording_is_encoded_once(tmp_path: Path) -> None:
+    rng = np.random.default_rng(0)
+    wav = rng.uniform(-1.2, 1.2, (2, 16000)).astype(np.float32)
+    recordings = [
+        array_recording(wav, 16000, "array"),
+        recording_from_bytes(wav_bytes(wav, 16000), "wav"),
+    ]
+    cuts = [
+        lhotse.MultiCut(
+            id=recording.id,
+            start=0,
+            duration=recording.duration,
+            channel=recording.channel_ids,
+            recording=recording,
+        )
+        for recording in recordings
+    ]
+
+    with PassthroughSharWriter(
+        str(tmp_path), fields={"recording": "flac"}, shard_size=None
+    ) as writer:
+        for cut in cuts:
+            writer.write(cut)
+    assert writer.stats.num_encoded == 1
+    assert writer.stats.num_transcoded == 1
+
+    # 16-bit WAV and FLAC round the float samples differently, by one step at most
+    shar_cuts = list(CutSet.from_shar(in_dir=tmp_path))
+    assert shar_cuts[0].num_samples == 16000
+    np.testing.assert_allclose(
+        shar_cuts[0].load_audio(), shar_cuts[1].load_audio(), rtol=0, atol=1 / 2**15
+    )
+
+
+def test_shard_rollover(tmp_path: Path) -> None:
+    # 0.1 to 0.6 seconds of 16-bit audio, 3200 bytes per 0.1 seconds
+    cuts = []
+    for i in range(6):
+        recording = recording_from_bytes(
+            wav_bytes(np.zeros((1, 1600 * (i + 1)), dtype=np.float32), 16000),
+            f"cut_{i}",
+        )
+        cuts.append(recording.to_cut())
+
+    rollovers = {
+        "seconds": ShardRollover(max_seconds=0.5),
+        "bytes": ShardRollover(max_bytes=6000),
+        "capped": ShardRollover(max_seconds=10.0, max_cuts=4),
+    }
+    num_cuts = {}
+    for name, rollover in rollovers.items():
+        with ResumableSharWriter(
+            tmp_path / name, fields={"recording": "wav"}, shard_size=rollover
+        ) as writer:
+            for cut in cuts:
+                writer.write(cut)
+        num_cuts[name] = [record.num_cuts for record in writer.ledger.records]
+
+    # a shard is closed by the cut that reaches the target
+    assert num_cuts["seconds"] == [3, 2, 1]
+    assert num_cuts["bytes"] == [2, 1, 1, 1, 1]
+    assert num_cuts["capped"] == [4, 2]
+
+    with pytest.raises(ValidationError):
+        ShardRollover()
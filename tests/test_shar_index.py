@@ -0,0 +1,84 @@
+import io
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import lhotse
+import numpy as np
+import pytest
+import soundfile as sf
+from lhotse import CutSet
+from lhotse.shar import SharWriter
+
+from lhotse_dataset import shar_index
+from lhotse_dataset.shar_index import FilePool, SharIndex, SharReader
+
+
+@pytest.fixture
+def shar_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("LHOTSE_DATASET_CACHE_DIR", str(tmp_path / "cache"))
+    rng = np.random.default_rng(0)
+    shar_dir = tmp_path / "shar"
+    shar_dir.mkdir()
+    with SharWriter(
+        str(shar_dir), fields={"recording": "flac"}, shard_size=2
+    ) as writer:
+        for i in range(5):
+            samples = rng.uniform(-0.5, 0.5, 8000 + 1000 * i)
+            buf = io.BytesIO()
+            sf.write(buf, samples, 16000, format="WAV", subtype="PCM_16")
+            recording = lhotse.Recording.from_bytes(buf.getvalue(), f"recording_{i}")
+            # a dot in the id, like the extension of the tar member
+            writer.write(recording.to_cut().with_id(f"cut.{i}"))
+    return shar_dir
+
+
+def cut_paths(shar_dir: Path) -> list[str]:
+    return sorted(map(str, shar_dir.glob("cuts.*.jsonl.gz")))
+
+
+def test_shar_index(shar_dir: Path) -> None:
+    index = SharIndex.load(shar_dir)
+    assert SharIndex.path(shar_dir).exists()
+    # the directory still reads as a shar of its own
+    assert len(CutSet.from_shar(in_dir=shar_dir).to_eager()) == 5
+    assert index.shards == [f"recording.00000{i}.tar" for i in range(3)]
+    assert index.cut_ids == [f"cut.{i}" for i in range(5)]
+    assert index.shard == [0, 0, 1, 1, 2]
+    assert index.format == ["flac"] * 5
+
+    reader = SharReader(shar_dir)
+    with tarfile.open(shar_dir / "recording.000001.tar") as tar:
+        member = tar.extractfile("cut.3.flac")
+        assert member is not None
+        assert reader.read("cut.3") == member.read()
+
+
+def test_shar_reader_threads(shar_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = {}
+    for path in sorted(shar_dir.glob("recording.*.tar")):
+        with tarfile.open(path) as tar:
+            for info in tar:
+                name, ext = info.name.rsplit(".", 1)
+                member = tar.extractfile(info)
+                if ext != "json" and member is not None:
+                    expected[name] = member.read()
+
+    # fewer descriptors than shards, so that reads evict each other's
+    monkeypatch.setattr(shar_index, "_file_pool", FilePool(max_open=1))
+    reader = SharReader(shar_dir)
+    cut_ids = list(expected) * 20
+    with ThreadPoolExecutor(4) as executor:
+        for cut_id, data in zip(cut_ids, executor.map(reader.read, cut_ids)):
+            assert data == expected[cut_id]
+
+
+def test_shar_index_stale(shar_dir: Path) -> None:
+    SharIndex.load(shar_dir)
+    (shar_dir / "recording.000002.tar").unlink()
+    (shar_dir / "cuts.000002.jsonl.gz").unlink()
+
+    reader = SharReader(shar_dir)
+    assert len(reader) == 4
+    assert "cut.4" not in reader
+    assert SharIndex.load(shar_dir).shards == reader.index.shards
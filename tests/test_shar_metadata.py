@@ -0,0 +1,92 @@
+import io
+from pathlib import Path
+from typing import Generator
+
+import lhotse
+import numpy as np
+import soundfile as sf
+from lhotse import CutSet
+
+from lhotse_dataset.base import BaseCorpus, Partition
+from lhotse_dataset.shar_metadata import (
+    ROLLUP_FILENAME,
+    SharMetadata,
+    metadata_dir,
+    sidecar_paths,
+)
+
+
+class SpeakerCorpus(BaseCorpus):
+    @property
+    def shard_size(self) -> int:
+        return 4
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
+        for i in partition.select(range(10)):
+            num_samples = 1600 * (i + 1)
+            buf = io.BytesIO()
+            sf.write(buf, np.zeros(num_samples), 16000, format="WAV")
+            recording = lhotse.Recording.from_bytes(buf.getvalue(), f"recording_{i}")
+            yield lhotse.MonoCut(
+                id=f"cut_{i}",
+                start=0,
+                duration=recording.duration,
+                channel=0,
+                recording=recording,
+                supervisions=[
+                    lhotse.SupervisionSegment(
+                        id=f"segment_{i}",
+                        recording_id=recording.id,
+                        start=0,
+                        duration=recording.duration,
+                        speaker=f"spk_{i % 3}",
+                        gender="male" if i % 2 == 0 else "female",
+                        language="en",
+                        custom={"subset": "dev" if i < 4 else "train"},
+                    )
+                ],
+            )
+
+
+def test_shar_metadata(tmp_path: Path) -> None:
+    shar_dir = tmp_path / "shar"
+    SpeakerCorpus().write_shar(shar_dir, num_workers=2)
+    assert (metadata_dir(shar_dir) / ROLLUP_FILENAME).exists()
+    cut_paths = sorted(map(str, shar_dir.glob("cuts.*.jsonl.gz")))
+    assert len(sidecar_paths(shar_dir)) == len(cut_paths)
+    assert not list(shar_dir.glob("metadata*"))
+
+    # every (shard, index) points at the cut of the manifests
+    cuts = {}
+    for shard, path in enumerate(cut_paths):
+        for index, cut in enumerate(CutSet.from_shar({"cuts": [path]})):
+            cuts[shard, index] = cut
+
+    metadata = SharMetadata(shar_dir)
+    assert len(metadata) == 10
+    matches = metadata.query(min_duration=0.35, subset="train", speaker="spk_1")
+    assert sorted(cuts[match].id for match in matches) == ["cut_4", "cut_7"]
+    assert sorted(metadata.cut_ids(gender="female", max_duration=0.4)) == [
+        "cut_1",
+        "cut_3",
+    ]
+
+    stats = metadata.stats()
+    assert stats.num_cuts == 10
+    assert np.isclose(stats.total_seconds, sum(cut.duration for cut in cuts.values()))
+    assert stats.min_duration == 0.1 and stats.max_duration == 1.0
+    assert stats.num_speakers == 3
+    assert stats.subsets == {"dev": 4, "train": 6}
+    assert stats.genders == {"female": 5, "male": 5}
+    assert stats.languages == {"en": 10}
+    assert stats.sampling_rates == {16000: 10}
+    assert metadata.stats(subset="test").num_cuts == 0
+
+    # the sidecars do not get in the way of reading the shards
+    assert len(list(CutSet.from_shar(in_dir=shar_dir))) == 10
+
+    # the sidecars alone give the same answers
+    (metadata_dir(shar_dir) / ROLLUP_FILENAME).unlink()
+    assert SharMetadata(shar_dir).query(subset="dev") == metadata.query(subset="dev")
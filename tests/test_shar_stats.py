@@ -0,0 +1,69 @@
+import io
+import shutil
+from pathlib import Path
+from typing import Generator
+
+import lhotse
+import numpy as np
+import soundfile as sf
+
+from lhotse_dataset.base import BaseCorpus, Partition
+from lhotse_dataset.shar_metadata import metadata_dir
+from lhotse_dataset.shar_stats import shar_stats
+
+
+class SpeakerCorpus(BaseCorpus):
+    @property
+    def shard_size(self) -> int:
+        return 3
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
+        # 0.5 to 5.0 seconds
+        for i in partition.select(range(10)):
+            buf = io.BytesIO()
+            sf.write(buf, np.zeros(800 * (i + 1)), 1600, format="WAV")
+            recording = lhotse.Recording.from_bytes(buf.getvalue(), f"recording_{i}")
+            yield lhotse.MonoCut(
+                id=f"cut_{i}",
+                start=0,
+                duration=recording.duration,
+                channel=0,
+                recording=recording,
+                supervisions=[
+                    lhotse.SupervisionSegment(
+                        id=f"segment_{i}",
+                        recording_id=recording.id,
+                        start=0,
+                        duration=recording.duration,
+                        speaker=f"spk_{i % 2}",
+                        custom={"subset": "dev" if i < 4 else "train"},
+                    )
+                ],
+                custom={"subset": "dev" if i < 4 else "train"},
+            )
+
+
+def test_shar_stats(tmp_path: Path) -> None:
+    shar_dir = tmp_path / "shar"
+    SpeakerCorpus().write_shar(shar_dir)
+    stats = shar_stats(shar_dir)
+    assert stats.num_shards == 4
+    assert stats.num_sidecars == 4
+    assert stats.total.num_cuts == 10
+    assert stats.total.total_seconds == sum(0.5 * (i + 1) for i in range(10))
+    # <1s, <2s, <5s and the rest
+    assert stats.total.histogram[:4] == [1, 2, 6, 1]
+    assert stats.groups["subset"]["dev"].num_cuts == 4
+    assert stats.groups["speaker"]["spk_1"].total_seconds == 15.0
+    assert stats.groups["gender"] == {"": stats.total}
+    assert "spk_0" in stats.table()
+
+    # the cut manifests give the same stats as the sidecars
+    shutil.rmtree(metadata_dir(shar_dir))
+    from_manifests = shar_stats(shar_dir, num_workers=2)
+    assert from_manifests.num_sidecars == 0
+    assert from_manifests.model_dump(exclude={"num_sidecars"}) == stats.model_dump(
+        exclude={"num_sidecars"}
+    )
@@ -0,0 +1,157 @@
+import io
+import os
+import resource
+from pathlib import Path
+from typing import Generator
+
+import lhotse
+import numpy as np
+import pytest
+import soundfile as sf
+from lhotse import CutSet
+
+from lhotse_dataset.base import BaseCorpus, Partition
+from lhotse_dataset.instrumentation import Instrumentation
+from lhotse_dataset.shar import state_dir
+from lhotse_dataset.shuffle import SHUFFLE_DIRNAME, ShuffleConfig, external_shuffle
+
+
+class CountingCorpus(BaseCorpus):
+    @property
+    def shard_size(self) -> int:
+        return 4
+
+    def get_cuts(
+        self, partition: Partition = Partition()
+    ) -> Generator[lhotse.MonoCut, None, None]:
+        for i in partition.select(range(20)):
+            buf = io.BytesIO()
+            sf.write(buf, np.full(160, i / 100), 16000, format="WAV")
+            recording = lhotse.Recording.from_bytes(buf.getvalue(), f"recording_{i}")
+            yield recording.to_cut().with_id(f"cut_{i:02d}")
+
+
+def shar_ids(shar_dir: Path) -> list[str]:
+    paths = sorted(map(str, shar_dir.glob("cuts.*.jsonl.gz")))
+    return [cut.id for cut in CutSet.from_shar({"cuts": paths})]
+
+
+def test_external_shuffle(tmp_path: Path) -> None:
+    corpus = CountingCorpus()
+    ids = [cut.id for cut in corpus.get_cuts()]
+    config = ShuffleConfig(seed=1, run_size=3)
+
+    cuts = list(
+        external_shuffle(
+            corpus.get_cuts(), tmp_path / "work", corpus.shar_fields, config
+        )
+    )
+    assert not (tmp_path / "work").exists()
+    assert [cut.id for cut in cuts] != ids
+    assert sorted(cut.id for cut in cuts) == ids
+    # the audio of the runs is that of the cuts
+    for cut in cuts:
+        expected = int(cut.id.split("_")[1]) / 100
+        np.testing.assert_allclose(cut.load_audio(), expected, atol=1e-4)
+
+    again = external_shuffle(
+        corpus.get_cuts(), tmp_path / "work", corpus.shar_fields, config
+    )
+    assert [cut.id for cut in again] == [cut.id for cut in cuts]
+
+
+def test_write_shar_shuffle(tmp_path: Path) -> None:
+    corpus = CountingCorpus()
+    ids = [cut.id for cut in corpus.get_cuts()]
+    shuffle = ShuffleConfig(seed=0, run_size=6)
+
+    report = corpus.write_shar(tmp_path / "a", num_workers=2, shuffle=shuffle)
+    assert sorted(shar_ids(tmp_path / "a")) == ids
+    assert shar_ids(tmp_path / "a") != ids
+    # encoded once when spilled, then copied from the runs
+    assert report.counters["passthrough"] == 20
+    assert not list(state_dir(tmp_path / "a").rglob(SHUFFLE_DIRNAME))
+
+    corpus.write_shar(tmp_path / "b", num_workers=2, shuffle=shuffle)
+    assert shar_ids(tmp_path / "b") == shar_ids(tmp_path / "a")
+
+
+def test_external_shuffle_open_files(tmp_path: Path) -> None:
+    corpus = CountingCorpus()
+    expected = list(
+        external_shuffle(
+            corpus.get_cuts(),
+            tmp_path / "work",
+            corpus.shar_fields,
+            ShuffleConfig(run_size=1, max_open_runs=100),
+        )
+    )
+
+    # 20 runs of one cut, two files each, with a few files to spare
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    num_open = len(os.listdir("/proc/self/fd"))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (num_open + 16, hard))
+    try:
+        shuffled = external_shuffle(
+            corpus.get_cuts(),
+            tmp_path / "work",
+            corpus.shar_fields,
+            ShuffleConfig(run_size=1, max_open_runs=4),
+        )
+        ids = [cut.id for cut in shuffled]
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    assert sorted(ids) == sorted(cut.id for cut in expected)
+    assert ids != [cut.id for cut in expected]
+
+
+def test_external_shuffle_resume(tmp_path: Path) -> None:
+    corpus = CountingCorpus()
+    config = ShuffleConfig(seed=3, run_size=4)
+    expected = [
+        cut.id
+        for cut in external_shuffle(
+            corpus.get_cuts(), tmp_path / "work", corpus.shar_fields, config
+        )
+    ]
+
+    def crash_after(num_cuts: int):
+        for i, cut in enumerate(corpus.get_cuts()):
+            if i == num_cuts:
+                raise RuntimeError("crash")
+            yield cut
+
+    with pytest.raises(RuntimeError):
+        list(
+            external_shuffle(
+                crash_after(10), tmp_path / "work", corpus.shar_fields, config
+            )
+        )
+
+    # the two complete runs are kept, and only the cuts after them are spilled
+    report = Instrumentation()
+    with report:
+        resumed = external_shuffle(
+            corpus.get_cuts(),
+            tmp_path / "work",
+            corpus.shar_fields,
+            config,
+            resume=True,
+        )
+        assert [cut.id for cut in resumed] == expected
+    assert report.report.counters["spilled"] == 12
+
+
+def test_external_shuffle_run_bytes(tmp_path: Path) -> None:
+    corpus = CountingCorpus()
+    # each cut encodes to a few hundred bytes, so every run holds one or two
+    with Instrumentation() as instrumentation:
+        shuffled = external_shuffle(
+            corpus.get_cuts(),
+            tmp_path / "work",
+            corpus.shar_fields,
+            ShuffleConfig(run_bytes=500),
+        )
+        ids = [cut.id for cut in shuffled]
+    assert sorted(ids) == [cut.id for cut in corpus.get_cuts()]
+    assert instrumentation.report.counters["spill_runs"] >= 10
@@ -0,0 +1,118 @@
+import io
+import shutil
+import tarfile
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from lhotse_dataset import librispeech
+from lhotse_dataset.base import Partition
+from lhotse_dataset.instrumentation import Instrumentation
+from lhotse_dataset.librispeech import LibriSpeech
+from lhotse_dataset.streaming import MemberBuffer, first_line, stream_tar_members
+
+
+def make_tar(path: Path, members: dict[str, bytes]) -> None:
+    with tarfile.open(path, mode="w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+
+def flac_bytes(value: float) -> bytes:
+    buf = io.BytesIO()
+    sf.write(buf, np.full(1600, value), 16000, format="FLAC")
+    return buf.getvalue()
+
+
+def test_stream_tar_members(tmp_path: Path) -> None:
+    tar_path = tmp_path / "archive.tar.gz"
+    make_tar(tar_path, {"a": b"1", "b": b"2", "c": b"3", "d": b"4"})
+
+    items = [("c", "a"), ("a", "b"), ("d", "missing")]
+    streamed = list(stream_tar_members(tar_path, items, list))
+
+    # items come out as soon as their last member streamed past
+    assert streamed == [
+        (("a", "b"), {"a": b"1", "b": b"2"}),
+        (("c", "a"), {"c": b"3", "a": b"1"}),
+        (("d", "missing"), {"d": b"4"}),
+    ]
+
+
+def test_stream_tar_members_spills(tmp_path: Path) -> None:
+    tar_path = tmp_path / "archive.tar.gz"
+    members = {name: name.encode() * 100 for name in "abcdef"}
+    make_tar(tar_path, members)
+
+    items = [("a", "f"), ("b", "c"), ("a", "c"), ("d", "e"), ("a", "missing")]
+    expected = list(stream_tar_members(tar_path, items, list))
+    with Instrumentation() as instrumentation:
+        streamed = list(
+            stream_tar_members(tar_path, items, list, max_buffered_bytes=250)
+        )
+    assert streamed == expected
+    # "a", with the most items left waiting on it, goes to disk first
+    assert instrumentation.report.counters["spilled_member_bytes"] >= 100
+
+
+def test_member_buffer_reclaims_spills(tmp_path: Path) -> None:
+    buffer = MemberBuffer(max_bytes=150, spill_dir=tmp_path)
+    buffer.add("a", b"a" * 100, 2)
+    buffer.add("b", b"b" * 100, 1)
+    assert len(list(tmp_path.rglob("*"))) == 2  # the directory and "a"
+
+    assert buffer.take("a") == b"a" * 100
+    assert buffer.take("a") == b"a" * 100
+    # "a" leaves the disk with its last reference
+    assert "a" not in buffer
+    assert len(list(tmp_path.rglob("*"))) == 1
+    buffer.close()
+    assert not list(tmp_path.iterdir())
+
+
+def test_first_line() -> None:
+    assert first_line(b"hello\nworld\n") == "hello\n"
+    assert first_line(b"hello") == "hello"
+    assert first_line(b"") == ""
+    # carriage returns and other separators stay within the line
+    assert first_line(b"a\rb\x0cc\n") == "a\rb\x0cc\n"
+    assert first_line("a\u2028b\nc".encode()) == "a\u2028b\n"
+
+
+def test_librispeech_get_cuts(tmp_path: Path, monkeypatch) -> None:
+    tar_path = tmp_path / "dev-clean.tar.gz"
+    make_tar(
+        tar_path,
+        {
+            "LibriSpeech/dev-clean/1/10/1-10-0000.flac": flac_bytes(0.1),
+            "LibriSpeech/dev-clean/1/10/1-10-0001.flac": flac_bytes(0.2),
+            "LibriSpeech/dev-clean/1/10/1-10.trans.txt": (
+                b"1-10-0000 HELLO WORLD\n1-10-0001 GOOD BYE\n"
+            ),
+            "LibriSpeech/SPEAKERS.TXT": (
+                b"; comment\n1   | F | dev-clean | 1.00 | Jane Doe\n"
+            ),
+        },
+    )
+    monkeypatch.setattr(
+        LibriSpeech, "download_url", property(lambda self: {"dev-clean": "url"})
+    )
+    monkeypatch.setattr(
+        librispeech, "download_file", lambda url, path: shutil.copy(tar_path, path)
+    )
+
+    cuts = list(LibriSpeech().get_cuts())
+    assert [cut.id for cut in cuts] == [
+        "librispeech_dev-clean_1-10-0000",
+        "librispeech_dev-clean_1-10-0001",
+    ]
+    assert cuts[0].supervisions[0].text == "HELLO WORLD"
+    assert cuts[1].supervisions[0].custom["speaker_name"] == "Jane Doe"
+    assert cuts[0].load_audio().shape == (1, 1600)
+
+    partition = Partition(index=1, num_partitions=2)
+    cuts = list(LibriSpeech().get_cuts(partition))
+    assert [cut.id for cut in cuts] == ["librispeech_dev-clean_1-10-0001"]
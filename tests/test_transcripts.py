@@ -0,0 +1,117 @@
+import io
+import shutil
+import tarfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from lhotse_dataset import libritts_r
+from lhotse_dataset.instrumentation import Instrumentation
+from lhotse_dataset.libritts_r import LibriTTSR
+from lhotse_dataset.transcripts import TranscriptIndex
+
+URL = "https://example.com/dev_clean.tar.gz"
+
+
+@pytest.fixture
+def archive(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("LHOTSE_DATASET_CACHE_DIR", str(tmp_path / "cache"))
+    members = {
+        "LibriTTS_R/dev-clean/84/121123/84_121123_000007_000001.wav": b"RIFF",
+        "LibriTTS_R/dev-clean/84/121123/84_121123_000007_000001.normalized.txt": (
+            b"Go, do you hear?\n"
+        ),
+        "LibriTTS_R/dev-clean/84/121123/84_121123_000007_000001.original.txt": (
+            b"'Go, do you hear?'"
+        ),
+        # no original text
+        "LibriTTS_R/dev-clean/84/121123/84_121123_000008_000000.normalized.txt": (
+            b"But in less than five minutes\n"
+        ),
+    }
+    path = tmp_path / "dev_clean.tar.gz"
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_transcript_index(archive: Path) -> None:
+    assert TranscriptIndex.load(URL, archive) is None
+    index = TranscriptIndex(archive_size=archive.stat().st_size)
+    with tarfile.open(archive) as tar:
+        for member in tar:
+            if member.name.endswith(".txt"):
+                index.add(Path(member.name).name, tar.extractfile(member).read())
+    index.cache(URL)
+    assert TranscriptIndex.path(URL).exists()
+    assert index.texts("84_121123_000007_000001") == (
+        "Go, do you hear?\n",
+        "'Go, do you hear?'",
+    )
+    assert index.complete("84_121123_000007_000001")
+    assert not index.complete("84_121123_000008_000000")
+
+    with Instrumentation() as instrumentation:
+        assert index.texts("84_121123_000008_000000") == (
+            "But in less than five minutes\n",
+            "",
+        )
+        assert index.texts("84_121123_000009_000000") == ("", "")
+    assert instrumentation.report.counters == {
+        "missing_normalized_texts": 1,
+        "missing_original_texts": 2,
+    }
+
+    assert TranscriptIndex.load(URL, archive) == index
+
+
+def test_libritts_r_reads_archive_once(
+    archive: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    doc_path = tmp_path / "doc.tar.gz"
+    with tarfile.open(doc_path, "w:gz") as tar:
+        data = b"READER\tGENDER\tSUBSET\tNAME\n84\tF\tdev-clean\tChristie\n"
+        info = tarfile.TarInfo("LibriTTS_R/speakers.tsv")
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+
+    # the archive of the fixture, with real audio in place of the stub
+    wav = io.BytesIO()
+    sf.write(wav, np.zeros(2400), 24000, format="WAV", subtype="PCM_16")
+    wav_path = tmp_path / "dev_clean_wav.tar.gz"
+    with tarfile.open(archive) as src, tarfile.open(wav_path, "w:gz") as dst:
+        for member in src:
+            data = src.extractfile(member).read()
+            if member.name.endswith(".wav"):
+                data = wav.getvalue()
+            member.size = len(data)
+            dst.addfile(member, io.BytesIO(data))
+
+    def download_file(url: str, path: Path, *args) -> None:
+        shutil.copy(doc_path if url.endswith("doc.tar.gz") else wav_path, path)
+
+    opened = []
+    tar_open = tarfile.open
+
+    def open_tar(name, *args, **kwargs):
+        opened.append(Path(name).name)
+        return tar_open(name, *args, **kwargs)
+
+    monkeypatch.setattr(libritts_r, "download_file", download_file)
+    monkeypatch.setattr(
+        LibriTTSR, "download_url", property(lambda self: {"dev_clean": URL})
+    )
+    monkeypatch.setattr(tarfile, "open", open_tar)
+    for _ in range(2):
+        (cut,) = LibriTTSR().get_cuts()
+        assert cut.supervisions[0].text == "Go, do you hear?\n"
+        assert cut.supervisions[0].custom["original_text"] == "'Go, do you hear?'"
+        assert cut.supervisions[0].gender == "female"
+    # the second time, the texts come from the cached index
+    assert opened == ["doc.tar.gz", "dev_clean.tar.gz"] * 2
+    assert TranscriptIndex.path(URL).exists()
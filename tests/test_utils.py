@@ -0,0 +1,109 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Generator
+
+import pytest
+
+from lhotse_dataset import utils
+from lhotse_dataset.instrumentation import Instrumentation
+
+DATA = bytes(range(256)) * 4096
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    support_range = True
+    drop_after: int | None = None
+    requests: list[str] = []
+
+    def do_GET(self) -> None:
+        range_header = self.headers.get("Range")
+        self.requests.append(range_header or "")
+        start, end = 0, len(DATA) - 1
+        if self.support_range and range_header is not None:
+            first, last = range_header.removeprefix("bytes=").split("-")
+            start, end = int(first), int(last)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(DATA)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+
+        body = DATA[start : end + 1]
+        if self.drop_after is not None and len(body) > self.drop_after:
+            # simulate a dropped connection once per request that is long enough
+            body = body[: self.drop_after]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> Generator[str, None, None]:
+    monkeypatch.setattr(utils, "MIN_SEGMENT_BYTES", len(DATA) // 4)
+    monkeypatch.setattr(utils, "BACKOFF_SECONDS", 0.0)
+    RangeHandler.support_range = True
+    RangeHandler.drop_after = None
+    RangeHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/data.bin"
+    httpd.shutdown()
+
+
+def test_download_segmented(server: str, tmp_path: Path) -> None:
+    path = tmp_path / "data.bin"
+    utils._download(server, path)
+    assert path.read_bytes() == DATA
+    assert len(RangeHandler.requests) == 1 + 4
+    assert not path.with_name("data.bin.progress").exists()
+
+
+def test_download_without_range_support(server: str, tmp_path: Path) -> None:
+    RangeHandler.support_range = False
+    path = tmp_path / "data.bin"
+    utils._download(server, path)
+    assert path.read_bytes() == DATA
+    assert len(RangeHandler.requests) == 2
+
+
+def test_download_retries_dropped_connections(server: str, tmp_path: Path) -> None:
+    RangeHandler.drop_after = len(DATA) // 16
+    path = tmp_path / "data.bin"
+    utils._download(server, path)
+    assert path.read_bytes() == DATA
+
+
+def test_download_resumes_partial_file(server: str, tmp_path: Path) -> None:
+    path = tmp_path / "data.bin"
+    half = len(DATA) // 2
+    progress = utils.DownloadProgress(
+        url=server,
+        size=len(DATA),
+        segments=[
+            utils.Segment(start=0, end=half, done=half),
+            utils.Segment(start=half, end=len(DATA), done=100),
+        ],
+    )
+    path.with_name("data.bin.progress").write_text(progress.model_dump_json())
+    path.write_bytes(DATA[: half + 100] + bytes(len(DATA) - half - 100))
+
+    utils._download(server, path)
+    assert path.read_bytes() == DATA
+    assert RangeHandler.requests[1:] == [f"bytes={half + 100}-{len(DATA) - 1}"]
+
+
+def test_download_file_counts_only_fetches(
+    server: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("LHOTSE_DATASET_CACHE_DIR", str(tmp_path / "cache"))
+    with Instrumentation() as instrumentation:
+        utils.download_file(server, tmp_path / "first.bin")
+        utils.download_file(server, tmp_path / "second.bin")
+    assert (tmp_path / "second.bin").read_bytes() == DATA
+    # the second one comes from the download cache
+    assert instrumentation.report.stages["download"].num_bytes == len(DATA)
@@ -0,0 +1,138 @@
+import gzip
+import io
+import shutil
+from pathlib import Path
+
+import lhotse
+import numpy as np
+import pandas as pd
+import pytest
+import soundfile as sf
+from lhotse import CutSet
+from lhotse.shar import SharWriter
+
+from lhotse_dataset.libritts_r_mix_clean import LibriTTSRMixClean
+from lhotse_dataset.libritts_r_mix_large import LibriTTSRMixLarge
+from lhotse_dataset.sources import restore_sources
+from lhotse_dataset.virtual_mix import read_virtual_shar
+
+SAMPLING_RATE = 16000
+
+
+@pytest.fixture
+def shar_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """LibriTTS-R shaped shar of one subset"""
+    monkeypatch.setenv("LHOTSE_DATASET_CACHE_DIR", str(tmp_path / "cache"))
+    rng = np.random.default_rng(0)
+    shar_dir = tmp_path / "libritts_r"
+    shar_dir.mkdir()
+    with SharWriter(
+        str(shar_dir), fields={"recording": "flac"}, shard_size=5
+    ) as writer:
+        # enough pairs for LibriTTSRMixLarge to keep a few at its mix probability
+        for i in range(60):
+            speaker = str(100 + i % 3)
+            stem = f"{speaker}_1_{i:06d}_000000"
+            samples = rng.uniform(-0.3, 0.3, int(SAMPLING_RATE * rng.uniform(3, 4)))
+            buf = io.BytesIO()
+            sf.write(buf, samples, SAMPLING_RATE, format="WAV", subtype="PCM_16")
+            recording = lhotse.Recording.from_bytes(buf.getvalue(), stem)
+            cut = recording.to_cut().with_id(f"libritts_r_dev_clean_{stem}")
+            cut.supervisions = [
+                lhotse.SupervisionSegment(
+                    id=f"segment_{cut.id}",
+                    recording_id=stem,
+                    start=0,
+                    duration=recording.duration,
+                    channel=0,
+                    text=f"text {i}",
+                    speaker=speaker,
+                    custom={"subset": "dev_clean", "original_text": f"Text {i}."},
+                )
+            ]
+            writer.write(cut)
+    return shar_dir
+
+
+def load_sources(shar_dir: Path) -> dict[str, np.ndarray]:
+    cuts = CutSet.from_shar(in_dir=shar_dir)
+    return {cut.recording.id: cut.load_audio()[0] for cut in cuts}
+
+
+def test_libritts_r_mix_clean_virtual(shar_dir: Path, tmp_path: Path) -> None:
+    metadata_dir = tmp_path / "metadata"
+    metadata_dir.mkdir()
+    pd.DataFrame(
+        {
+            "mixture_ID": ["a_b", "missing"],
+            "source_1_path": [
+                "dev-clean/100/1/100_1_000000_000000.wav",
+                "dev-clean/100/1/100_1_999999_000000.wav",
+            ],
+            "source_1_gain": [0.5, 1.0],
+            "source_2_path": [
+                "dev-clean/101/1/101_1_000001_000000.wav",
+                "dev-clean/101/1/101_1_000001_000000.wav",
+            ],
+            "source_2_gain": [2.0, 1.0],
+        }
+    ).to_csv(metadata_dir / "librittsr2mix_dev-clean.csv", index=False)
+
+    corpus = LibriTTSRMixClean(metadata_dir, libritts_r_shar_dir=shar_dir)
+    cuts = list(corpus.get_cuts())
+    assert [cut.id for cut in cuts] == ["a_b"]
+
+    sources = load_sources(shar_dir)
+    source_1 = sources["100_1_000000_000000"]
+    source_2 = sources["101_1_000001_000000"]
+    audio = cuts[0].load_audio()
+    assert audio.shape == (2, max(len(source_1), len(source_2)))
+    np.testing.assert_allclose(audio[0, : len(source_1)], source_1 * 0.5)
+    np.testing.assert_allclose(audio[1, : len(source_2)], source_2 * 2.0)
+    assert cuts[0].supervisions[1].text == "text 1"
+    assert cuts[0].supervisions[1].custom["original_txt"] == "Text 1."
+
+    output_dir = tmp_path / "output"
+    corpus.write_shar(output_dir)
+    assert not list(output_dir.glob("recording.*"))
+    # the recipes name the source shar, so it can be moved
+    with gzip.open(next(output_dir.glob("cuts.*.jsonl.gz")), "rt") as f:
+        assert str(tmp_path) not in f.read()
+    # lhotse alone can not load mixtures, and they do not load without the shar
+    cut = next(iter(CutSet.from_shar(in_dir=output_dir)))
+    with pytest.raises(AssertionError):
+        cut.load_audio()
+    with pytest.raises(ValueError):
+        restore_sources(cut.recording).load_audio()
+
+    moved_dir = shutil.move(shar_dir, tmp_path / "moved")
+    written = list(read_virtual_shar(output_dir, {"libritts_r": moved_dir}))
+    np.testing.assert_array_equal(written[0].load_audio(), audio)
+    np.testing.assert_array_equal(
+        written[0].truncate(offset=0.5, duration=1.0).load_audio(),
+        audio[:, SAMPLING_RATE // 2 : SAMPLING_RATE // 2 + SAMPLING_RATE],
+    )
+
+
+def test_libritts_r_mix_large_virtual(shar_dir: Path) -> None:
+    kwargs = dict(
+        num_test_clean=0,
+        num_dev_clean=3,
+        num_train_clean_100=0,
+        num_train_clean_360=0,
+    )
+    rendered = list(LibriTTSRMixLarge(shar_dir, **kwargs).get_cuts())
+    virtual = list(LibriTTSRMixLarge(shar_dir, virtual=True, **kwargs).get_cuts())
+    assert len(virtual) == len(rendered) > 0
+    # the same mixtures, under the same ids, on every run
+    assert [cut.id for cut in virtual] == [cut.id for cut in rendered]
+
+    for rendered_cut, virtual_cut in zip(rendered, virtual):
+        assert [s.id for s in virtual_cut.supervisions] == [
+            s.id for s in rendered_cut.supervisions
+        ]
+        assert virtual_cut.num_samples == rendered_cut.num_samples
+        # the rendered mixtures are stored as 16-bit PCM
+        np.testing.assert_allclose(
+            virtual_cut.load_audio(), rendered_cut.load_audio(), atol=1 / 2**15
+        )